@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import UserProfile, Prediction, Medicine, Blog, BlogBookmark, Contact
+from django.http import StreamingHttpResponse
+from . import export
+from .models import UserProfile, Prediction, ShadowPrediction, Medicine, DrugLabel, DrugLabelImport, Blog, BlogBookmark, Contact, Tag
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -9,10 +11,41 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(Prediction)
 class PredictionAdmin(admin.ModelAdmin):
-    list_display = ['user', 'predicted_cancer_type', 'confidence_score', 'created_at']
-    list_filter = ['predicted_cancer_type', 'created_at']
+    list_display = ['user', 'predicted_cancer_type', 'confidence_score', 'model_version', 'created_at']
+    list_filter = ['predicted_cancer_type', 'model_version', 'created_at']
     search_fields = ['user__username', 'predicted_cancer_type']
     readonly_fields = ['created_at']
+    list_select_related = ['user']
+    show_full_result_count = False
+    actions = ['export_csv', 'export_ndjson']
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # The changelist only shows a few columns; skip the large text/blob ones
+        if request.resolver_match and request.resolver_match.url_name.endswith('changelist'):
+            queryset = queryset.defer('symptoms', 'recommendations', 'probabilities')
+        return queryset
+
+    def _export(self, queryset, export_format):
+        response = StreamingHttpResponse(
+            export.stream_export(export_format, queryset), content_type=export.EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="predictions.{export_format}"'
+        return response
+
+    @admin.action(description='Export selected predictions as CSV')
+    def export_csv(self, request, queryset):
+        return self._export(queryset, 'csv')
+
+    @admin.action(description='Export selected predictions as NDJSON')
+    def export_ndjson(self, request, queryset):
+        return self._export(queryset, 'ndjson')
+
+@admin.register(ShadowPrediction)
+class ShadowPredictionAdmin(admin.ModelAdmin):
+    list_display = ['candidate_version', 'primary_version', 'primary_class', 'candidate_class', 'agreed',
+                    'primary_latency_ms', 'candidate_latency_ms', 'created_at']
+    list_filter = ['candidate_version', 'agreed', 'primary_class']
+    readonly_fields = ['created_at']
 
 @admin.register(Medicine)
 class MedicineAdmin(admin.ModelAdmin):
@@ -20,6 +53,18 @@ class MedicineAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     search_fields = ['name', 'generic_name', 'manufacturer']
 
+@admin.register(DrugLabel)
+class DrugLabelAdmin(admin.ModelAdmin):
+    list_display = ['brand_name', 'generic_name', 'manufacturer', 'effective_time']
+    search_fields = ['brand_name', 'generic_name', 'set_id']
+    show_full_result_count = False
+
+@admin.register(DrugLabelImport)
+class DrugLabelImportAdmin(admin.ModelAdmin):
+    list_display = ['source', 'started_at', 'finished_at', 'labels_seen', 'labels_created', 'labels_updated',
+                    'labels_skipped']
+    readonly_fields = ['started_at']
+
 @admin.register(Blog)
 class BlogAdmin(admin.ModelAdmin):
     list_display = ['title', 'author', 'is_published', 'views', 'created_at']
@@ -27,6 +72,21 @@ class BlogAdmin(admin.ModelAdmin):
     search_fields = ['title', 'content', 'author__username']
     prepopulated_fields = {'tags': ('title',)}
 
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'published_count']
+    search_fields = ['name']
+    list_select_related = ['count']
+    readonly_fields = ['name', 'slug']
+
+    def has_add_permission(self, request):
+        # Tags come from Blog.tags
+        return False
+
+    @admin.display(ordering='count__published_count')
+    def published_count(self, obj):
+        return obj.count.published_count
+
 @admin.register(BlogBookmark)
 class BlogBookmarkAdmin(admin.ModelAdmin):
     list_display = ['user', 'blog', 'created_at']
@@ -0,0 +1,191 @@
+"""
+Class-probability vectors: compact storage and columnar analytics.
+
+Each Prediction keeps its full softmax as packed float32 (28 bytes for the 7
+classes) in ``Prediction.probabilities``. ``export_probabilities`` writes every
+stored vector to a directory of .npy columns which ``load_export``
+memory-maps, so calibration, confusion and drift analysis over millions of
+rows is plain vectorised NumPy with no ORM in the loop::
+
+    exports/probabilities/
+        meta.json           # class names, model versions, row count
+        ids.npy             # int64 prediction ids
+        created_at.npy      # datetime64[s], UTC
+        model_version.npy   # int16 index into meta["model_versions"]
+        probabilities.npy   # float32, shape (rows, classes)
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from .models import Prediction
+from .utils import CANCER_TYPES
+
+CLASS_NAMES = [CANCER_TYPES[i] for i in sorted(CANCER_TYPES)]
+PROBABILITY_DTYPE = np.dtype('<f4')
+
+
+def pack_probabilities(probs):
+    if probs is None:
+        return None
+    return np.asarray(probs, dtype=PROBABILITY_DTYPE).ravel().tobytes()
+
+
+def unpack_probabilities(blob):
+    if blob is None:
+        return None
+    return np.frombuffer(bytes(blob), dtype=PROBABILITY_DTYPE)
+
+
+def probabilities_dict(blob):
+    """{'melanoma': 0.8123, ...} for API responses, or None if not stored."""
+    probs = unpack_probabilities(blob)
+    if probs is None or len(probs) != len(CLASS_NAMES):
+        return None
+    return {name: round(float(p), 4) for name, p in zip(CLASS_NAMES, probs)}
+
+
+# --- columnar export ---------------------------------------------------------
+
+def export_probabilities(output_dir, queryset=None, chunk_size=10000):
+    """Write all stored probability vectors as memory-mappable .npy columns. Returns the row count."""
+    queryset = queryset if queryset is not None else Prediction.objects.all()
+    queryset = queryset.exclude(probabilities=None).order_by('id')
+    num_classes = len(CLASS_NAMES)
+    row_bytes = num_classes * PROBABILITY_DTYPE.itemsize
+    total = queryset.count()
+
+    tmp_dir = output_dir.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    ids = open_memmap(os.path.join(tmp_dir, 'ids.npy'), mode='w+', dtype=np.int64, shape=(total,))
+    created = open_memmap(os.path.join(tmp_dir, 'created_at.npy'), mode='w+', dtype='datetime64[s]', shape=(total,))
+    versions = open_memmap(os.path.join(tmp_dir, 'model_version.npy'), mode='w+', dtype=np.int16, shape=(total,))
+    probs = open_memmap(os.path.join(tmp_dir, 'probabilities.npy'), mode='w+', dtype=PROBABILITY_DTYPE,
+                        shape=(total, num_classes))
+
+    version_codes = {}
+    rows = 0
+    chunk = []
+
+    def flush():
+        nonlocal rows
+        # Rows created after count() are left for the next export
+        chunk[total - rows:] = []
+        if not chunk:
+            return
+        end = rows + len(chunk)
+        ids[rows:end] = [row[0] for row in chunk]
+        created[rows:end] = np.array([int(row[1].timestamp()) for row in chunk], dtype=np.int64).astype('datetime64[s]')
+        versions[rows:end] = [version_codes.setdefault(row[2], len(version_codes)) for row in chunk]
+        probs[rows:end] = np.frombuffer(b''.join(bytes(row[3]) for row in chunk), dtype=PROBABILITY_DTYPE).reshape(-1, num_classes)
+        rows = end
+        chunk.clear()
+
+    values = queryset.values_list('id', 'created_at', 'model_version', 'probabilities')
+    for row in values.iterator(chunk_size=chunk_size):
+        if len(row[3]) != row_bytes:
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    for column in (ids, created, versions, probs):
+        column.flush()
+    del ids, created, versions, probs
+
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as fh:
+        json.dump({
+            'rows': rows,
+            'classes': CLASS_NAMES,
+            'model_versions': sorted(version_codes, key=version_codes.get),
+        }, fh)
+
+    old_dir = output_dir.rstrip(os.sep) + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(output_dir):
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return rows
+
+
+def load_export(directory):
+    """Columns of an export as read-only memmaps, plus its metadata under 'meta'."""
+    with open(os.path.join(directory, 'meta.json')) as fh:
+        meta = json.load(fh)
+    columns = {'meta': meta}
+    for name in ('ids', 'created_at', 'model_version', 'probabilities'):
+        columns[name] = np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')[:meta['rows']]
+    return columns
+
+
+# --- analytics over (N, C) probability arrays --------------------------------
+
+def confidence_histogram(probs, bins=10):
+    """Counts of top-1 confidence per equal-width bin over [0, 1]."""
+    counts, edges = np.histogram(np.max(probs, axis=1), bins=bins, range=(0.0, 1.0))
+    return {'counts': counts.tolist(), 'edges': edges.tolist()}
+
+
+def reliability(probs, labels, bins=10):
+    """Reliability diagram data and expected calibration error against true class indices."""
+    probs = np.asarray(probs, dtype=np.float32)
+    labels = np.asarray(labels)
+    confidence = probs.max(axis=1)
+    correct = probs.argmax(axis=1) == labels
+    which = np.minimum((confidence * bins).astype(np.int64), bins - 1)
+    counts = np.bincount(which, minlength=bins)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_confidence = np.bincount(which, weights=confidence, minlength=bins) / counts
+        accuracy = np.bincount(which, weights=correct, minlength=bins) / counts
+    filled = counts > 0
+    ece = float(np.sum(counts[filled] * np.abs(accuracy[filled] - mean_confidence[filled])) / max(len(labels), 1))
+    return {
+        'counts': counts.tolist(),
+        'mean_confidence': np.where(filled, mean_confidence, np.nan).tolist(),
+        'accuracy': np.where(filled, accuracy, np.nan).tolist(),
+        'ece': ece,
+    }
+
+
+def confusion_matrix(probs, labels, num_classes=None):
+    """Rows are true classes, columns predicted (argmax) classes."""
+    num_classes = num_classes or np.shape(probs)[1]
+    predicted = np.argmax(probs, axis=1)
+    flat = np.asarray(labels, dtype=np.int64) * num_classes + predicted
+    return np.bincount(flat, minlength=num_classes * num_classes).reshape(num_classes, num_classes)
+
+
+def threshold_sweep(probs, class_index, thresholds=None):
+    """Fraction of cases that would be flagged for ``class_index`` at each threshold."""
+    thresholds = np.linspace(0.05, 0.95, 19) if thresholds is None else np.asarray(thresholds)
+    scores = np.sort(np.asarray(probs)[:, class_index])
+    flagged = len(scores) - np.searchsorted(scores, thresholds, side='left')
+    return {'thresholds': thresholds.tolist(), 'flagged_rate': (flagged / max(len(scores), 1)).tolist()}
+
+
+def class_drift(probs, created_at, period='M', reference=None):
+    """
+    Mean class distribution per period (``'D'``, ``'W'``, ``'M'``) and its
+    population stability index against ``reference`` (default: the first period).
+    """
+    probs = np.asarray(probs, dtype=np.float64)
+    periods, inverse = np.unique(np.asarray(created_at).astype(f'datetime64[{period}]'), return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(periods))
+    means = np.stack([
+        np.bincount(inverse, weights=probs[:, c], minlength=len(periods)) for c in range(probs.shape[1])
+    ], axis=1) / np.maximum(counts, 1)[:, None]
+    expected = np.asarray(reference, dtype=np.float64) if reference is not None else means[0]
+    eps = 1e-6
+    psi = np.sum((means - expected) * np.log((means + eps) / (expected + eps)), axis=1)
+    return {
+        'periods': [str(p) for p in periods],
+        'counts': counts.tolist(),
+        'mean_probabilities': means.tolist(),
+        'psi': psi.tolist(),
+    }
@@ -0,0 +1,181 @@
+"""
+Async variants of the I/O-bound endpoints for ASGI deployments.
+
+Under uvicorn these views never hold a thread while waiting on Gemini or
+openFDA: upstream calls go through an async HTTP client / the async Gemini
+API, database access uses Django's async ORM, and the CPU-bound model
+inference runs on a small dedicated executor.
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import google.generativeai as genai
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+
+from .models import Prediction, Medicine, Blog, BlogBookmark, Contact
+from .serializers import PredictionSerializer, PredictionCreateSerializer
+from .utils import run_inference, aget_medicine_suggestions, get_cancer_info
+from .analytics import pack_probabilities
+from . import embeddings, quality
+from .routers import replica_reads
+
+# TF already parallelises inside a forward pass; a couple of threads keep the
+# model busy without oversubscribing the CPU.
+_INFERENCE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_INFERENCE_WORKERS', 2),
+    thread_name_prefix='healytics-inference',
+)
+
+
+def async_csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt wraps the view in a sync
+    # function on Django 4.2, which would hide the coroutine from the handler.
+    view.csrf_exempt = True
+    return view
+
+
+async def _authenticate(request):
+    """Run the configured DRF authenticators; returns a user or None."""
+    for auth_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = await sync_to_async(auth_class().authenticate)(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+async def _require_user(request):
+    try:
+        user = await _authenticate(request)
+    except exceptions.APIException as e:
+        return None, JsonResponse({'detail': e.detail}, status=e.status_code)
+    if user is None:
+        return None, JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    return user, None
+
+
+def _run_inference(image_path):
+    """(quality verdict or None if unreadable, InferenceResult or None)."""
+    # Readability check, quality gate and inference all decode the image; keep them off the loop.
+    import cv2
+    img = cv2.imread(image_path)
+    if img is None:
+        return None, None
+    verdict = quality.gate(img)
+    if verdict.outcome == 'rejected':
+        return verdict, None
+    return verdict, run_inference(image_path)
+
+
+@async_csrf_exempt
+async def async_chat(request):
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        data = request.POST
+    user_message = data.get('message')
+    if not user_message:
+        return JsonResponse({'error': 'No message provided.'}, status=400)
+
+    try:
+        model = genai.GenerativeModel('gemini-1.5-flash')
+        response = await model.generate_content_async(user_message)
+        ai_reply = response.text
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    return JsonResponse({'reply': ai_reply})
+
+
+@async_csrf_exempt
+async def async_prediction(request):
+    if request.method != 'POST':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user, error = await _require_user(request)
+    if error:
+        return error
+
+    serializer = PredictionCreateSerializer(data=request.FILES)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+    image = serializer.validated_data.get('image')
+    if not image:
+        return JsonResponse({'error': 'No image provided'}, status=400)
+
+    prediction = Prediction(user=user, image=image, predicted_cancer_type='unknown', confidence_score=0.0)
+    await sync_to_async(prediction.save)()  # writes the file to MEDIA_ROOT
+    image_path = prediction.image.path
+
+    loop = asyncio.get_running_loop()
+    verdict, result = await loop.run_in_executor(_INFERENCE_EXECUTOR, _run_inference, image_path)
+    if verdict is None:
+        await prediction.adelete()
+        return JsonResponse({'error': f'Cannot read uploaded image: {image_path}'}, status=400)
+    if verdict.outcome == 'rejected':
+        await prediction.adelete()
+        return JsonResponse({'error': 'Image failed quality checks', 'quality_issues': verdict.issues}, status=400)
+    if result is None or not result.cancer_type or result.confidence is None:
+        await prediction.adelete()
+        return JsonResponse({'error': 'Failed to process image or get confidence score'}, status=400)
+    cancer_type = result.cancer_type
+
+    prediction.predicted_cancer_type = cancer_type
+    prediction.confidence_score = result.confidence
+    prediction.model_version = result.model_version
+    prediction.probabilities = pack_probabilities(result.probabilities)
+    prediction.quality_issues = verdict.issues
+    cancer_info = get_cancer_info(cancer_type)
+    prediction.symptoms = cancer_info.get('symptoms', '')
+    prediction.recommendations = cancer_info.get('recommendations', '')
+    medicines_data = await aget_medicine_suggestions(cancer_type) or []
+    await Medicine.objects.abulk_create([
+        Medicine(prediction=prediction, **medicine_data) for medicine_data in medicines_data
+    ])
+    # Saved last so updated_at (the list's Last-Modified) covers the medicines too
+    await prediction.asave()
+    await sync_to_async(embeddings.record)(prediction.id, result.model_version, result.embedding)
+
+    data = await sync_to_async(lambda: PredictionSerializer(prediction).data)()
+    return JsonResponse(data, status=201)
+
+
+async def async_stats(request):
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    try:
+        user = await _authenticate(request)
+    except exceptions.APIException:
+        user = None
+
+    with replica_reads():
+        global_stats = {
+            "total_users": await User.objects.acount(),
+            "total_blogs": await Blog.objects.filter(is_published=True).acount(),
+            "total_predictions": await Prediction.objects.acount(),
+            "total_contacts": await Contact.objects.acount(),
+        }
+
+        user_stats = None
+        if user:
+            recent = (
+                Prediction.objects.filter(user=user)
+                .order_by('-created_at')
+                .values('id', 'predicted_cancer_type', 'confidence_score', 'created_at')[:5]
+            )
+            user_stats = {
+                "total_predictions": await Prediction.objects.filter(user=user).acount(),
+                "total_bookmarks": await BlogBookmark.objects.filter(user=user).acount(),
+                "recent_predictions": [row async for row in recent],
+            }
+
+    return JsonResponse({
+        "user_stats": user_stats,
+        "global_stats": global_stats
+    })
@@ -0,0 +1,111 @@
+"""
+JWT authentication backed by a short-lived, per-process cache of users and
+profiles.
+
+simplejwt's JWTAuthentication loads the User row on every authenticated
+request. CachedJWTAuthentication keeps recently seen (active) users for
+AUTH_CACHE_TTL seconds, so a cache hit adds no queries. Saves and deletes in
+this process invalidate entries immediately (see api/signals.py); other
+workers pick changes up when the TTL expires.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import UserProfile
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    _MISSING = object()
+
+    def __init__(self, ttl, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_TTL = getattr(settings, 'AUTH_CACHE_TTL', 30)
+_MAXSIZE = getattr(settings, 'AUTH_CACHE_MAXSIZE', 10000)
+
+user_cache = TTLCache(_TTL, _MAXSIZE)
+profile_cache = TTLCache(_TTL, _MAXSIZE)
+
+# Cached "this user has no profile yet" marker, so absent profiles are not re-queried
+_NO_PROFILE = object()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        key = str(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            # Raises for unknown or inactive users, so only active users get cached
+            user = super().get_user(validated_token)
+            user_cache.set(key, user)
+        # Hand each request its own instance so per-request state never leaks
+        return copy.copy(user)
+
+
+def get_cached_profile(user):
+    """The user's UserProfile (read-only lookup, cached), or None if not created yet."""
+    key = str(user.pk)
+    profile = profile_cache.get(key)
+    if profile is None:
+        profile = UserProfile.objects.filter(user=user).first() or _NO_PROFILE
+        profile_cache.set(key, profile)
+    if profile is _NO_PROFILE:
+        return None
+    profile = copy.copy(profile)
+    profile.user = user
+    return profile
+
+
+def invalidate_user(user_id):
+    user_cache.invalidate(str(user_id))
+    profile_cache.invalidate(str(user_id))
+
+
+def invalidate_profile(user_id):
+    profile_cache.invalidate(str(user_id))
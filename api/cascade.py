@@ -0,0 +1,94 @@
+"""
+Two-stage screening cascade.
+
+With CASCADE['SCREEN_VERSION'] set to a registered (small, fast) model
+version, every image is scored by that model first. Its answer is returned
+as is when it is at least CONFIDENCE_THRESHOLD sure and the predicted class
+is not in ESCALATE_CLASSES; everything else escalates to the active full
+model. Both stages share the same preprocessed batch. If the screening
+model can't run (e.g. its version isn't registered), the full model answers.
+
+A screened answer carries the screening model's own embedding and is shadow
+evaluated like any other. Embeddings are stored per model version, so
+similar-case search compares it only with other screened predictions.
+
+Per-stage counts and latency are shared counters (see api/metrics.py),
+reported at /api/admin/cascade/ and /api/admin/metrics/.
+``manage.py evaluate_cascade`` replays a labeled folder through both models
+to pick a threshold.
+"""
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .preprocessing import average_tta
+
+_DEFAULTS = {
+    'SCREEN_VERSION': '',
+    'CONFIDENCE_THRESHOLD': 0.9,
+    'ESCALATE_CLASSES': ['melanoma', 'basal_cell_carcinoma', 'squamous_cell_carcinoma'],
+}
+
+STAGES = ('screen', 'full')
+REQUESTS = metrics.counter('healytics_cascade_requests_total', 'Predictions answered by each cascade stage',
+                           'stage', STAGES)
+LATENCY = metrics.counter('healytics_cascade_latency_microseconds_total',
+                          'Inference time spent on predictions answered by each cascade stage', 'stage', STAGES)
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'CASCADE', {}) or {})
+    return config
+
+
+def enabled():
+    return bool(get_config()['SCREEN_VERSION'])
+
+
+def screen(batch, num_variants=1, version=None):
+    """(model_version, probs (N, C), embeddings (N, D) or None) from the screening model."""
+    from .utils import predict_batch, registry
+
+    return predict_batch(batch, num_variants, loaded=registry.get(version or get_config()['SCREEN_VERSION']))
+
+
+def should_escalate(probs, config=None):
+    from .utils import CANCER_TYPES
+
+    config = config or get_config()
+    predicted = CANCER_TYPES.get(int(np.argmax(probs)), 'unknown')
+    return float(np.max(probs)) < float(config['CONFIDENCE_THRESHOLD']) or predicted in config['ESCALATE_CLASSES']
+
+
+def record(stage, latency_ms):
+    """Count one request answered at ``stage``."""
+    metrics.incr(REQUESTS, 1, stage)
+    metrics.incr(LATENCY, int(latency_ms * 1000), stage)
+
+
+def report():
+    config = get_config()
+    counts = metrics.values(REQUESTS)
+    latencies = metrics.values(LATENCY)
+    total = sum(counts.values())
+    stages = {}
+    for stage in STAGES:
+        latency_us = latencies[stage]
+        stages[stage] = {
+            'requests': counts[stage],
+            'share': round(counts[stage] / total, 4) if total else None,
+            'mean_latency_ms': round(latency_us / counts[stage] / 1000.0, 2) if counts[stage] else None,
+        }
+    return {
+        'screen_version': config['SCREEN_VERSION'] or None,
+        'confidence_threshold': config['CONFIDENCE_THRESHOLD'],
+        'escalate_classes': list(config['ESCALATE_CLASSES']),
+        'requests': total,
+        'stages': stages,
+    }
+
+
+def reset():
+    metrics.reset(REQUESTS, LATENCY)
@@ -0,0 +1,187 @@
+"""
+Server-side chat sessions with a token-budgeted context window.
+
+Each turn sends Gemini a bounded prompt rather than the whole conversation.
+The prompt holds the session's rolling summary plus the newest messages
+that fit in TOKEN_BUDGET. When the unsummarized history outgrows the
+budget, the oldest messages are folded into the summary with one extra
+Gemini call. That trims the recent window to COMPACT_TO of the budget, so
+compaction runs once every few turns rather than on every turn.
+
+Tokens are estimated at ~4 characters each, which is close enough for
+budgeting and needs no API call. Every reply records the tokens actually
+sent next to what resending the full history would have cost. The totals
+are exported through api/metrics.py.
+
+Sessions idle for longer than TTL_HOURS are deleted. Each user keeps at most
+MAX_SESSIONS_PER_USER of them, and anonymous sessions together are capped at
+MAX_ANONYMOUS_SESSIONS (the least recently active go first).
+"""
+
+from datetime import timedelta
+
+import google.generativeai as genai
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import metrics
+from .models import ChatMessage, ChatSession
+
+_DEFAULTS = {
+    'MODEL': 'gemini-1.5-flash',
+    'TOKEN_BUDGET': 2000,
+    'COMPACT_TO': 0.5,
+    'SUMMARY_TOKENS': 300,
+    'TTL_HOURS': 24 * 7,
+    'MAX_SESSIONS_PER_USER': 20,
+    'MAX_ANONYMOUS_SESSIONS': 1000,
+}
+
+PROMPT_TOKENS = metrics.counter('healytics_chat_prompt_tokens_total', 'Estimated tokens sent to Gemini by chat sessions')
+FULL_HISTORY_TOKENS = metrics.counter('healytics_chat_full_history_tokens_total',
+                                      'Estimated tokens chat sessions would have sent with their full history')
+COMPACTIONS = metrics.counter('healytics_chat_compactions_total', 'Chat history compactions into the summary')
+
+SUMMARY_PROMPT = (
+    "Summarize this conversation between a user and a skin-health assistant for the assistant's own "
+    "memory. Keep the user's concerns, symptoms, results and advice already given. At most {words} words.\n\n"
+    "{previous}{transcript}"
+)
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'CHAT_SESSIONS', {}) or {})
+    return config
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def _generate(contents, config):
+    return genai.GenerativeModel(config['MODEL']).generate_content(contents).text
+
+
+def _as_content(message):
+    return {'role': message.role, 'parts': [message.content]}
+
+
+# --- sessions ---------------------------------------------------------------
+
+def purge_expired(now=None):
+    cutoff = (now or timezone.now()) - timedelta(hours=get_config()['TTL_HOURS'])
+    return ChatSession.objects.filter(last_active_at__lt=cutoff).delete()[0]
+
+
+def create_session(user=None):
+    config = get_config()
+    purge_expired()
+    # Keep the newest cap - 1 of the owner's (or all anonymous) sessions, then add this one
+    if user is not None:
+        owned, cap = ChatSession.objects.filter(user=user), config['MAX_SESSIONS_PER_USER']
+    else:
+        owned, cap = ChatSession.objects.filter(user__isnull=True), config['MAX_ANONYMOUS_SESSIONS']
+    stale = owned.order_by('-last_active_at').values_list('id', flat=True)[cap - 1:]
+    ChatSession.objects.filter(id__in=list(stale)).delete()
+    return ChatSession.objects.create(user=user)
+
+
+def get_session(session_id, user=None):
+    """The live session, or None (missing, expired or someone else's)."""
+    session = ChatSession.objects.filter(id=session_id).first()
+    if session is None:
+        return None
+    if session.user_id is not None and (user is None or session.user_id != user.id):
+        return None
+    if session.last_active_at < timezone.now() - timedelta(hours=get_config()['TTL_HOURS']):
+        session.delete()
+        return None
+    return session
+
+
+# --- context window ---------------------------------------------------------
+
+def _compact(session, pending, config):
+    """Fold ``pending`` (oldest unsummarized messages) into the session summary."""
+    transcript = '\n'.join(f"{m.role}: {m.content}" for m in pending)
+    previous = f"Earlier summary: {session.summary}\n\n" if session.summary else ''
+    prompt = SUMMARY_PROMPT.format(words=int(config['SUMMARY_TOKENS'] * 0.75), previous=previous,
+                                   transcript=transcript)
+    session.summary = _generate(prompt, config).strip()
+    session.summary_tokens = estimate_tokens(session.summary)
+    session.summarized_through = pending[-1].id
+    session.save(update_fields=['summary', 'summary_tokens', 'summarized_through'])
+    metrics.incr(COMPACTIONS)
+
+
+def build_window(session, config=None):
+    """Gemini contents for the next reply: summary + the newest messages within the budget."""
+    config = config or get_config()
+    unsummarized = list(session.messages.filter(id__gt=session.summarized_through).order_by('id'))
+    budget = config['TOKEN_BUDGET'] - session.summary_tokens
+    if sum(m.tokens for m in unsummarized) > budget and len(unsummarized) > 1:
+        # Keep the newest messages up to COMPACT_TO of the budget (always the latest one)
+        keep, used = [], 0
+        for message in reversed(unsummarized):
+            if keep and used + message.tokens > config['TOKEN_BUDGET'] * config['COMPACT_TO']:
+                break
+            keep.append(message)
+            used += message.tokens
+        keep.reverse()
+        # Start the window on a user turn; replies before it go into the summary
+        while len(keep) > 1 and keep[0].role != ChatMessage.USER:
+            keep = keep[1:]
+        pending = unsummarized[:len(unsummarized) - len(keep)]
+        if pending:
+            _compact(session, pending, config)
+        unsummarized = keep
+
+    # Gemini expects the turns to start with the user (already so after a compaction)
+    while unsummarized and unsummarized[0].role != ChatMessage.USER:
+        unsummarized = unsummarized[1:]
+    contents = []
+    if session.summary:
+        contents.append({'role': ChatMessage.USER, 'parts': [f"Summary of our conversation so far: {session.summary}"]})
+        contents.append({'role': ChatMessage.MODEL, 'parts': ['Understood.']})
+    contents.extend(_as_content(m) for m in unsummarized)
+    return contents
+
+
+def send(session, text):
+    """Store the user's message, ask Gemini with the budgeted window, store and return the reply message."""
+    config = get_config()
+    question = ChatMessage.objects.create(
+        session=session, role=ChatMessage.USER, content=text, tokens=estimate_tokens(text))
+    try:
+        contents = build_window(session, config)
+        reply = _generate(contents, config)
+    except Exception:
+        # An unanswered turn would leave two user turns in a row, which Gemini rejects
+        question.delete()
+        raise
+
+    prompt_tokens = sum(estimate_tokens(part) for c in contents for part in c['parts'])
+    full_tokens = session.messages.aggregate(total=Sum('tokens'))['total'] or 0
+    message = ChatMessage.objects.create(
+        session=session, role=ChatMessage.MODEL, content=reply, tokens=estimate_tokens(reply),
+        prompt_tokens=prompt_tokens, full_history_tokens=full_tokens,
+    )
+    ChatSession.objects.filter(pk=session.pk).update(last_active_at=timezone.now())
+    metrics.incr(PROMPT_TOKENS, prompt_tokens)
+    metrics.incr(FULL_HISTORY_TOKENS, full_tokens)
+    return message
+
+
+def usage(session):
+    """Prompt tokens sent over the session vs. resending the full history every turn."""
+    totals = session.messages.filter(role=ChatMessage.MODEL).aggregate(
+        prompt=Sum('prompt_tokens'), full=Sum('full_history_tokens'))
+    prompt, full = totals['prompt'] or 0, totals['full'] or 0
+    return {
+        'prompt_tokens': prompt,
+        'full_history_tokens': full,
+        'saved_tokens': full - prompt,
+        'saved_ratio': round(1 - prompt / full, 4) if full else None,
+    }
@@ -0,0 +1,46 @@
+"""
+System checks for settings that only hold up in some deployments.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+
+def local_memory_cache(alias):
+    """True when cache ``alias`` is per-process (local memory or dummy)."""
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    return backend.endswith(('.LocMemCache', '.DummyCache'))
+
+
+@register()
+def check_metrics_cache(app_configs, **kwargs):
+    alias = getattr(settings, 'METRICS_CACHE', 'default')
+    if not local_memory_cache(alias):
+        return []
+    return [Warning(
+        f"METRICS_CACHE ('{alias}') is a per-process cache.",
+        hint='Each worker keeps its own counters, so /api/admin/metrics/, /quality/ and /cascade/ show '
+             'whichever worker answered. Set REDIS_URL (or point METRICS_CACHE at a shared cache).',
+        id='api.W001',
+    )]
+
+
+def static_root_problem():
+    """Why ASGI mode can't serve the precompressed build, or None."""
+    if not getattr(settings, 'ASGI_MODE', False) or settings.DEBUG:
+        return None
+    if getattr(settings, 'STATIC_DELIVERY', 'default') != 'precompressed':
+        return None
+    if not settings.STATIC_ROOT or not os.path.exists(os.path.join(settings.STATIC_ROOT, 'staticfiles.json')):
+        # The SPA shell links to hashed names that only exist after collectstatic
+        return (f"STATIC_DELIVERY='precompressed' under ASGI needs the collected files in STATIC_ROOT "
+                f"({settings.STATIC_ROOT or 'unset'}); run `python manage.py collectstatic`.")
+    return None
+
+
+@register()
+def check_asgi_static(app_configs, **kwargs):
+    problem = static_root_problem()
+    return [Error(problem, id='api.E001')] if problem else []
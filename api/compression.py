@@ -0,0 +1,120 @@
+"""
+Brotli/gzip compression of API responses.
+
+Compresses responses of COMPRESSION['TYPES'] that are at least MIN_SIZE
+bytes, preferring brotli when the client accepts it (and the Brotli package
+is installed) and falling back to gzip. Small responses aren't worth the
+CPU. Streaming responses (exports) and responses that already carry a
+Content-Encoding pass through untouched. Static files are precompressed by
+WhiteNoise (see STATIC_DELIVERY). The middleware is listed after
+WhiteNoiseMiddleware, which answers static requests before they reach it.
+Strong ETags become weak on compressed responses, as in Django's
+GZipMiddleware.
+"""
+
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+_DEFAULTS = {
+    'MIN_SIZE': 1024,
+    'TYPES': ('application/json', 'text/plain', 'text/csv', 'application/x-ndjson'),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,  # brotli's sweet spot for dynamic content; 11 is for static assets
+}
+
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'COMPRESSION', {}) or {})
+    return config
+
+
+def parse_accept_encoding(header):
+    """'gzip;q=0.5, br, *;q=0' -> {'gzip': 0.5, 'br': 1.0, '*': 0.0}."""
+    accepted = {}
+    for item in (header or '').split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def negotiate_encoding(header, candidates):
+    """The client's most preferred coding among ``candidates`` (ties: candidate order), or None."""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def choose_encoding(accept_encoding):
+    return negotiate_encoding(accept_encoding, ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',))
+
+
+def compress_response(request, response, config=None):
+    config = config or get_config()
+    if response.streaming or response.has_header('Content-Encoding') or response.status_code == 304:
+        return response
+    patch_vary_headers(response, ['Accept-Encoding'])
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    if content_type not in config['TYPES'] or len(response.content) < config['MIN_SIZE']:
+        return response
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(response.content, quality=config['BROTLI_QUALITY'])
+    else:
+        compressed = gzip.compress(response.content, compresslevel=config['GZIP_LEVEL'], mtime=0)
+    if len(compressed) >= len(response.content):
+        return response
+    response.content = compressed
+    response['Content-Length'] = str(len(compressed))
+    response['Content-Encoding'] = encoding
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    return response
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_config()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request), self.config)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return compress_response(request, response, self.config)
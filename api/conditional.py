@@ -0,0 +1,71 @@
+"""
+Conditional GET for API reads.
+
+The validators come from one cheap aggregate over the same filtered
+queryset the page is served from: the row count and the newest
+``updated_at``/``created_at``. Together with the request path, the query
+string and the user, they are hashed into an ETag. Last-Modified is the
+newest timestamp. A client sending If-None-Match or If-Modified-Since for an
+unchanged result gets a 304 before any page is fetched or serialized.
+
+Rows changed through ``QuerySet.update()`` don't move ``updated_at``, so a
+counter bumped that way (blog views) can show a stale value until the next
+real edit.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def validators(request, parts, last_modified=None):
+    """(etag, last_modified) for a response that depends on ``parts``."""
+    user_id = request.user.pk if request.user.is_authenticated else None
+    key = repr((request.path, sorted(request.GET.lists()), user_id, parts))
+    return quote_etag(hashlib.md5(key.encode('utf-8')).hexdigest()), last_modified
+
+
+def not_modified(request, etag, last_modified=None):
+    """A 304 response when the client's copy is current, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Always revalidate; the answer depends on the Authorization header
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def queryset_state(queryset, field):
+    """(row count, newest ``field``) in one aggregate query."""
+    state = queryset.order_by().aggregate(count=Count('pk'), last=Max(field))
+    return state['count'], state['last']
+
+
+class ConditionalListMixin:
+    """
+    For ListAPIViews. ``last_modified_field`` names the timestamp to track;
+    ``get_extra_state`` may add more (count, timestamp) pairs for data the
+    page depends on beyond its own rows.
+    """
+    last_modified_field = 'updated_at'
+
+    def get_extra_state(self):
+        return []
+
+    def list(self, request, *args, **kwargs):
+        states = [queryset_state(self.filter_queryset(self.get_queryset()), self.last_modified_field)]
+        states += self.get_extra_state()
+        last_modified = max((last for _, last in states if last is not None), default=None)
+        etag, last_modified = validators(request, states, last_modified)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+        return set_validators(super().list(request, *args, **kwargs), etag, last_modified)
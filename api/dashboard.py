@@ -0,0 +1,183 @@
+"""
+One-request dashboard: stats, recent predictions, bookmarks and featured
+blogs, instead of four API calls each paying for auth and a connection.
+
+Each section is a single ``values()`` query (the user's counts are one query
+with two scalar subqueries), so a cold build costs at most one query per
+requested section plus four global counts. Two cache layers sit on top:
+
+* global: site-wide counts and featured blogs, shared by everyone for
+  GLOBAL_TTL seconds;
+* per user: the user's sections, keyed by a version number that the signals
+  in api/signals.py bump whenever one of their predictions or bookmarks
+  changes, so stale entries are never read (they just expire). A fresh entry
+  is always built from the primary, so a lagging replica can't store old
+  data under the new version. The version only reaches every worker through
+  a shared cache; on a per-process cache the user part isn't cached at all.
+
+``?fields=stats,bookmarks`` limits the response to those sections.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .checks import local_memory_cache
+from .models import Blog, BlogBookmark, Contact, Prediction
+from .routers import primary_reads
+
+_DEFAULTS = {
+    'CACHE': 'default',
+    'USER_TTL': 300,
+    'GLOBAL_TTL': 60,
+    'RECENT_PREDICTIONS': 5,
+    'BOOKMARKS': 5,
+    'FEATURED_BLOGS': 3,
+}
+
+SECTIONS = ('stats', 'recent_predictions', 'bookmarks', 'featured_blogs')
+USER_SECTIONS = ('stats', 'recent_predictions', 'bookmarks')
+GLOBAL_SECTIONS = ('stats', 'featured_blogs')
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'DASHBOARD', {}) or {})
+    return config
+
+
+def parse_fields(spec):
+    """'stats,bookmarks' -> ('stats', 'bookmarks'); raises ValueError on unknown names."""
+    if not spec:
+        return SECTIONS
+    names = [name.strip() for name in spec.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown dashboard fields: {', '.join(unknown)} (choose from {', '.join(SECTIONS)})")
+    return tuple(name for name in SECTIONS if name in names)
+
+
+# --- queries ----------------------------------------------------------------
+
+def _count_of(queryset, field):
+    """Scalar subquery counting ``queryset`` rows that point at the outer row via ``field``."""
+    subquery = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(c=Count('pk')).values('c')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0))
+
+
+def _user_stats(user):
+    return User.objects.filter(pk=user.pk).values(
+        total_predictions=_count_of(Prediction.objects.all(), 'user'),
+        total_bookmarks=_count_of(BlogBookmark.objects.all(), 'user'),
+    ).first()
+
+
+def _global_stats():
+    return {
+        'total_users': User.objects.count(),
+        'total_blogs': Blog.objects.filter(is_published=True).count(),
+        'total_predictions': Prediction.objects.count(),
+        'total_contacts': Contact.objects.count(),
+    }
+
+
+def _recent_predictions(user, limit):
+    return list(
+        Prediction.objects.filter(user=user).order_by('-created_at')
+        .values('id', 'predicted_cancer_type', 'confidence_score', 'model_version', 'created_at')[:limit]
+    )
+
+
+def _bookmarks(user, limit):
+    rows = (
+        BlogBookmark.objects.filter(user=user).order_by('-created_at')
+        .values('blog_id', 'blog__title', 'blog__excerpt', 'blog__reading_time', 'created_at')[:limit]
+    )
+    return [
+        {'id': row['blog_id'], 'title': row['blog__title'], 'excerpt': row['blog__excerpt'],
+         'reading_time': row['blog__reading_time'], 'bookmarked_at': row['created_at']}
+        for row in rows
+    ]
+
+
+def _featured_blogs(limit):
+    rows = (
+        Blog.objects.filter(is_published=True).order_by('-views', '-created_at')
+        .values('id', 'title', 'excerpt', 'reading_time', 'image', 'views', 'created_at', 'author__username')[:limit]
+    )
+    return [dict(row, image=settings.MEDIA_URL + row['image'] if row['image'] else None) for row in rows]
+
+
+# --- caching ----------------------------------------------------------------
+
+def _cache():
+    return caches[get_config()['CACHE']]
+
+
+def _version_key(user_id):
+    return f'dashboard-version:{user_id}'
+
+
+def invalidate_user(user_id):
+    """Make every cached dashboard of this user stale."""
+    cache = _cache()
+    if not cache.add(_version_key(user_id), 1, None):
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:  # evicted between add() and incr()
+            cache.set(_version_key(user_id), 1, None)
+
+
+def _global_part(config):
+    cache = _cache()
+    part = cache.get('dashboard:global')
+    if part is None:
+        part = {'stats': _global_stats(), 'featured_blogs': _featured_blogs(config['FEATURED_BLOGS'])}
+        cache.set('dashboard:global', part, config['GLOBAL_TTL'])
+    return part
+
+
+def _build_user_part(user, sections, config):
+    part = {}
+    with primary_reads():
+        if 'stats' in sections:
+            part['stats'] = _user_stats(user)
+        if 'recent_predictions' in sections:
+            part['recent_predictions'] = _recent_predictions(user, config['RECENT_PREDICTIONS'])
+        if 'bookmarks' in sections:
+            part['bookmarks'] = _bookmarks(user, config['BOOKMARKS'])
+    return part
+
+
+def _user_part(user, sections, config):
+    if local_memory_cache(config['CACHE']):
+        # Other workers would never see this user's version bumps
+        return _build_user_part(user, sections, config)
+    cache = _cache()
+    version = cache.get(_version_key(user.pk)) or 0
+    key = f"dashboard:{user.pk}:{version}:{','.join(sections)}"
+    part = cache.get(key)
+    if part is None:
+        part = _build_user_part(user, sections, config)
+        cache.set(key, part, config['USER_TTL'])
+    return part
+
+
+def build(user, sections=SECTIONS):
+    """The dashboard payload for ``user`` (None for guests, who get the global sections only)."""
+    config = get_config()
+    global_part = _global_part(config) if any(s in GLOBAL_SECTIONS for s in sections) else {}
+    user_sections = tuple(s for s in sections if s in USER_SECTIONS)
+    user_part = _user_part(user, user_sections, config) if user is not None and user_sections else {}
+
+    data = {}
+    for section in sections:
+        if section == 'stats':
+            data['stats'] = {'global': global_part['stats'], 'user': user_part.get('stats')}
+        elif section == 'featured_blogs':
+            data['featured_blogs'] = global_part['featured_blogs']
+        else:
+            data[section] = user_part.get(section) if user is not None else None
+    return data
@@ -0,0 +1,250 @@
+"""
+Local openFDA drug-label index.
+
+``manage.py import_drug_labels`` streams the openFDA drug-label bulk dumps
+(https://open.fda.gov/data/downloads/, ``drug-label-*.json.zip``) into
+DrugLabel rows without ever holding a whole file in memory, upserting by
+``set_id`` and skipping labels whose ``effective_time`` hasn't changed, so
+re-importing a newer dump is an incremental refresh. The indications text
+is full-text indexed (migration 0006) and searched with the same phrase
+queries the live API gets from ``utils.MEDICINE_SEARCH_TERMS``:
+
+    SQLite:      FTS5 phrase MATCH, ranked by bm25
+    PostgreSQL:  phraseto_tsquery over a GIN index, ranked by ts_rank
+    otherwise:   icontains
+
+MEDICINE_LOOKUP picks the source for medicine suggestions: 'local' (index
+only), 'api' (live openFDA) or 'auto' (local once any labels are imported).
+"""
+
+import glob
+import gzip
+import io
+import json
+import os
+import re
+import time
+import zipfile
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from .models import DrugLabel, DrugLabelImport
+
+_RESULTS_START = re.compile(r'"results"\s*:\s*\[')
+_SEPARATORS = ' \t\r\n,'
+
+
+# --- streaming dump reader --------------------------------------------------
+
+def iter_label_records(text_stream, chunk_size=1 << 20):
+    """Yield each object of the top-level "results" array, reading ``chunk_size`` characters at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        data = text_stream.read(chunk_size)
+        eof = not data
+        buf, pos = buf[pos:] + data, 0
+
+    # openFDA's "meta" block also has a "results" key (an object), so look for the array
+    while True:
+        match = _RESULTS_START.search(buf, pos)
+        if match:
+            pos = match.end()
+            break
+        if eof:
+            return
+        pos = max(pos, len(buf) - 32)
+        fill()
+
+    while True:
+        while pos < len(buf) and buf[pos] in _SEPARATORS:
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            fill()
+            continue
+        if buf[pos] == ']':
+            return
+        try:
+            record, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()  # the object continues in the next chunk
+            continue
+        yield record
+
+
+def iter_dump_files(path):
+    """(name, text stream) for every JSON document in a .zip/.gz/.json file or a directory of them."""
+    if os.path.isdir(path):
+        for name in sorted(glob.glob(os.path.join(path, '*'))):
+            if name.endswith(('.zip', '.gz', '.json')):
+                yield from iter_dump_files(name)
+    elif path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if member.endswith('.json'):
+                    with archive.open(member) as raw:
+                        yield f'{path}:{member}', io.TextIOWrapper(raw, encoding='utf-8')
+    elif path.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as fh:
+            yield path, fh
+    else:
+        with open(path, encoding='utf-8') as fh:
+            yield path, fh
+
+
+# --- import -----------------------------------------------------------------
+
+def label_fields(record):
+    """DrugLabel field values for one openFDA record, or None if it can't be searched."""
+    from .utils import _medicine_from_label
+
+    indications = record.get('indications_and_usage')
+    if not record.get('set_id') or not indications:
+        return None
+    medicine = _medicine_from_label(record)
+    return {
+        'set_id': record['set_id'][:64],
+        'label_id': (record.get('id') or '')[:64],
+        'effective_time': (record.get('effective_time') or '')[:8],
+        'brand_name': medicine['name'][:200],
+        'generic_name': medicine['generic_name'][:200],
+        'dosage_form': medicine['dosage_form'][:100],
+        'manufacturer': medicine['manufacturer'][:200],
+        'description': medicine['description'],
+        'indications': '\n'.join(indications) if isinstance(indications, list) else str(indications),
+    }
+
+
+def _upsert(batch, run):
+    """Insert new set_ids, update ones with a newer effective_time, skip the rest."""
+    existing = {
+        set_id: (pk, effective_time)
+        for pk, set_id, effective_time in DrugLabel.objects.filter(set_id__in=batch).values_list(
+            'id', 'set_id', 'effective_time')
+    }
+    to_create, to_update = [], []
+    for set_id, fields in batch.items():
+        if set_id not in existing:
+            to_create.append(DrugLabel(**fields))
+        elif fields['effective_time'] > existing[set_id][1]:
+            to_update.append(DrugLabel(id=existing[set_id][0], **fields))
+        else:
+            run.labels_skipped += 1
+    DrugLabel.objects.bulk_create(to_create)
+    DrugLabel.objects.bulk_update(to_update, [f for f in batch[next(iter(batch))] if f != 'set_id'])
+    run.labels_created += len(to_create)
+    run.labels_updated += len(to_update)
+
+
+def import_labels(path, batch_size=500, progress=None):
+    """Import a dump (file or directory); returns the finished DrugLabelImport."""
+    run = DrugLabelImport.objects.create(source=os.path.abspath(path))
+    batch = {}
+    started = time.perf_counter()
+    for name, stream in iter_dump_files(path):
+        for record in iter_label_records(stream):
+            run.labels_seen += 1
+            fields = label_fields(record)
+            if fields is None:
+                run.labels_skipped += 1
+                continue
+            previous = batch.get(fields['set_id'])
+            if previous is None or fields['effective_time'] > previous['effective_time']:
+                batch[fields['set_id']] = fields
+            if len(batch) >= batch_size:
+                _upsert(batch, run)
+                batch = {}
+                if progress:
+                    progress(run, time.perf_counter() - started)
+    if batch:
+        _upsert(batch, run)
+    run.finished_at = timezone.now()
+    run.save()
+    return run
+
+
+def rebuild_index():
+    """Rebuild the SQLite FTS table from api_druglabel (after bulk edits made without the triggers)."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO api_druglabel_fts(api_druglabel_fts) VALUES ('rebuild')")
+            cursor.execute("INSERT INTO api_druglabel_fts(api_druglabel_fts) VALUES ('optimize')")
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('REINDEX INDEX api_druglabel_indications_fts')
+            cursor.execute('ANALYZE api_druglabel')
+
+
+# --- search -----------------------------------------------------------------
+
+def search_labels(term, limit=5):
+    """Labels whose indications contain the phrase ``term``, best match first."""
+    ids = None
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT rowid FROM api_druglabel_fts WHERE api_druglabel_fts MATCH %s '
+                    'ORDER BY bm25(api_druglabel_fts) LIMIT %s',
+                    ['"%s"' % term.replace('"', '""'), limit],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+            elif connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT id FROM api_druglabel "
+                    "WHERE to_tsvector('english', indications) @@ phraseto_tsquery('english', %s) "
+                    "ORDER BY ts_rank(to_tsvector('english', indications), phraseto_tsquery('english', %s)) DESC "
+                    "LIMIT %s",
+                    [term, term, limit],
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+    except DatabaseError as e:
+        print(f"Full-text label search unavailable, falling back to a scan: {e}")
+    if ids is None:
+        return list(DrugLabel.objects.filter(indications__icontains=term)[:limit])
+    found = DrugLabel.objects.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
+
+
+def medicine_suggestions(terms, max_suggestions, per_term=5):
+    """Medicine dicts for the first two search terms, like the live openFDA lookup."""
+    suggestions = []
+    for term in terms[:2]:
+        for label in search_labels(term, per_term):
+            suggestions.append({
+                'name': label.brand_name,
+                'generic_name': label.generic_name,
+                'dosage_form': label.dosage_form,
+                'manufacturer': label.manufacturer,
+                'description': label.description,
+                'side_effects': 'Consult your healthcare provider for complete information about side effects.',
+            })
+            if len(suggestions) >= max_suggestions:
+                return suggestions
+    return suggestions
+
+
+_local_available = {'checked_at': float('-inf'), 'value': False}
+
+
+def use_local_index():
+    mode = getattr(settings, 'MEDICINE_LOOKUP', 'auto')
+    if mode != 'auto':
+        return mode == 'local'
+    # Re-check now and then so a first import is picked up without a restart
+    now = time.monotonic()
+    if now - _local_available['checked_at'] > 60:
+        try:
+            _local_available['value'] = DrugLabel.objects.exists()
+        except DatabaseError:
+            _local_available['value'] = False
+        _local_available['checked_at'] = now
+    return _local_available['value']
@@ -0,0 +1,355 @@
+"""
+Lesion embeddings for similar-case retrieval.
+
+During inference the active model is run with a second output: the input to
+its final (classification) layer. That vector is L2-normalised and appended
+to a per-model-version store under EMBEDDINGS['DIR']::
+
+    embeddings/<model_version>/
+        meta.json       # {"dim": ...}
+        vectors.f16     # float16 rows, memory-mapped for search
+        ids.i64         # prediction id of each row
+        ivf.npz         # optional approximate index (build_embedding_index)
+        ivf-<n>.f16     # the indexed rows, reordered by cluster
+
+Search is exact (a chunked matrix product over the memmap) up to
+EMBEDDINGS['EXACT_LIMIT'] rows. Beyond that, and once an index has been
+built, only the NPROBE closest IVF clusters are scanned, plus any rows added
+since the index was built. Embeddings of different model versions are not
+comparable, so each version has its own store.
+"""
+
+import json
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still applies
+    fcntl = None
+
+_DEFAULTS = {
+    'DIR': '',
+    'EXACT_LIMIT': 50000,
+    'NPROBE': 8,
+    'CHUNK_ROWS': 65536,
+}
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'EMBEDDINGS', {}) or {})
+    if not config['DIR']:
+        config['DIR'] = os.path.join(getattr(settings, 'BASE_DIR', '.'), 'embeddings')
+    return config
+
+
+# --- model with an embedding output ----------------------------------------
+
+_dual_models = weakref.WeakKeyDictionary()
+_dual_lock = threading.Lock()
+
+
+def embedding_model(model):
+    """``model`` with outputs [penultimate features, probabilities], or None if it can't be built."""
+    with _dual_lock:
+        if model in _dual_models:
+            return _dual_models[model]
+        try:
+            import tensorflow as tf
+            dual = tf.keras.Model(model.inputs, [model.layers[-1].input, model.output])
+        except Exception as e:
+            print(f"Embeddings disabled for this model: {e}")
+            dual = None
+        _dual_models[model] = dual
+        return dual
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+@contextmanager
+def _file_lock(directory):
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'a') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _top_k(ids, scores, k, exclude_id=None):
+    """Best ``k`` (prediction_id, score) pairs; a re-scored id keeps its best row."""
+    if exclude_id is not None:
+        keep = ids != exclude_id
+        ids, scores = ids[keep], scores[keep]
+    if not len(scores) or k <= 0:
+        return []
+    m = min(len(scores), 2 * k + 8)
+    candidates = np.argpartition(-scores, m - 1)[:m] if m < len(scores) else np.arange(len(scores))
+    matches, seen = [], set()
+    for i in candidates[np.argsort(-scores[candidates])]:
+        prediction_id = int(ids[i])
+        if prediction_id in seen:
+            continue
+        seen.add(prediction_id)
+        matches.append((prediction_id, float(scores[i])))
+        if len(matches) == k:
+            break
+    return matches
+
+
+def _assign(vectors, centroids, chunk_rows):
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_rows):
+        chunk = np.asarray(vectors[start:start + chunk_rows], dtype=np.float32)
+        assignments[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def _kmeans(sample, nlist, iterations, rng, chunk_rows):
+    """Spherical k-means (cosine) on an in-memory float32 sample."""
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(sample, centroids, chunk_rows)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=nlist)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)])[filled]
+        centroids[filled] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class EmbeddingStore:
+    """Append-only float16 embeddings keyed by prediction id, for one model version."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, 'meta.json')
+        self.vectors_path = os.path.join(directory, 'vectors.f16')
+        self.ids_path = os.path.join(directory, 'ids.i64')
+        self.index_path = os.path.join(directory, 'ivf.npz')
+        self._lock = threading.Lock()
+        self._loaded = (0, None, None)
+        self._index = (None, None)
+
+    def _dim(self):
+        try:
+            with open(self.meta_path) as fh:
+                return json.load(fh)['dim']
+        except FileNotFoundError:
+            return None
+
+    def count(self):
+        try:
+            return os.path.getsize(self.ids_path) // 8
+        except FileNotFoundError:
+            return 0
+
+    def add(self, prediction_id, vector):
+        vector = _normalize(np.ravel(vector)).astype(np.float16)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, _file_lock(self.directory):
+            dim = self._dim()
+            if dim is None:
+                dim = len(vector)
+                with open(self.meta_path, 'w') as fh:
+                    json.dump({'dim': dim}, fh)
+            elif dim != len(vector):
+                raise ValueError(f"Embedding has {len(vector)} dims, store expects {dim}")
+            # The ids file is the commit point: a row only counts once its id is
+            # written, and a half-written row from a crashed writer is overwritten.
+            count = self.count()
+            mode = 'r+b' if os.path.exists(self.vectors_path) else 'wb'
+            with open(self.vectors_path, mode) as fh:
+                fh.seek(count * dim * 2)
+                fh.write(vector.tobytes())
+                fh.truncate()
+            with open(self.ids_path, 'r+b' if count else 'wb') as fh:
+                fh.seek(count * 8)
+                fh.write(np.int64(prediction_id).tobytes())
+                fh.truncate()
+
+    def load(self):
+        """(ids, vectors) as read-only memmaps over the rows written so far."""
+        count = self.count()
+        loaded_count, ids, vectors = self._loaded
+        if count == loaded_count and ids is not None:
+            return ids, vectors
+        if count == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, self._dim() or 0), dtype=np.float16)
+        dim = self._dim()
+        ids = np.memmap(self.ids_path, dtype=np.int64, mode='r', shape=(count,))
+        vectors = np.memmap(self.vectors_path, dtype=np.float16, mode='r', shape=(count, dim))
+        self._loaded = (count, ids, vectors)
+        return ids, vectors
+
+    def vector_for(self, prediction_id):
+        ids, vectors = self.load()
+        rows = np.flatnonzero(ids == prediction_id)
+        if not len(rows):
+            return None
+        return np.asarray(vectors[rows[-1]], dtype=np.float32)
+
+    # --- search -------------------------------------------------------------
+
+    def search(self, query, k=10, allowed_ids=None, exclude_id=None):
+        """Most similar (prediction_id, cosine similarity) pairs, best first."""
+        config = get_config()
+        query = _normalize(query)
+        ids, vectors = self.load()
+        if allowed_ids is not None:
+            rows = np.flatnonzero(np.isin(ids, np.asarray(list(allowed_ids), dtype=np.int64)))
+            scores = np.asarray(vectors[rows], dtype=np.float32) @ query
+            return _top_k(ids[rows], scores, k, exclude_id)
+
+        index = self.load_index()
+        if index is None or len(ids) <= config['EXACT_LIMIT']:
+            return self._exact(ids, vectors, 0, query, k, exclude_id, config['CHUNK_ROWS'])
+
+        centroids, offsets, rows, indexed, index_vectors = index
+        nprobe = min(int(config['NPROBE']), len(centroids))
+        probe = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        candidate_rows, candidate_scores = [], []
+        for cluster in probe:
+            start, end = offsets[cluster], offsets[cluster + 1]
+            if start == end:
+                continue
+            candidate_rows.append(rows[start:end])
+            candidate_scores.append(np.asarray(index_vectors[start:end], dtype=np.float32) @ query)
+        # Rows appended after the index was built are scanned exactly
+        if indexed < len(ids):
+            tail = np.arange(indexed, len(ids))
+            candidate_rows.append(tail)
+            candidate_scores.append(np.asarray(vectors[indexed:], dtype=np.float32) @ query)
+        if not candidate_rows:
+            return []
+        candidate_rows = np.concatenate(candidate_rows)
+        return _top_k(ids[candidate_rows], np.concatenate(candidate_scores), k, exclude_id)
+
+    def _exact(self, ids, vectors, start, query, k, exclude_id, chunk_rows):
+        keep = 2 * k + 8
+        candidate_rows, candidate_scores = [], []
+        for offset in range(start, len(ids), chunk_rows):
+            scores = np.asarray(vectors[offset:offset + chunk_rows], dtype=np.float32) @ query
+            if len(scores) > keep:
+                best = np.argpartition(-scores, keep - 1)[:keep]
+                scores = scores[best]
+            else:
+                best = np.arange(len(scores))
+            candidate_rows.append(best + offset)
+            candidate_scores.append(scores)
+        if not candidate_rows:
+            return []
+        candidate_rows = np.concatenate(candidate_rows)
+        return _top_k(ids[candidate_rows], np.concatenate(candidate_scores), k, exclude_id)
+
+    # --- approximate index --------------------------------------------------
+
+    def load_index(self):
+        """(centroids, offsets, rows, indexed_count, index_vectors) or None."""
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except FileNotFoundError:
+            return None
+        cached_mtime, index = self._index
+        if cached_mtime == mtime:
+            return index
+        with np.load(self.index_path) as data:
+            centroids = data['centroids']
+            offsets = data['offsets']
+            rows = data['rows']
+            indexed = int(data['count'])
+            vectors_name = str(data['vectors'])
+        dim = centroids.shape[1]
+        index_vectors = np.memmap(os.path.join(self.directory, vectors_name), dtype=np.float16,
+                                  mode='r', shape=(indexed, dim))
+        index = (centroids, offsets, rows, indexed, index_vectors)
+        self._index = (mtime, index)
+        return index
+
+    def build_index(self, nlist=None, iterations=20, sample_size=None, seed=0):
+        """Cluster the stored rows (IVF) and write a cluster-ordered copy for contiguous scans."""
+        chunk_rows = get_config()['CHUNK_ROWS']
+        ids, vectors = self.load()
+        count = len(ids)
+        if count == 0:
+            raise ValueError(f"No embeddings stored in {self.directory}")
+        nlist = min(count, nlist or max(1, int(np.sqrt(count))))
+        sample_size = min(count, sample_size or max(64 * nlist, 10000))
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, sample_size, replace=False))
+        sample = np.asarray(vectors[sample_rows], dtype=np.float32)
+        centroids = _kmeans(sample, nlist, iterations, rng, chunk_rows)
+
+        assignments = _assign(vectors, centroids, chunk_rows)
+        rows = np.argsort(assignments, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))])
+
+        vectors_name = f'ivf-{count}.f16'
+        ordered = np.memmap(os.path.join(self.directory, vectors_name), dtype=np.float16,
+                            mode='w+', shape=(count, vectors.shape[1]))
+        for start in range(0, count, chunk_rows):
+            ordered[start:start + chunk_rows] = vectors[rows[start:start + chunk_rows]]
+        ordered.flush()
+        del ordered
+
+        tmp_path = self.index_path + '.tmp.npz'
+        np.savez(tmp_path, centroids=centroids, offsets=offsets, rows=rows,
+                 count=count, vectors=vectors_name)
+        os.replace(tmp_path, self.index_path)
+        # Readers holding the previous file keep their mapping; new readers see the new index
+        for name in os.listdir(self.directory):
+            if name.startswith('ivf-') and name.endswith('.f16') and name != vectors_name:
+                os.remove(os.path.join(self.directory, name))
+        return {'rows': count, 'clusters': nlist, 'largest_cluster': int(np.diff(offsets).max())}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(model_version):
+    from .model_registry import LEGACY_VERSION
+
+    model_version = model_version or LEGACY_VERSION
+    with _stores_lock:
+        if model_version not in _stores:
+            _stores[model_version] = EmbeddingStore(os.path.join(get_config()['DIR'], model_version))
+        return _stores[model_version]
+
+
+def record(prediction_id, model_version, embedding):
+    """Store a prediction's embedding; failures are logged, never raised."""
+    if embedding is None:
+        return False
+    try:
+        get_store(model_version).add(prediction_id, embedding)
+        return True
+    except Exception as e:
+        print(f"Error storing embedding for prediction {prediction_id}: {e}")
+        return False
+
+
+def similar(prediction, k=10, allowed_ids=None):
+    """Predictions most similar to ``prediction``; None if it has no stored embedding."""
+    store = get_store(prediction.model_version)
+    vector = store.vector_for(prediction.id)
+    if vector is None:
+        return None
+    return store.search(vector, k, allowed_ids=allowed_ids, exclude_id=prediction.id)
@@ -0,0 +1,118 @@
+"""
+Streaming export of prediction history as CSV or NDJSON.
+
+Rows come from ``values().iterator(chunk_size=...)`` (a server-side cursor
+on PostgreSQL, chunked fetches on SQLite) and each chunk's medicines are
+fetched with one ``prediction_id__in`` query, so memory stays flat no
+matter how many predictions are exported. Output is yielded one encoded
+chunk at a time for StreamingHttpResponse or a file.
+"""
+
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from .analytics import CLASS_NAMES, unpack_probabilities
+from .models import Medicine, Prediction
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+DEFAULT_CHUNK_SIZE = 2000
+
+_VALUES = (
+    'id', 'user_id', 'user__username', 'created_at', 'predicted_cancer_type', 'confidence_score',
+    'model_version', 'image', 'symptoms', 'recommendations', 'probabilities',
+)
+CSV_COLUMNS = (
+    ['id', 'user_id', 'username', 'created_at', 'predicted_cancer_type', 'confidence_score',
+     'model_version', 'image', 'symptoms', 'recommendations', 'medicines']
+    + [f'p_{name}' for name in CLASS_NAMES]
+)
+
+
+def filter_predictions(queryset, user_id=None, since=None, until=None, model_version=None):
+    """Apply the export filters; ``since``/``until`` are inclusive YYYY-MM-DD strings."""
+    for value in (since, until):
+        if value and parse_date(value) is None:
+            raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+    if user_id:
+        queryset = queryset.filter(user_id=user_id)
+    if since:
+        queryset = queryset.filter(created_at__date__gte=parse_date(since))
+    if until:
+        queryset = queryset.filter(created_at__date__lte=parse_date(until))
+    if model_version:
+        queryset = queryset.filter(model_version=model_version)
+    return queryset
+
+
+def iter_prediction_chunks(queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of plain prediction dicts, medicines attached, ``chunk_size`` rows at a time."""
+    queryset = queryset if queryset is not None else Prediction.objects.all()
+    rows = queryset.order_by('id').values(*_VALUES).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield _attach_medicines(chunk)
+            chunk = []
+    if chunk:
+        yield _attach_medicines(chunk)
+
+
+def _attach_medicines(chunk):
+    medicines = {}
+    for medicine in (
+        Medicine.objects.filter(prediction_id__in=[row['id'] for row in chunk])
+        .order_by('id')
+        .values('prediction_id', 'name', 'generic_name', 'dosage_form', 'manufacturer')
+    ):
+        medicines.setdefault(medicine.pop('prediction_id'), []).append(medicine)
+    for row in chunk:
+        row['username'] = row.pop('user__username')
+        row['medicines'] = medicines.get(row['id'], [])
+        probs = unpack_probabilities(row.pop('probabilities'))
+        row['class_probabilities'] = (
+            dict(zip(CLASS_NAMES, map(float, probs))) if probs is not None and len(probs) == len(CLASS_NAMES)
+            else None
+        )
+    return chunk
+
+
+def stream_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in chunk:
+            probs = row['class_probabilities'] or {}
+            writer.writerow(
+                [row['id'], row['user_id'], row['username'], row['created_at'].isoformat(),
+                 row['predicted_cancer_type'], row['confidence_score'], row['model_version'], row['image'],
+                 row['symptoms'] or '', row['recommendations'] or '',
+                 '; '.join(medicine['name'] for medicine in row['medicines'])]
+                + [probs.get(name, '') for name in CLASS_NAMES]
+            )
+        yield buffer.getvalue()
+
+
+def stream_ndjson(chunks):
+    encoder = DjangoJSONEncoder()
+    for chunk in chunks:
+        yield ''.join(encoder.encode(row) + '\n' for row in chunk)
+
+
+def stream_export(export_format, queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    chunks = iter_prediction_chunks(queryset, chunk_size)
+    if export_format == 'csv':
+        return stream_csv(chunks)
+    if export_format == 'ndjson':
+        return stream_ndjson(chunks)
+    raise ValueError(f"Unsupported export format '{export_format}'")
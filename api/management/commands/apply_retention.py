@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api import retention
+
+
+class Command(BaseCommand):
+    help = 'Move old predictions (with images) and contact messages into the compressed archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prediction-days', type=int,
+                            help='Archive predictions older than this (default: RETENTION setting; 0 disables)')
+        parser.add_argument('--contact-days', type=int,
+                            help='Archive contact messages older than this (default: RETENTION setting; 0 disables)')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+        parser.add_argument('--vacuum', action='store_true', help='VACUUM the SQLite database afterwards')
+
+    def handle(self, *args, **options):
+        summary = retention.apply_retention(
+            prediction_days=options['prediction_days'],
+            contact_days=options['contact_days'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            vacuum=options['vacuum'],
+        )
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['predictions']} predictions and {summary['contacts']} contact messages "
+            f"into {retention.get_config()['ARCHIVE_DIR']}"))
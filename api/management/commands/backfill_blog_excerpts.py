@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Blog, blog_excerpt, blog_reading_time
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored excerpt and reading time of every blog (after bulk imports or upgrades)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        updated, last_id = 0, 0
+        while True:
+            batch = list(Blog.objects.filter(id__gt=last_id).order_by('id').only('id', 'content')[:batch_size])
+            if not batch:
+                break
+            for blog in batch:
+                blog.excerpt = blog_excerpt(blog.content)
+                blog.reading_time = blog_reading_time(blog.content)
+            Blog.objects.bulk_update(batch, ['excerpt', 'reading_time'])
+            updated += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} blogs"))
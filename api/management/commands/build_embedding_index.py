@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import embeddings
+from api.utils import registry
+
+
+class Command(BaseCommand):
+    help = 'Build the approximate (IVF) nearest-neighbour index over stored lesion embeddings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model-version', help='Store to index (default: the active version)')
+        parser.add_argument('--nlist', type=int, help='Number of clusters (default: sqrt of the row count)')
+        parser.add_argument('--iterations', type=int, default=20, help='k-means iterations')
+        parser.add_argument('--sample-size', type=int, help='Rows used to train the clusters')
+
+    def handle(self, *args, **options):
+        version = options['model_version'] or registry.read_active_version()
+        store = embeddings.get_store(version)
+        started = time.perf_counter()
+        try:
+            summary = store.build_index(
+                nlist=options['nlist'], iterations=options['iterations'], sample_size=options['sample_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {summary['rows']} embeddings for '{version}' into {summary['clusters']} clusters "
+            f"(largest {summary['largest_cluster']}) in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,129 @@
+import json
+import os
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from api import cascade
+from api.preprocessing import average_tta, preprocess_batch
+from api.utils import CANCER_TYPES, PREDICTION_TTA, registry
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+DEFAULT_THRESHOLDS = '0.5,0.6,0.7,0.8,0.85,0.9,0.95,0.99'
+
+
+def _labeled_images(folder):
+    """(path, class index) for folder/<cancer_type>/<image>."""
+    class_ids = {name: index for index, name in CANCER_TYPES.items()}
+    images = []
+    for name in sorted(os.listdir(folder)):
+        if name not in class_ids or not os.path.isdir(os.path.join(folder, name)):
+            continue
+        for filename in sorted(os.listdir(os.path.join(folder, name))):
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                images.append((os.path.join(folder, name, filename), class_ids[name]))
+    return images
+
+
+def _timed_predict(model, batch, num_variants):
+    started = time.perf_counter()
+    preds = model.predict(batch, verbose=0)
+    return average_tta(preds, num_variants)[0], (time.perf_counter() - started) * 1000.0
+
+
+def _summarize(correct, latencies, escalated, high_risk_hits, high_risk_total):
+    latencies = np.asarray(latencies)
+    return {
+        'accuracy': round(float(np.mean(correct)), 4),
+        'escalation_rate': round(float(np.mean(escalated)), 4),
+        'mean_latency_ms': round(float(latencies.mean()), 2),
+        'p95_latency_ms': round(float(np.percentile(latencies, 95)), 2),
+        'high_risk_recall': round(high_risk_hits / high_risk_total, 4) if high_risk_total else None,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare accuracy and latency of the screening cascade against the full model on a labeled folder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('folder', help='Directory with one sub-directory of images per cancer type')
+        parser.add_argument('--screen-version', help='Screening model version (default: CASCADE setting)')
+        parser.add_argument('--full-version', help='Full model version (default: the active one)')
+        parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS,
+                            help='Comma-separated confidence thresholds to evaluate')
+        parser.add_argument('--limit', type=int, help='Only the first N images')
+        parser.add_argument('--output', help='Also write the report as JSON to this file')
+
+    def handle(self, *args, **options):
+        config = cascade.get_config()
+        screen_version = options['screen_version'] or config['SCREEN_VERSION']
+        if not screen_version:
+            raise CommandError('No screening model: pass --screen-version or set CASCADE_SCREEN_VERSION')
+        try:
+            thresholds = [float(t) for t in options['thresholds'].split(',') if t.strip()]
+        except ValueError:
+            raise CommandError(f"Invalid --thresholds '{options['thresholds']}'")
+        images = _labeled_images(options['folder'])[:options['limit'] or None]
+        if not images:
+            raise CommandError(f"No labeled images under {options['folder']} "
+                               f"(expected sub-directories named {', '.join(CANCER_TYPES.values())})")
+
+        full = registry.get(options['full_version']) if options['full_version'] else registry.active()
+        screen = registry.get(screen_version)
+        self.stdout.write(f"Scoring {len(images)} images with '{screen.version}' and '{full.version}'...")
+
+        # Score every image with both models once (batch of one, like a request), then replay thresholds
+        rows = []
+        for path, label in images:
+            batch, ok = preprocess_batch([path], tta=PREDICTION_TTA)
+            if not ok[0]:
+                self.stderr.write(f"Skipping unreadable image {path}")
+                continue
+            screen_probs, screen_ms = _timed_predict(screen.model, batch, len(PREDICTION_TTA))
+            full_probs, full_ms = _timed_predict(full.model, batch, len(PREDICTION_TTA))
+            rows.append((label, screen_probs, screen_ms, full_probs, full_ms))
+
+        high_risk = {index for index, name in CANCER_TYPES.items() if name in config['ESCALATE_CLASSES']}
+        high_risk_total = sum(1 for label, *_ in rows if label in high_risk)
+
+        def evaluate(escalate):
+            correct, latencies, escalated, hits = [], [], [], 0
+            for row, up in zip(rows, escalate):
+                label, screen_probs, screen_ms, full_probs, full_ms = row
+                predicted = int(np.argmax(full_probs if up else screen_probs))
+                correct.append(predicted == label)
+                latencies.append(screen_ms + full_ms if up else screen_ms)
+                escalated.append(up)
+                hits += label in high_risk and predicted == label
+            return _summarize(correct, latencies, escalated, hits, high_risk_total)
+
+        report = {
+            'images': len(rows),
+            'screen_version': screen.version,
+            'full_version': full.version,
+            'escalate_classes': list(config['ESCALATE_CLASSES']),
+            'full_only': _summarize(
+                [int(np.argmax(r[3])) == r[0] for r in rows], [r[4] for r in rows], [True] * len(rows),
+                sum(1 for r in rows if r[0] in high_risk and int(np.argmax(r[3])) == r[0]), high_risk_total),
+            'screen_only': evaluate([False] * len(rows)),
+            'cascade': {},
+        }
+        for threshold in thresholds:
+            settings_for_threshold = dict(config, CONFIDENCE_THRESHOLD=threshold)
+            report['cascade'][str(threshold)] = evaluate(
+                [cascade.should_escalate(r[1], settings_for_threshold) for r in rows])
+
+        header = f"{'mode':<18}{'accuracy':>10}{'escalated':>11}{'mean ms':>10}{'p95 ms':>10}{'hi-risk rec':>13}"
+        self.stdout.write(header)
+        lines = [('full only', report['full_only']), ('screen only', report['screen_only'])]
+        lines += [(f'cascade @ {t}', r) for t, r in report['cascade'].items()]
+        for name, r in lines:
+            recall = '-' if r['high_risk_recall'] is None else f"{r['high_risk_recall']:.4f}"
+            self.stdout.write(f"{name:<18}{r['accuracy']:>10.4f}{r['escalation_rate']:>11.2%}"
+                              f"{r['mean_latency_ms']:>10.2f}{r['p95_latency_ms']:>10.2f}{recall:>13}")
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
@@ -0,0 +1,46 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import export
+from api.models import Prediction
+
+
+class Command(BaseCommand):
+    help = 'Stream prediction history (with medicines) to CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=sorted(export.EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', default='-', help="File to write, or '-' for stdout")
+        parser.add_argument('--user', type=int, help='Only this user id')
+        parser.add_argument('--since', help='Created on or after YYYY-MM-DD')
+        parser.add_argument('--until', help='Created on or before YYYY-MM-DD')
+        parser.add_argument('--model-version')
+        parser.add_argument('--chunk-size', type=int, default=export.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            queryset = export.filter_predictions(
+                Prediction.objects.all(),
+                user_id=options['user'],
+                since=options['since'],
+                until=options['until'],
+                model_version=options['model_version'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        out = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8', newline='')
+        written = 0
+        try:
+            for piece in export.stream_export(options['export_format'], queryset, options['chunk_size']):
+                out.write(piece)
+                written += len(piece)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if out is not sys.stdout:
+            self.stderr.write(f"Wrote {written} characters to {options['output']} "
+                              f"in {time.perf_counter() - started:.1f}s")
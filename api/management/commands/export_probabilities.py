@@ -0,0 +1,36 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from api.analytics import CLASS_NAMES, export_probabilities, load_export
+from api.models import Prediction
+
+
+class Command(BaseCommand):
+    help = 'Export stored class-probability vectors to memory-mappable .npy columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=os.path.join(settings.BASE_DIR, 'exports', 'probabilities'),
+                            help='Export directory (replaced atomically)')
+        parser.add_argument('--model-version', help='Only predictions made by this model version')
+        parser.add_argument('--since', help='Only predictions created on or after YYYY-MM-DD')
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        queryset = Prediction.objects.all()
+        if options['model_version']:
+            queryset = queryset.filter(model_version=options['model_version'])
+        if options['since']:
+            queryset = queryset.filter(created_at__date__gte=parse_date(options['since']))
+
+        started = time.perf_counter()
+        rows = export_probabilities(options['output'], queryset, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {rows} probability vectors to {options['output']} in {time.perf_counter() - started:.1f}s"))
+        if rows:
+            mean = load_export(options['output'])['probabilities'].mean(axis=0)
+            for name, value in zip(CLASS_NAMES, mean):
+                self.stdout.write(f"  {name:<24} mean p={value:.4f}")
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api import drug_labels
+from api.models import DrugLabel
+
+
+class Command(BaseCommand):
+    help = 'Import openFDA drug-label bulk dumps (.json.zip, .json.gz, .json or a directory) into the local index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Dump files or directories from open.fda.gov/data/downloads')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--rebuild-index', action='store_true',
+                            help='Rebuild and optimize the full-text index afterwards')
+
+    def handle(self, *args, **options):
+        def progress(run, elapsed):
+            self.stdout.write(f"  {run.labels_seen} labels read, {run.labels_created} new, "
+                              f"{run.labels_updated} updated ({run.labels_seen / max(elapsed, 1e-9):.0f}/s)")
+
+        for path in options['paths']:
+            self.stdout.write(f"Importing {path}...")
+            run = drug_labels.import_labels(path, batch_size=options['batch_size'], progress=progress)
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: {run.labels_created} created, {run.labels_updated} updated, "
+                f"{run.labels_skipped} skipped of {run.labels_seen}"))
+        if options['rebuild_index']:
+            drug_labels.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"{DrugLabel.objects.count()} drug labels indexed"))
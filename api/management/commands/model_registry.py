@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils import registry
+
+
+class Command(BaseCommand):
+    help = 'List, register and activate versioned model artifacts'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+        subparsers.add_parser('list', help='Show registered versions')
+        register = subparsers.add_parser('register', help='Copy a .h5/.keras file into the registry')
+        register.add_argument('path')
+        register.add_argument('version')
+        register.add_argument('--activate', action='store_true', help='Activate right after registering')
+        activate = subparsers.add_parser('activate', help='Switch running workers to a version')
+        activate.add_argument('version')
+
+    def handle(self, *args, **options):
+        action = options['action']
+        try:
+            if action == 'list':
+                for entry in registry.versions():
+                    marker = '*' if entry['active'] else ' '
+                    self.stdout.write(f"{marker} {entry['version']:<24} {entry['path']}")
+            elif action == 'register':
+                target = registry.register(options['path'], options['version'])
+                self.stdout.write(self.style.SUCCESS(f"Registered {options['version']} at {target}"))
+                if options['activate']:
+                    registry.activate(options['version'])
+                    self.stdout.write(self.style.SUCCESS(f"Activated {options['version']}"))
+            elif action == 'activate':
+                registry.activate(options['version'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Activated {options['version']}; workers switch within "
+                    f"{registry.poll_interval:g}s after loading it in the background"))
+        except (ValueError, FileNotFoundError) as e:
+            raise CommandError(str(e))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.profiling import make_profile_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed X-Healytics-Profile header value that forces profiling of a request'
+
+    def handle(self, *args, **options):
+        token = make_profile_token()
+        self.stdout.write(token)
+        self.stderr.write(f"Usage: curl -H 'X-Healytics-Profile: {token}' ...")
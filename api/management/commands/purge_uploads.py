@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete expired chunked upload sessions and their partial files'
+
+    def handle(self, *args, **options):
+        removed = uploads.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired upload sessions"))
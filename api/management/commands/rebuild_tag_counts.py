@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from api import tags
+from api.models import Blog
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-tag published blog counts (after bulk updates that bypass the save signals)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reindex', action='store_true',
+                            help='Also re-parse every Blog.tags into the tag index first')
+
+    def handle(self, *args, **options):
+        if options['reindex']:
+            reindexed = 0
+            for blog in Blog.objects.only('id', 'tags', 'is_published').iterator():
+                # Counts are rebuilt below, so the deltas here don't matter
+                tags.sync_blog(blog, blog.is_published)
+                reindexed += 1
+            self.stdout.write(f"Reindexed {reindexed} blogs")
+        count = tags.rebuild_counts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt counts for {count} tags"))
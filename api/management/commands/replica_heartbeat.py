@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from api.models import ReplicationHeartbeat
+
+
+class Command(BaseCommand):
+    help = 'Bump the replication heartbeat on the primary so workers can measure replica lag'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between beats')
+        parser.add_argument('--once', action='store_true', help='Beat once and exit (e.g. from cron)')
+
+    def handle(self, *args, **options):
+        while True:
+            ReplicationHeartbeat.objects.using(DEFAULT_DB_ALIAS).update_or_create(
+                pk=1, defaults={'beat_at': timezone.now()})
+            if options['once']:
+                return
+            time.sleep(options['interval'])
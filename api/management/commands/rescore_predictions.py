@@ -0,0 +1,163 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api import embeddings, export
+from api.analytics import pack_probabilities
+from api.models import Prediction
+from api.preprocessing import preprocess_batch
+from api.utils import PREDICTION_TTA, get_active_model, get_cancer_info, make_result, predict_batch
+
+UPDATE_FIELDS = ['predicted_cancer_type', 'confidence_score', 'model_version', 'probabilities', 'updated_at',
+                 'symptoms', 'recommendations']
+
+
+class Command(BaseCommand):
+    help = 'Re-run the active model over stored prediction images and write the new results back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Created on or after YYYY-MM-DD')
+        parser.add_argument('--until', help='Created on or before YYYY-MM-DD')
+        parser.add_argument('--user', type=int, help='Only this user id')
+        parser.add_argument('--model-version', help='Only rows scored by this model version')
+        parser.add_argument('--include-current', action='store_true',
+                            help='Also rescore rows already scored by the active version')
+        parser.add_argument('--batch-size', type=int, default=64, help='Images per forward pass / bulk_update')
+        parser.add_argument('--threads', type=int, help='Decode threads (default: min(8, CPUs))')
+        parser.add_argument('--limit', type=int, help='Stop after this many rows')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, '.rescore_checkpoint.json'),
+                            help='Progress file used to resume an interrupted run')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+        parser.add_argument('--dry-run', action='store_true', help='Score and report without writing')
+
+    def handle(self, *args, **options):
+        loaded = get_active_model()
+        filters = {key: options[key] for key in ('since', 'until', 'user', 'model_version', 'include_current')}
+        run_key = dict(filters, target_version=loaded.version, tta=list(PREDICTION_TTA))
+        checkpoint = self._load_checkpoint(options['checkpoint'], run_key, options['restart'])
+
+        try:
+            queryset = export.filter_predictions(
+                Prediction.objects.all(),
+                user_id=options['user'],
+                since=options['since'],
+                until=options['until'],
+                model_version=options['model_version'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        if not options['include_current']:
+            queryset = queryset.exclude(model_version=loaded.version)
+        queryset = queryset.filter(id__gt=checkpoint['last_id']).order_by('id')
+        total = queryset.count()
+        if options['limit']:
+            total = min(total, options['limit'])
+        self.stdout.write(f"Rescoring {total} predictions with model '{loaded.version}'"
+                          f"{' (resuming after id %d)' % checkpoint['last_id'] if checkpoint['last_id'] else ''}")
+
+        batches = self._batches(queryset, options['batch_size'], options['limit'])
+        media_root = settings.MEDIA_ROOT
+        started = time.perf_counter()
+        done = 0
+
+        # Decode the next batch on a background thread while the model runs the current one
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='rescore-decode') as prefetch:
+            def decode(batch):
+                paths = [os.path.join(media_root, name) for _, name, _ in batch]
+                return batch, preprocess_batch(paths, tta=PREDICTION_TTA, threads=options['threads'])
+
+            pending = None
+            batch = next(batches, None)
+            if batch is not None:
+                pending = prefetch.submit(decode, batch)
+            while pending is not None:
+                batch, (images, ok) = pending.result()
+                next_batch = next(batches, None)
+                pending = prefetch.submit(decode, next_batch) if next_batch is not None else None
+
+                updated, changed = self._score(batch, images, ok, loaded)
+                if not options['dry_run'] and updated:
+                    Prediction.objects.bulk_update(updated, UPDATE_FIELDS)
+                    for prediction, embedding in changed['embeddings']:
+                        embeddings.record(prediction.id, loaded.version, embedding)
+
+                done += len(batch)
+                checkpoint['last_id'] = batch[-1][0]
+                checkpoint['processed'] += len(updated)
+                checkpoint['failed'] += len(batch) - len(updated)
+                checkpoint['changed'] += changed['classes']
+                if not options['dry_run']:
+                    self._save_checkpoint(options['checkpoint'], checkpoint)
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {done}/{total} images, {done / elapsed:.1f} images/s, "
+                                  f"{checkpoint['changed']} class changes, {checkpoint['failed']} unreadable")
+
+        elapsed = time.perf_counter() - started
+        rate = done / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Rescored {checkpoint['processed']} predictions ({checkpoint['changed']} changed class, "
+            f"{checkpoint['failed']} unreadable) in {elapsed:.1f}s: {rate:.1f} images/s"))
+        if not options['dry_run'] and os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+
+    def _batches(self, queryset, batch_size, limit):
+        # Keyset pages rather than one long cursor: rows are written back while
+        # we read, and SQLite gives no isolation within a connection.
+        last_id, remaining = 0, limit
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            batch = list(queryset.filter(id__gt=last_id).values_list('id', 'image', 'predicted_cancer_type')[:size])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1][0]
+            if remaining is not None:
+                remaining -= len(batch)
+
+    def _score(self, batch, images, ok, loaded):
+        version, probs, features = predict_batch(images, len(PREDICTION_TTA), loaded=loaded)
+        updated, changed = [], {'classes': 0, 'embeddings': []}
+        for i, (prediction_id, _, previous_type) in enumerate(batch):
+            if not ok[i]:
+                continue
+            result = make_result(probs[i], version)
+            cancer_info = get_cancer_info(result.cancer_type)
+            prediction = Prediction(
+                id=prediction_id,
+                predicted_cancer_type=result.cancer_type,
+                confidence_score=result.confidence,
+                model_version=version,
+                probabilities=pack_probabilities(result.probabilities),
+                symptoms=cancer_info.get('symptoms', ''),
+                recommendations=cancer_info.get('recommendations', ''),
+                updated_at=timezone.now(),  # bulk_update skips auto_now
+            )
+            updated.append(prediction)
+            if previous_type != result.cancer_type:
+                changed['classes'] += 1
+            if features is not None:
+                changed['embeddings'].append((prediction, features[i]))
+        return updated, changed
+
+    def _load_checkpoint(self, path, run_key, restart):
+        fresh = {'run': run_key, 'last_id': 0, 'processed': 0, 'failed': 0, 'changed': 0}
+        if restart or not os.path.exists(path):
+            return fresh
+        with open(path) as fh:
+            checkpoint = json.load(fh)
+        if checkpoint.get('run') != run_key:
+            raise CommandError(f"Checkpoint {path} belongs to a different run ({checkpoint.get('run')}); "
+                               f"pass --restart to discard it")
+        return checkpoint
+
+    def _save_checkpoint(self, path, checkpoint):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(checkpoint, fh)
+        os.replace(tmp, path)
@@ -0,0 +1,38 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from api.routers import get_config
+
+
+class Command(BaseCommand):
+    help = 'Copy the SQLite primary into the SQLite replica file (local replica testing)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Keep copying every N seconds, simulating replication with that much lag')
+
+    def handle(self, *args, **options):
+        alias = get_config()['ALIAS']
+        if alias not in connections.databases:
+            raise CommandError(f"No '{alias}' database configured (set DB_REPLICA_NAME)")
+        primary, replica = connections.databases[DEFAULT_DB_ALIAS], connections.databases[alias]
+        if 'sqlite3' not in primary['ENGINE'] or 'sqlite3' not in replica['ENGINE']:
+            raise CommandError('Only SQLite replicas can be synced here; PostgreSQL replicas use streaming replication')
+
+        while True:
+            started = time.perf_counter()
+            source = sqlite3.connect(str(primary['NAME']))
+            target = sqlite3.connect(str(replica['NAME']))
+            try:
+                source.backup(target)  # consistent online snapshot
+            finally:
+                target.close()
+                source.close()
+            self.stdout.write(f"Synced {primary['NAME']} -> {replica['NAME']} "
+                              f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,75 @@
+"""
+Shared counters for operational metrics.
+
+Counters live in the cache named by METRICS_CACHE, so every worker adds to
+the same totals when that cache is shared (Redis via REDIS_URL). A
+local-memory cache only counts its own process, which makes the totals jump
+between scrapes, so ``manage.py check`` warns about it (api/checks.py).
+Each counter is declared once with its label and the finite set of label
+values it can take, which lets ``render`` list every series without having
+to enumerate cache keys. ``/api/admin/metrics/`` serves them in the
+Prometheus text format.
+"""
+
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+Counter = namedtuple('Counter', ['name', 'help', 'label', 'values'])
+
+_counters = {}
+
+
+def counter(name, help_text, label=None, values=()):
+    """Declare a counter; returns its name for use with ``incr``."""
+    _counters[name] = Counter(name, help_text, label, tuple(values))
+    return name
+
+
+def _cache():
+    return caches[getattr(settings, 'METRICS_CACHE', 'default')]
+
+
+def _series(name, value=None):
+    label = _counters[name].label
+    return f'{name}{{{label}="{value}"}}' if label else name
+
+
+def _keys(name):
+    c = _counters[name]
+    values = c.values if c.label else (None,)
+    return {value: 'metrics:' + _series(name, value) for value in values}
+
+
+def incr(name, amount=1, label_value=None):
+    """Add ``amount`` to a counter. Never raises: metrics must not break requests."""
+    try:
+        key = 'metrics:' + _series(name, label_value)
+        cache = _cache()
+        if not cache.add(key, amount, None):
+            cache.incr(key, amount)
+    except Exception as e:
+        print(f"Error recording metric {name}: {e}")
+
+
+def values(name):
+    """{label value: count} (key None for unlabeled counters)."""
+    keys = _keys(name)
+    found = _cache().get_many(list(keys.values()))
+    return {value: found.get(key, 0) for value, key in keys.items()}
+
+
+def reset(*names):
+    _cache().delete_many([key for name in names for key in _keys(name).values()])
+
+
+def render():
+    """Every declared counter in the Prometheus text exposition format."""
+    lines = []
+    for name, c in sorted(_counters.items()):
+        lines.append(f'# HELP {name} {c.help}')
+        lines.append(f'# TYPE {name} counter')
+        for value, count in values(name).items():
+            lines.append(f'{_series(name, value)} {count}')
+    return '\n'.join(lines) + '\n'
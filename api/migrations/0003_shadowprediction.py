@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_prediction_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShadowPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('primary_version', models.CharField(max_length=64)),
+                ('candidate_version', models.CharField(db_index=True, max_length=64)),
+                ('primary_class', models.CharField(max_length=50)),
+                ('candidate_class', models.CharField(max_length=50)),
+                ('primary_confidence', models.FloatField()),
+                ('candidate_confidence', models.FloatField()),
+                ('primary_latency_ms', models.FloatField()),
+                ('candidate_latency_ms', models.FloatField()),
+                ('agreed', models.BooleanField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
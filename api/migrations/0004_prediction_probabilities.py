@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_shadowprediction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='probabilities',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations, models
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE api_druglabel_fts USING fts5("
+    "indications, content='api_druglabel', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER api_druglabel_fts_ai AFTER INSERT ON api_druglabel BEGIN "
+    "INSERT INTO api_druglabel_fts(rowid, indications) VALUES (new.id, new.indications); END",
+    "CREATE TRIGGER api_druglabel_fts_ad AFTER DELETE ON api_druglabel BEGIN "
+    "INSERT INTO api_druglabel_fts(api_druglabel_fts, rowid, indications) "
+    "VALUES ('delete', old.id, old.indications); END",
+    "CREATE TRIGGER api_druglabel_fts_au AFTER UPDATE ON api_druglabel BEGIN "
+    "INSERT INTO api_druglabel_fts(api_druglabel_fts, rowid, indications) "
+    "VALUES ('delete', old.id, old.indications); "
+    "INSERT INTO api_druglabel_fts(rowid, indications) VALUES (new.id, new.indications); END",
+]
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS api_druglabel_fts_au",
+    "DROP TRIGGER IF EXISTS api_druglabel_fts_ad",
+    "DROP TRIGGER IF EXISTS api_druglabel_fts_ai",
+    "DROP TABLE IF EXISTS api_druglabel_fts",
+]
+POSTGRES_FTS = [
+    "CREATE INDEX api_druglabel_indications_fts ON api_druglabel "
+    "USING GIN (to_tsvector('english', indications))",
+]
+POSTGRES_FTS_DROP = [
+    "DROP INDEX IF EXISTS api_druglabel_indications_fts",
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_FTS, 'postgresql': POSTGRES_FTS}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_FTS_DROP, 'postgresql': POSTGRES_FTS_DROP}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_replicationheartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrugLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('set_id', models.CharField(max_length=64, unique=True)),
+                ('label_id', models.CharField(blank=True, default='', max_length=64)),
+                ('effective_time', models.CharField(blank=True, default='', max_length=8)),
+                ('brand_name', models.CharField(blank=True, default='', max_length=200)),
+                ('generic_name', models.CharField(blank=True, default='', max_length=200)),
+                ('dosage_form', models.CharField(blank=True, default='', max_length=100)),
+                ('manufacturer', models.CharField(blank=True, default='', max_length=200)),
+                ('description', models.TextField(blank=True, default='')),
+                ('indications', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DrugLabelImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('labels_seen', models.IntegerField(default=0)),
+                ('labels_created', models.IntegerField(default=0)),
+                ('labels_updated', models.IntegerField(default=0)),
+                ('labels_skipped', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
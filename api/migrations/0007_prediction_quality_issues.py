@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_druglabel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='quality_issues',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+from api.models import blog_excerpt, blog_reading_time
+
+
+def backfill(apps, schema_editor):
+    # Same helpers as Blog.save() and `manage.py backfill_blog_excerpts`
+    Blog = apps.get_model('api', 'Blog')
+    batch = []
+    for blog in Blog.objects.only('id', 'content').iterator(chunk_size=500):
+        blog.excerpt = blog_excerpt(blog.content)
+        blog.reading_time = blog_reading_time(blog.content)
+        batch.append(blog)
+        if len(batch) >= 500:
+            Blog.objects.bulk_update(batch, ['excerpt', 'reading_time'])
+            batch = []
+    if batch:
+        Blog.objects.bulk_update(batch, ['excerpt', 'reading_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_chatsession_chatmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+def copy_created_at(apps, schema_editor):
+    Prediction = apps.get_model('api', 'Prediction')
+    Prediction.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_blog_excerpt_reading_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
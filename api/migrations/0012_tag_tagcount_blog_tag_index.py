@@ -0,0 +1,72 @@
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.text import slugify
+
+
+def _parse(value):
+    # Frozen copy of api.tags.parse_tags
+    names = []
+    for raw in (value or '').split(','):
+        name = ' '.join(raw.split()).lower()[:50]
+        if name and slugify(name) and name not in names:
+            names.append(name)
+    return names
+
+
+def index_existing_tags(apps, schema_editor):
+    Blog = apps.get_model('api', 'Blog')
+    Tag = apps.get_model('api', 'Tag')
+    TagCount = apps.get_model('api', 'TagCount')
+    Through = Blog.tag_index.through
+
+    tags, slugs, links, counts = {}, set(), [], {}
+    for blog_id, value, is_published in Blog.objects.values_list('id', 'tags', 'is_published').iterator():
+        for name in _parse(value):
+            if name not in tags:
+                slug = base = slugify(name)[:55]
+                suffix = 2
+                while slug in slugs:
+                    slug = f'{base}-{suffix}'
+                    suffix += 1
+                slugs.add(slug)
+                tags[name] = Tag.objects.create(name=name, slug=slug)
+                counts[name] = 0
+            links.append(Through(blog_id=blog_id, tag_id=tags[name].pk))
+            counts[name] += int(is_published)
+    Through.objects.bulk_create(links, batch_size=1000)
+    TagCount.objects.bulk_create(
+        [TagCount(tag_id=tags[name].pk, published_count=n) for name, n in counts.items()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_prediction_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('slug', models.SlugField(max_length=60, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TagCount',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='count', serialize=False, to='api.tag')),
+                ('published_count', models.IntegerField(db_index=True, default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='tag_index',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='blogs', to='api.tag'),
+        ),
+        migrations.RunPython(index_existing_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,199 @@
+"""
+Versioned model registry with hot swapping.
+
+Layout of MODEL_REGISTRY_DIR (default ``models/registry/``)::
+
+    registry/
+        ACTIVE                  # name of the active version
+        2025-08-14/model.h5     # one .h5/.keras artifact per version directory
+        2025-09-02/model.h5
+
+Every worker re-reads ACTIVE at most every MODEL_REGISTRY_POLL_SECONDS. When it
+changes, the new version is loaded and warmed up on a background thread while
+the old one keeps serving, then swapped in with a single reference
+assignment. Without a registry the legacy MODEL_PATH file is served as
+version ``default``.
+
+Manage versions with ``python manage.py model_registry list|register|activate``.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+LEGACY_VERSION = 'default'
+ACTIVE_FILE = 'ACTIVE'
+ARTIFACT_EXTENSIONS = ('.h5', '.keras')
+
+LoadedModel = namedtuple('LoadedModel', ['version', 'model'])
+
+
+def load_keras_model(path):
+    from .runtime import configure
+    configure()  # no-op when the gunicorn post_fork hook already did it
+    import tensorflow as tf
+    # compile=False avoids issues when the original compile context isn't present
+    return tf.keras.models.load_model(path, compile=False)
+
+
+def warm_up(model):
+    """Run one dummy forward pass so the first real request doesn't pay for graph tracing."""
+    shape = tuple(d or 1 for d in (model.input_shape[1:] if model.input_shape else (224, 224, 3)))
+    model.predict(np.zeros((1,) + shape, dtype=np.float32), verbose=0)
+
+
+class ModelRegistry:
+    def __init__(self, root, legacy_path, poll_interval=10.0):
+        self.root = root
+        self.legacy_path = legacy_path
+        self.poll_interval = poll_interval
+        self._active = None
+        self._pinned = False
+        self._loading = None
+        self._last_check = 0.0
+        # Guards the small shared state only; loads run under a per-version lock
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._others = {}
+
+    # --- versions on disk ---------------------------------------------------
+
+    def artifact_path(self, version):
+        if version == LEGACY_VERSION:
+            return self.legacy_path
+        version_dir = os.path.join(self.root, version)
+        if os.path.isdir(version_dir):
+            for name in sorted(os.listdir(version_dir)):
+                if name.endswith(ARTIFACT_EXTENSIONS):
+                    return os.path.join(version_dir, name)
+        raise FileNotFoundError(f"No model artifact for version '{version}' in {version_dir}")
+
+    def read_active_version(self):
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE)) as fh:
+                return fh.read().strip() or LEGACY_VERSION
+        except FileNotFoundError:
+            return LEGACY_VERSION
+
+    def versions(self):
+        active = self.read_active_version()
+        found = []
+        if os.path.exists(self.legacy_path):
+            found.append({'version': LEGACY_VERSION, 'path': self.legacy_path})
+        if os.path.isdir(self.root):
+            for name in sorted(os.listdir(self.root)):
+                try:
+                    found.append({'version': name, 'path': self.artifact_path(name)})
+                except FileNotFoundError:
+                    continue
+        for entry in found:
+            entry['active'] = entry['version'] == active
+            entry['loaded'] = self._active is not None and self._active.version == entry['version']
+        return found
+
+    def register(self, source_path, version):
+        if version == LEGACY_VERSION or os.sep in version or version.startswith('.'):
+            raise ValueError(f"Invalid version name '{version}'")
+        if not source_path.endswith(ARTIFACT_EXTENSIONS):
+            raise ValueError(f"Model artifact must be one of {ARTIFACT_EXTENSIONS}")
+        version_dir = os.path.join(self.root, version)
+        if os.path.exists(version_dir):
+            raise ValueError(f"Version '{version}' is already registered")
+        os.makedirs(version_dir)
+        target = os.path.join(version_dir, 'model' + os.path.splitext(source_path)[1])
+        shutil.copyfile(source_path, target)
+        return target
+
+    def activate(self, version):
+        """Point ACTIVE at ``version``; running workers pick it up on their next poll."""
+        self.artifact_path(version)  # validate before switching
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix='.active-')
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(version + '\n')
+        os.replace(tmp, os.path.join(self.root, ACTIVE_FILE))
+
+    # --- loaded models ------------------------------------------------------
+
+    def _load(self, version):
+        from .embeddings import embedding_model
+
+        model = load_keras_model(self.artifact_path(version))
+        warm_up(model)
+        # Inference runs through the embedding variant; trace it before serving too
+        dual = embedding_model(model)
+        if dual is not None:
+            warm_up(dual)
+        return LoadedModel(version, model)
+
+    def pin(self, model, version='pinned'):
+        """Serve ``model`` regardless of ACTIVE (benchmarks, shells, tests)."""
+        self._active = LoadedModel(version, model)
+        self._pinned = True
+
+    def active(self):
+        loaded = self._active
+        if loaded is None:
+            version = self.read_active_version()
+            with self._load_lock(version):
+                if self._active is None:
+                    # Cold start: nothing to serve yet, so load synchronously
+                    self._active = self._load(version)
+                loaded = self._active
+        elif not self._pinned:
+            self._maybe_swap(loaded)
+        return loaded
+
+    def _maybe_swap(self, loaded):
+        now = time.monotonic()
+        if now - self._last_check < self.poll_interval:
+            return
+        self._last_check = now
+        version = self.read_active_version()
+        if version == loaded.version:
+            return
+        with self._lock:
+            if self._loading is not None:
+                return
+            self._loading = version
+        threading.Thread(target=self._swap, args=(version,), name='model-swap', daemon=True).start()
+
+    def _swap(self, version):
+        try:
+            started = time.perf_counter()
+            loaded = self._load(version)
+            previous = self._active
+            self._active = loaded
+            print(f"Model registry: switched {previous.version if previous else None} -> {version} "
+                  f"(loaded in {time.perf_counter() - started:.1f}s)")
+        except Exception as e:
+            print(f"Model registry: failed to load version '{version}': {e}")
+        finally:
+            self._loading = None
+
+    def get(self, version):
+        """A specific version (the active one or a separately cached copy)."""
+        loaded = self.active()
+        if loaded.version == version:
+            return loaded
+        cached = self._others.get(version)
+        if cached is not None:
+            return cached
+        # Only callers of this version wait for the load; requests for the
+        # active model never queue behind it
+        with self._load_lock(version):
+            cached = self._others.get(version)
+            if cached is None:
+                cached = self._load(version)
+                with self._lock:
+                    self._others[version] = cached
+        return cached
+
+    def _load_lock(self, version):
+        with self._lock:
+            return self._load_locks.setdefault(version, threading.Lock())
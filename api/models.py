@@ -1,3 +1,7 @@
+import math
+import re
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -28,9 +32,15 @@ class Prediction(models.Model):
     image = models.ImageField(upload_to='predictions/')
     predicted_cancer_type = models.CharField(max_length=50, choices=CANCER_TYPES)
     confidence_score = models.FloatField()
+    model_version = models.CharField(max_length=64, blank=True, default='')
+    # Full softmax as packed float32, in api.utils.CANCER_TYPES index order (see api/analytics.py)
+    probabilities = models.BinaryField(blank=True, null=True)
+    # Issues the quality gate flagged on the upload (see api/quality.py)
+    quality_issues = models.JSONField(blank=True, default=list)
     symptoms = models.TextField(blank=True, null=True)
     recommendations = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
@@ -38,6 +48,50 @@ class Prediction(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.predicted_cancer_type} ({self.confidence_score:.2f}%)"
 
+class UploadSession(models.Model):
+    """A chunked image upload in progress (see api/uploads.py)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    expected_sha256 = models.CharField(max_length=64, blank=True, default='')
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    prediction = models.ForeignKey(Prediction, on_delete=models.SET_NULL, blank=True, null=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+class ShadowPrediction(models.Model):
+    """A candidate model's answer recorded next to the primary's (see api/shadow.py)."""
+    primary_version = models.CharField(max_length=64)
+    candidate_version = models.CharField(max_length=64, db_index=True)
+    primary_class = models.CharField(max_length=50)
+    candidate_class = models.CharField(max_length=50)
+    primary_confidence = models.FloatField()
+    candidate_confidence = models.FloatField()
+    primary_latency_ms = models.FloatField()
+    candidate_latency_ms = models.FloatField()
+    agreed = models.BooleanField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.candidate_version} vs {self.primary_version}: {self.candidate_class}/{self.primary_class}"
+
+class ReplicationHeartbeat(models.Model):
+    """Single row bumped on the primary; how far the replica's copy trails it is the replication lag."""
+    beat_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Heartbeat at {self.beat_at:%Y-%m-%d %H:%M:%S}"
+
 class Medicine(models.Model):
     prediction = models.ForeignKey(Prediction, on_delete=models.CASCADE, related_name='medicines')
     name = models.CharField(max_length=200)
@@ -52,12 +106,64 @@ class Medicine(models.Model):
     def __str__(self):
         return self.name
 
+class DrugLabel(models.Model):
+    """
+    One openFDA drug label from a bulk dump (see api/drug_labels.py). The
+    indications text is full-text indexed: FTS5 on SQLite, GIN on PostgreSQL.
+    """
+    set_id = models.CharField(max_length=64, unique=True)
+    label_id = models.CharField(max_length=64, blank=True, default='')
+    effective_time = models.CharField(max_length=8, blank=True, default='')  # YYYYMMDD
+    brand_name = models.CharField(max_length=200, blank=True, default='')
+    generic_name = models.CharField(max_length=200, blank=True, default='')
+    dosage_form = models.CharField(max_length=100, blank=True, default='')
+    manufacturer = models.CharField(max_length=200, blank=True, default='')
+    description = models.TextField(blank=True, default='')
+    indications = models.TextField()
+
+    def __str__(self):
+        return f"{self.brand_name} ({self.generic_name})"
+
+class DrugLabelImport(models.Model):
+    source = models.CharField(max_length=500)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    labels_seen = models.IntegerField(default=0)
+    labels_created = models.IntegerField(default=0)
+    labels_updated = models.IntegerField(default=0)
+    labels_skipped = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.source} ({self.started_at:%Y-%m-%d})"
+
+EXCERPT_LENGTH = 280
+WORDS_PER_MINUTE = 200
+
+def blog_excerpt(content):
+    """Plain-text teaser for blog cards: tags stripped, cut on a word boundary."""
+    text = ' '.join(re.sub(r'<[^>]+>', ' ', content or '').split())
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    return text[:EXCERPT_LENGTH].rsplit(' ', 1)[0].rstrip('.,;:') + '…'
+
+def blog_reading_time(content):
+    """Minutes to read, at least 1."""
+    return max(1, math.ceil(len((content or '').split()) / WORDS_PER_MINUTE))
+
 class Blog(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
+    # Derived from content on save, so listings never load the full text
+    excerpt = models.CharField(max_length=300, blank=True, default='')
+    reading_time = models.PositiveSmallIntegerField(default=1)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     image = models.ImageField(upload_to='blogs/', blank=True, null=True)
     tags = models.CharField(max_length=500, blank=True, null=True)
+    # Normalized copy of `tags`, kept in sync on save (see api/tags.py); edit `tags` instead
+    tag_index = models.ManyToManyField('Tag', blank=True, editable=False, related_name='blogs')
     is_published = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -69,6 +175,33 @@ class Blog(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.excerpt = blog_excerpt(self.content)
+            self.reading_time = blog_reading_time(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'excerpt', 'reading_time'}
+        super().save(*args, **kwargs)
+
+class Tag(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    slug = models.SlugField(max_length=60, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+class TagCount(models.Model):
+    """Published blogs per tag, maintained incrementally by api/tags.py."""
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE, primary_key=True, related_name='count')
+    published_count = models.IntegerField(default=0, db_index=True)
+
+    def __str__(self):
+        return f"{self.tag.name}: {self.published_count}"
+
 class BlogBookmark(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookmarks')
     blog = models.ForeignKey(Blog, on_delete=models.CASCADE, related_name='bookmarks')
@@ -94,3 +227,37 @@ class Contact(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
+
+class ChatSession(models.Model):
+    """A server-side chatbot conversation (see api/chat.py)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True, related_name='chat_sessions')
+    # Rolling summary of every message with id <= summarized_through
+    summary = models.TextField(blank=True, default='')
+    summary_tokens = models.IntegerField(default=0)
+    summarized_through = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_active_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Chat {self.id} ({self.user or 'anonymous'})"
+
+class ChatMessage(models.Model):
+    USER = 'user'
+    MODEL = 'model'
+    ROLES = [(USER, 'User'), (MODEL, 'Model')]
+
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=10, choices=ROLES)
+    content = models.TextField()
+    tokens = models.IntegerField(default=0)
+    # Replies only: estimated tokens sent for this turn vs. resending the whole history
+    prompt_tokens = models.IntegerField(blank=True, null=True)
+    full_history_tokens = models.IntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.role}: {self.content[:50]}"
@@ -0,0 +1,121 @@
+"""
+Batched image preprocessing with optional test-time augmentation (TTA).
+
+Images are decoded and resized on a thread pool (OpenCV and PIL release the
+GIL while doing so) straight into one preallocated uint8 batch. Scaling to
+float32 in [0, 1] is then a single vectorised NumPy pass per TTA variant,
+written into one preallocated float32 buffer laid out variant-major::
+
+    out[v * n + i] == variant v of image i
+
+so the whole augmented batch goes through the model in a single forward pass
+and ``average_tta`` folds the probabilities back to one row per image.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Try to import cv2, but provide fallback if it fails
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+    print("Warning: OpenCV not available, using PIL for image processing")
+
+# Spatial transforms on (N, H, W, C) batches; rotations need square targets
+TTA_TRANSFORMS = {
+    'identity': lambda batch: batch,
+    'hflip': lambda batch: batch[:, :, ::-1],
+    'vflip': lambda batch: batch[:, ::-1],
+    'rot90': lambda batch: np.rot90(batch, k=1, axes=(1, 2)),
+    'rot180': lambda batch: batch[:, ::-1, ::-1],
+    'rot270': lambda batch: np.rot90(batch, k=3, axes=(1, 2)),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(threads):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='preprocess')
+    return _executor
+
+
+def decode_resize(image_path, target_size, out):
+    """Decode ``image_path`` as RGB, resize to ``target_size`` (W, H) and write into ``out``."""
+    if CV2_AVAILABLE:
+        img = cv2.imread(image_path)
+        if img is None:
+            raise ValueError(f"cv2.imread returned None. Bad path or unreadable image: {image_path}")
+        img = cv2.resize(img, target_size)
+        cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=out)
+    else:
+        with Image.open(image_path) as pil_img:
+            out[...] = np.asarray(pil_img.convert('RGB').resize(target_size))
+
+
+def parse_tta(spec):
+    """'hflip,vflip' -> ('identity', 'hflip', 'vflip'); identity always comes first."""
+    if not spec:
+        return ('identity',)
+    names = [s.strip() for s in (spec.split(',') if isinstance(spec, str) else spec) if s.strip()]
+    unknown = [name for name in names if name not in TTA_TRANSFORMS]
+    if unknown:
+        raise ValueError(f"Unknown TTA transforms: {', '.join(unknown)}")
+    return ('identity',) + tuple(name for name in names if name != 'identity')
+
+
+def preprocess_batch(image_paths, target_size=(224, 224), tta=None, threads=None, out=None):
+    """
+    Preprocess many images at once.
+
+    Returns ``(batch, ok)``: ``batch`` is float32 of shape
+    (len(tta) * N, H, W, 3) in [0, 1] (``out`` is used when it has that shape)
+    and ``ok`` is a bool mask of images that decoded; failed slots are zeros.
+    """
+    variants = parse_tta(tta)
+    width, height = target_size
+    if height != width and any(name.startswith('rot9') or name.startswith('rot27') for name in variants):
+        raise ValueError("90/270 degree TTA rotations need a square target size")
+
+    n = len(image_paths)
+    raw = np.zeros((n, height, width, 3), dtype=np.uint8)
+    ok = np.zeros(n, dtype=bool)
+
+    def work(i):
+        try:
+            decode_resize(image_paths[i], target_size, raw[i])
+            ok[i] = True
+        except Exception as e:
+            print(f"Error preprocessing image: {e}")
+
+    if n == 1:
+        work(0)
+    else:
+        threads = threads or min(8, os.cpu_count() or 1)
+        list(_get_executor(threads).map(work, range(n)))
+
+    shape = (len(variants) * n, height, width, 3)
+    if out is None or out.shape != shape or out.dtype != np.float32:
+        out = np.empty(shape, dtype=np.float32)
+    scale = np.float32(255.0)
+    for v, name in enumerate(variants):
+        np.divide(TTA_TRANSFORMS[name](raw), scale, out=out[v * n:(v + 1) * n])
+    return out, ok
+
+
+def average_tta(probs, num_variants):
+    """Fold (V * N, C) model outputs back to (N, C) by averaging over variants."""
+    probs = np.asarray(probs)
+    if num_variants == 1:
+        return probs
+    return probs.reshape(num_variants, -1, probs.shape[-1]).mean(axis=0)
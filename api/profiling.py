@@ -0,0 +1,290 @@
+"""
+Opt-in sampling profiler for production requests.
+
+A request is profiled when it carries a valid signed ``X-Healytics-Profile``
+header (see ``manage.py profile_token``) or, with ``PROFILING['ENABLED']``, when
+it is picked by ``PROFILING['SAMPLE_RATE']``. A single background thread
+samples the stacks of all profiled request threads every ``INTERVAL`` seconds
+and writes them in collapsed ("folded") format, ready for flamegraph.pl or
+speedscope. Requests that reach ``predict_cancer_type`` also get a TensorFlow
+op-level trace written next to the stack profile (viewable in TensorBoard).
+"""
+
+import os
+import random
+import re
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core import signing
+
+PROFILE_HEADER = 'HTTP_X_HEALYTICS_PROFILE'
+_SIGNING_SALT = 'healytics.profiling'
+
+_DEFAULTS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.0,
+    'INTERVAL': 0.005,
+    'OUTPUT_DIR': os.path.join(getattr(settings, 'BASE_DIR', '.'), 'profiles'),
+    'ALLOW_HEADER': True,
+    'HEADER_MAX_AGE': 3600,
+    'TF_TRACE': True,
+    'MAX_PROFILES': 200,
+}
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'PROFILING', {}) or {})
+    return config
+
+
+def make_profile_token():
+    """Signed value for the X-Healytics-Profile header."""
+    return signing.TimestampSigner(salt=_SIGNING_SALT).sign('profile')
+
+
+def _valid_token(value, max_age):
+    try:
+        return signing.TimestampSigner(salt=_SIGNING_SALT).unsign(value, max_age=max_age) == 'profile'
+    except signing.BadSignature:
+        return False
+
+
+def should_profile(request):
+    config = get_config()
+    token = request.META.get(PROFILE_HEADER)
+    if token and config['ALLOW_HEADER'] and _valid_token(token, config['HEADER_MAX_AGE']):
+        return True
+    return bool(config['ENABLED']) and random.random() < float(config['SAMPLE_RATE'])
+
+
+# --- Sampler -----------------------------------------------------------------
+
+class Capture:
+    """Stack samples collected for one request thread."""
+
+    def __init__(self, label):
+        self.label = label
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+        self.name = '{}-{}'.format(
+            datetime.now().strftime('%Y%m%dT%H%M%S%f'),
+            re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')[:80] or 'request',
+        )
+        self.tf_traced = False
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold(frame):
+    parts = []
+    while frame is not None:
+        parts.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+class _Sampler:
+    def __init__(self):
+        self._captures = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, capture):
+        with self._lock:
+            self._captures[capture.thread_id] = capture
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='healytics-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def remove(self, capture):
+        with self._lock:
+            self._captures.pop(capture.thread_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                captures = list(self._captures.values())
+                if not captures:
+                    self._wakeup.clear()
+            if not captures:
+                self._wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            for capture in captures:
+                frame = frames.get(capture.thread_id)
+                if frame is not None:
+                    capture.stacks[_fold(frame)] += 1
+            time.sleep(get_config()['INTERVAL'])
+
+
+_sampler = _Sampler()
+_local = threading.local()
+
+
+def current_capture():
+    return getattr(_local, 'capture', None)
+
+
+def start(label):
+    capture = Capture(label)
+    _local.capture = capture
+    _sampler.add(capture)
+    return capture
+
+
+def stop(capture):
+    """Stop sampling and write ``<name>.folded``; returns the file path."""
+    _sampler.remove(capture)
+    _local.capture = None
+    elapsed_ms = (time.perf_counter() - capture.started) * 1000.0
+    output_dir = get_config()['OUTPUT_DIR']
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{capture.name}.folded")
+    with open(path, 'w') as fh:
+        fh.write(f"# {capture.label} {elapsed_ms:.1f}ms\n")
+        for stack, count in capture.stacks.most_common():
+            fh.write(f"{stack} {count}\n")
+    _prune(output_dir, get_config()['MAX_PROFILES'])
+    return path
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None  # pruned by another thread or worker meanwhile
+
+
+def _prune(output_dir, keep):
+    stamped = [(_mtime(path), path) for path in (os.path.join(output_dir, name) for name in os.listdir(output_dir))]
+    entries = [path for mtime, path in sorted(e for e in stamped if e[0] is not None)]
+    for path in entries[:max(0, len(entries) - keep)]:
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+# --- TensorFlow op-level tracing ---------------------------------------------
+
+_tf_trace_lock = threading.Lock()
+
+
+class tf_trace:
+    """
+    Trace TF ops for the current request if it is being profiled. The TF
+    profiler is process-global, so concurrent profiled requests skip tracing
+    rather than wait.
+    """
+
+    def __enter__(self):
+        self._active = False
+        capture = current_capture()
+        if capture is None or capture.tf_traced or not get_config()['TF_TRACE']:
+            return self
+        if not _tf_trace_lock.acquire(blocking=False):
+            return self
+        try:
+            import tensorflow as tf
+            logdir = os.path.join(get_config()['OUTPUT_DIR'], f"{capture.name}_tf")
+            tf.profiler.experimental.start(logdir)
+            capture.tf_traced = True
+            self._active = True
+        except Exception as e:
+            print(f"Warning: TF profiler unavailable: {e}")
+            _tf_trace_lock.release()
+        return self
+
+    def __exit__(self, *exc):
+        if self._active:
+            try:
+                import tensorflow as tf
+                tf.profiler.experimental.stop()
+            except Exception as e:
+                print(f"Warning: failed to stop TF profiler: {e}")
+            finally:
+                _tf_trace_lock.release()
+        return False
+
+
+# --- Middleware and profile storage --------------------------------------------
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            # Async requests interleave on the event loop thread, so per-thread
+            # stack sampling cannot attribute samples to them; pass through.
+            return self.get_response(request)
+        if request.path.startswith('/api/admin/profiles') or not should_profile(request):
+            return self.get_response(request)
+        capture = start(f"{request.method} {request.path}")
+        path = None
+        try:
+            response = self.get_response(request)
+        finally:
+            # Profiling must never fail the request it samples
+            try:
+                path = stop(capture)
+            except Exception as e:
+                print(f"Error writing profile: {e}")
+        if path:
+            response['X-Healytics-Profile-Id'] = os.path.basename(path)
+        return response
+
+
+def list_profiles():
+    """All captured files (stack profiles and TF trace files) under OUTPUT_DIR."""
+    root = get_config()['OUTPUT_DIR']
+    profiles = []
+    if not os.path.isdir(root):
+        return profiles
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            profiles.append({
+                'name': name,
+                'kind': 'tensorflow' if '_tf/' in name else 'stacks',
+                'size': stat.st_size,
+                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            })
+    profiles.sort(key=lambda p: p['modified'], reverse=True)
+    return profiles
+
+
+def resolve_profile(name):
+    """Absolute path for a listed profile, or None if it is outside OUTPUT_DIR."""
+    root = os.path.realpath(get_config()['OUTPUT_DIR'])
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+    return path
@@ -0,0 +1,136 @@
+"""
+Pre-inference image quality gate.
+
+Runs on the image the views already decode for their readability check
+(BGR uint8, as returned by ``cv2.imread``) and never touches the model. The
+image is area-downscaled to at most ANALYSIS_SIZE pixels on its long side,
+then four vectorised checks run on it:
+
+    resolution  shorter side of the original below MIN_SIDE
+    blur        variance of the 4-neighbour Laplacian below BLUR_MIN_VARIANCE
+    exposure    more than CLIPPED_MAX_FRACTION of pixels near black or white,
+                or mean brightness outside BRIGHTNESS_RANGE
+    skin        fraction of pixels inside the YCrCb skin box below SKIN_MIN_RATIO
+
+QUALITY_GATE['MODE'] is 'reject' (400 with the issues), 'flag' (predict
+anyway and store the issues on the prediction) or 'off'. Outcomes and
+per-check failures are counted in api/metrics.py.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+
+from . import metrics
+from .preprocessing import CV2_AVAILABLE
+
+if CV2_AVAILABLE:
+    import cv2
+
+_DEFAULTS = {
+    'MODE': 'flag',
+    'ANALYSIS_SIZE': 256,
+    'MIN_SIDE': 128,
+    'BLUR_MIN_VARIANCE': 20.0,
+    'CLIPPED_MAX_FRACTION': 0.4,
+    'BRIGHTNESS_RANGE': (30, 230),
+    'SKIN_MIN_RATIO': 0.1,
+}
+
+CHECKS = ('resolution', 'blur', 'exposure', 'skin')
+OUTCOMES = ('passed', 'flagged', 'rejected')
+CHECKED = metrics.counter('healytics_quality_checked_total', 'Uploads by quality gate outcome', 'outcome', OUTCOMES)
+FAILURES = metrics.counter('healytics_quality_failures_total', 'Uploads failing each quality check', 'check', CHECKS)
+
+Verdict = namedtuple('Verdict', ['outcome', 'issues'])
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'QUALITY_GATE', {}) or {})
+    return config
+
+
+def _downscale(img, size):
+    h, w = img.shape[:2]
+    scale = size / max(h, w)
+    if scale >= 1:
+        return img
+    target = (max(1, round(w * scale)), max(1, round(h * scale)))
+    if CV2_AVAILABLE:
+        return cv2.resize(img, target, interpolation=cv2.INTER_AREA)
+    step = int(np.ceil(1 / scale))
+    return img[::step, ::step]
+
+
+def _issue(check, message, value, threshold):
+    return {'check': check, 'message': message, 'value': round(float(value), 4), 'threshold': threshold}
+
+
+def inspect(img, config=None):
+    """Quality issues for a BGR uint8 image (empty list when it looks usable)."""
+    config = config or get_config()
+    issues = []
+    h, w = img.shape[:2]
+    if min(h, w) < config['MIN_SIDE']:
+        issues.append(_issue('resolution', f'Image is too small ({w}x{h}); use a closer, sharper photo.',
+                             min(h, w), config['MIN_SIDE']))
+
+    small = _downscale(img, config['ANALYSIS_SIZE']).astype(np.float32)
+    b, g, r = small[..., 0], small[..., 1], small[..., 2]
+    gray = 0.299 * r + 0.587 * g + 0.114 * b
+
+    laplacian = gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:] - 4.0 * gray[1:-1, 1:-1]
+    blur = laplacian.var() if laplacian.size else 0.0
+    if blur < config['BLUR_MIN_VARIANCE']:
+        issues.append(_issue('blur', 'Image looks blurry; hold the camera steady and focus on the lesion.',
+                             blur, config['BLUR_MIN_VARIANCE']))
+
+    clipped = np.count_nonzero((gray <= 10) | (gray >= 245)) / gray.size
+    low, high = config['BRIGHTNESS_RANGE']
+    brightness = gray.mean()
+    if clipped > config['CLIPPED_MAX_FRACTION']:
+        issues.append(_issue('exposure', 'Image is badly over- or underexposed; retake it in even light.',
+                             clipped, config['CLIPPED_MAX_FRACTION']))
+    elif not low <= brightness <= high:
+        issues.append(_issue('exposure', 'Image is too dark or too bright; retake it in even light.',
+                             brightness, [low, high]))
+
+    cr = (r - gray) * 0.713 + 128.0
+    cb = (b - gray) * 0.564 + 128.0
+    skin = np.count_nonzero((cr >= 133) & (cr <= 173) & (cb >= 77) & (cb <= 127)) / gray.size
+    if skin < config['SKIN_MIN_RATIO']:
+        issues.append(_issue('skin', 'Very little skin is visible; photograph the affected area up close.',
+                             skin, config['SKIN_MIN_RATIO']))
+    return issues
+
+
+def gate(img):
+    """Verdict(outcome, issues) for an upload under the configured mode; counts the outcome."""
+    config = get_config()
+    if config['MODE'] == 'off':
+        return Verdict('passed', [])
+    try:
+        issues = inspect(img, config)
+    except Exception as e:
+        print(f"Error checking image quality: {e}")
+        return Verdict('passed', [])
+    outcome = 'passed' if not issues else ('rejected' if config['MODE'] == 'reject' else 'flagged')
+    metrics.incr(CHECKED, 1, outcome)
+    for issue in issues:
+        metrics.incr(FAILURES, 1, issue['check'])
+    return Verdict(outcome, issues)
+
+
+def report():
+    checked = metrics.values(CHECKED)
+    total = sum(checked.values())
+    return {
+        'mode': get_config()['MODE'],
+        'checked': total,
+        'outcomes': checked,
+        'rejection_rate': round(checked['rejected'] / total, 4) if total else None,
+        'flag_rate': round(checked['flagged'] / total, 4) if total else None,
+        'failures_by_check': metrics.values(FAILURES),
+    }
@@ -0,0 +1,233 @@
+"""
+Retention and archival tiering.
+
+``apply_retention`` moves predictions (with their medicines) and contact
+messages older than the configured number of days out of the main database
+into monthly SQLite partitions under RETENTION['ARCHIVE_DIR']::
+
+    archive/
+        index.sqlite3                   # (kind, object_id) -> partition, owner
+        predictions-2024-05.sqlite3     # records(id, user_id, created_at, image, payload)
+        contacts-2024-05.sqlite3
+        media/predictions/...           # cold copies of the uploaded images
+
+Payloads are zlib-compressed JSON; for predictions it is the same shape the
+API returns, so ``get_archived_prediction`` can answer detail lookups once
+the hot row is gone. Each batch is written to the archive and committed
+before the hot rows are deleted, so an interrupted run just re-archives the
+same rows next time.
+"""
+
+import json
+import os
+import pathlib
+import shutil
+import sqlite3
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Contact, Prediction
+
+_DEFAULTS = {
+    'ARCHIVE_DIR': '',
+    'COLD_MEDIA_DIR': '',
+    'PREDICTION_DAYS': 0,
+    'CONTACT_DAYS': 0,
+    'BATCH_SIZE': 500,
+}
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'RETENTION', {}) or {})
+    if not config['ARCHIVE_DIR']:
+        config['ARCHIVE_DIR'] = os.path.join(getattr(settings, 'BASE_DIR', '.'), 'archive')
+    if not config['COLD_MEDIA_DIR']:
+        config['COLD_MEDIA_DIR'] = os.path.join(config['ARCHIVE_DIR'], 'media')
+    return config
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+def _connect_readonly(path):
+    # Reads skip the schema and journal-mode setup the writers do
+    return sqlite3.connect(pathlib.Path(path).resolve().as_uri() + '?mode=ro', uri=True, timeout=30)
+
+
+def _index(archive_dir):
+    conn = _connect(os.path.join(archive_dir, 'index.sqlite3'))
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS archived ('
+        ' kind TEXT NOT NULL, object_id INTEGER NOT NULL, user_id INTEGER,'
+        ' partition TEXT NOT NULL, created_at TEXT NOT NULL,'
+        ' PRIMARY KEY (kind, object_id))'
+    )
+    return conn
+
+
+def _partition(archive_dir, name):
+    conn = _connect(os.path.join(archive_dir, name + '.sqlite3'))
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS records ('
+        ' id INTEGER PRIMARY KEY, user_id INTEGER, created_at TEXT NOT NULL,'
+        ' image TEXT, payload BLOB NOT NULL)'
+    )
+    return conn
+
+
+def _pack(payload):
+    return zlib.compress(json.dumps(payload, default=str, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+def _write(archive_dir, kind, records):
+    """records: (id, user_id, created_at, image, payload) tuples. Commits partitions, then the index."""
+    by_partition = {}
+    for record in records:
+        by_partition.setdefault(f"{kind}s-{record[2]:%Y-%m}", []).append(record)
+    os.makedirs(archive_dir, exist_ok=True)
+    for name, rows in by_partition.items():
+        conn = _partition(archive_dir, name)
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO records (id, user_id, created_at, image, payload) VALUES (?, ?, ?, ?, ?)',
+                    [(pk, user_id, created_at.isoformat(), image, _pack(payload))
+                     for pk, user_id, created_at, image, payload in rows],
+                )
+        finally:
+            conn.close()
+    conn = _index(archive_dir)
+    try:
+        with conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO archived (kind, object_id, user_id, partition, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(kind, pk, user_id, name, created_at.isoformat())
+                 for name, rows in by_partition.items() for pk, user_id, created_at, _, _ in rows],
+            )
+    finally:
+        conn.close()
+
+
+def _move_to_cold(name, cold_dir):
+    """Move a media file (relative name) under ``cold_dir``; returns the cold name or None."""
+    if not name:
+        return None
+    source = os.path.join(settings.MEDIA_ROOT, name)
+    target = os.path.join(cold_dir, name)
+    if os.path.exists(source):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(source, target)
+    return name if os.path.exists(target) else None
+
+
+def archive_predictions(cutoff, batch_size=500, dry_run=False):
+    """Archive predictions created before ``cutoff``. Returns the number archived."""
+    from .serializers import PredictionSerializer
+
+    config = get_config()
+    queryset = (
+        Prediction.objects.filter(created_at__lt=cutoff)
+        .select_related('user')
+        .prefetch_related('medicines')
+        .order_by('id')
+    )
+    if dry_run:
+        return queryset.count()
+    archived = 0
+    while True:
+        batch = list(queryset[:batch_size])
+        if not batch:
+            return archived
+        records = []
+        for prediction in batch:
+            payload = dict(PredictionSerializer(prediction).data)
+            payload['image'] = None
+            payload['archived'] = True
+            records.append((prediction.id, prediction.user_id, prediction.created_at, prediction.image.name, payload))
+        _write(config['ARCHIVE_DIR'], 'prediction', records)
+        for prediction in batch:
+            _move_to_cold(prediction.image.name, config['COLD_MEDIA_DIR'])
+        Prediction.objects.filter(id__in=[p.id for p in batch]).delete()  # cascades to medicines
+        archived += len(batch)
+
+
+def archive_contacts(cutoff, batch_size=500, dry_run=False):
+    config = get_config()
+    queryset = Contact.objects.filter(created_at__lt=cutoff).order_by('id')
+    if dry_run:
+        return queryset.count()
+    archived = 0
+    while True:
+        batch = list(queryset.values()[:batch_size])
+        if not batch:
+            return archived
+        _write(config['ARCHIVE_DIR'], 'contact',
+               [(row['id'], None, row['created_at'], None, row) for row in batch])
+        Contact.objects.filter(id__in=[row['id'] for row in batch]).delete()
+        archived += len(batch)
+
+
+def apply_retention(prediction_days=None, contact_days=None, batch_size=None, dry_run=False, vacuum=False):
+    """Run the configured policies; returns {'predictions': n, 'contacts': n}."""
+    config = get_config()
+    prediction_days = config['PREDICTION_DAYS'] if prediction_days is None else prediction_days
+    contact_days = config['CONTACT_DAYS'] if contact_days is None else contact_days
+    batch_size = batch_size or config['BATCH_SIZE']
+    now = timezone.now()
+    summary = {'predictions': 0, 'contacts': 0}
+    if prediction_days:
+        summary['predictions'] = archive_predictions(now - timedelta(days=prediction_days), batch_size, dry_run)
+    if contact_days:
+        summary['contacts'] = archive_contacts(now - timedelta(days=contact_days), batch_size, dry_run)
+    if vacuum and not dry_run and connection.vendor == 'sqlite' and any(summary.values()):
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
+    return summary
+
+
+def _lookup(kind, object_id):
+    archive_dir = get_config()['ARCHIVE_DIR']
+    index_path = os.path.join(archive_dir, 'index.sqlite3')
+    if not os.path.exists(index_path):
+        return None
+    conn = _connect_readonly(index_path)
+    try:
+        row = conn.execute('SELECT partition, user_id FROM archived WHERE kind = ? AND object_id = ?',
+                           (kind, object_id)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    partition_path = os.path.join(archive_dir, row[0] + '.sqlite3')
+    if not os.path.exists(partition_path):
+        return None
+    conn = _connect_readonly(partition_path)
+    try:
+        record = conn.execute('SELECT payload FROM records WHERE id = ?', (object_id,)).fetchone()
+    finally:
+        conn.close()
+    return (row[1], _unpack(record[0])) if record else None
+
+
+def get_archived_prediction(prediction_id, user_id=None):
+    """The archived API representation of a prediction, or None (also when owned by someone else)."""
+    found = _lookup('prediction', prediction_id)
+    if found is None:
+        return None
+    owner_id, payload = found
+    if user_id is not None and owner_id != user_id:
+        return None
+    return payload
+
@@ -0,0 +1,216 @@
+"""
+Read-replica routing.
+
+Views that opt in with ``ReplicaReadMixin`` run their GETs with replica reads
+enabled; ``ReplicaRouter`` then sends their queries to REPLICA['ALIAS'] when
+that database is configured and healthy. Everything else, and every write,
+goes to ``default``.
+
+* Read-your-writes: ``ReplicaStickinessMiddleware`` remembers (in the cache)
+  clients that just made a successful unsafe request and pins their reads to
+  the primary for STICKY_SECONDS. Clients are identified by their
+  Authorization header and their remote address. With DEBUG off the
+  middleware refuses to start on a per-process cache: with several workers,
+  a read served by another worker than the write would go to the lagging
+  replica. Set REDIS_URL.
+* Lag: ``manage.py replica_heartbeat`` bumps a ReplicationHeartbeat row on the
+  primary every second. Each process compares the primary's and the
+  replica's copy of that row at most every LAG_CHECK_SECONDS, and stops
+  using the replica while the lag exceeds MAX_LAG_SECONDS (or the row is
+  missing, or the replica is unreachable).
+"""
+
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from rest_framework.permissions import SAFE_METHODS
+
+from .checks import local_memory_cache
+
+_DEFAULTS = {
+    'ALIAS': 'replica',
+    'STICKY_SECONDS': 5,
+    'MAX_LAG_SECONDS': 10,
+    'LAG_CHECK_SECONDS': 2,
+    'CACHE': 'default',
+}
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'REPLICA', {}) or {})
+    return config
+
+
+def replica_configured():
+    return get_config()['ALIAS'] in settings.DATABASES
+
+
+_replica_reads = ContextVar('healytics_replica_reads', default=False)
+_pinned_to_primary = ContextVar('healytics_pinned_to_primary', default=False)
+
+
+@contextmanager
+def replica_reads():
+    """Allow reads inside this block to be routed to the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Send reads inside this block to the primary, even within a replica-read view."""
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+class ReplicaReadMixin:
+    """For DRF views whose safe requests may be served from the read replica."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
+# --- lag monitoring ---------------------------------------------------------
+
+def measure_lag(alias):
+    """Seconds the replica's heartbeat trails the primary's, or None if unknown."""
+    from .models import ReplicationHeartbeat
+
+    try:
+        primary = ReplicationHeartbeat.objects.using(DEFAULT_DB_ALIAS).values_list('beat_at', flat=True).first()
+        replica = ReplicationHeartbeat.objects.using(alias).values_list('beat_at', flat=True).first()
+    except DatabaseError:
+        return None
+    if primary is None or replica is None:
+        return None
+    return max(0.0, (primary - replica).total_seconds())
+
+
+class LagMonitor:
+    def __init__(self):
+        self.lag = None
+        self.healthy = False
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def is_healthy(self, alias, config):
+        now = time.monotonic()
+        if now - self._checked_at < config['LAG_CHECK_SECONDS']:
+            return self.healthy
+        # One thread refreshes; the others keep using the previous answer
+        if not self._lock.acquire(blocking=False):
+            return self.healthy
+        try:
+            self._checked_at = now
+            self.lag = measure_lag(alias)
+            healthy = self.lag is not None and self.lag <= config['MAX_LAG_SECONDS']
+            if healthy != self.healthy:
+                print(f"Read replica '{alias}' {'in use' if healthy else 'bypassed'} (lag: {self.lag})")
+            self.healthy = healthy
+        finally:
+            self._lock.release()
+        return self.healthy
+
+
+lag_monitor = LagMonitor()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or _pinned_to_primary.get():
+            return None
+        config = get_config()
+        alias = config['ALIAS']
+        if alias not in settings.DATABASES or model._meta.label == 'api.ReplicationHeartbeat':
+            return None
+        return alias if lag_monitor.is_healthy(alias, config) else None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so instances read from the replica are still saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # the replica holds the same data as the primary
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema from replication (or sync_replica), never from migrate
+        return db != get_config()['ALIAS']
+
+
+# --- read-your-writes -------------------------------------------------------
+
+def _client_keys(request):
+    # Both, so a client that writes before it has a token (register, login)
+    # still reads its own writes once it sends one.
+    identities = [f"ip:{request.META.get('REMOTE_ADDR', '')}"]
+    if request.META.get('HTTP_AUTHORIZATION'):
+        identities.append(request.META['HTTP_AUTHORIZATION'])
+    return ['replica-sticky:' + hashlib.sha1(identity.encode('utf-8')).hexdigest() for identity in identities]
+
+
+class ReplicaStickinessMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = replica_configured()
+        cache_alias = get_config()['CACHE']
+        if self.enabled and not settings.DEBUG and local_memory_cache(cache_alias):
+            raise ImproperlyConfigured(
+                f"REPLICA['CACHE'] ('{cache_alias}') is a per-process cache, so read-your-writes would only hold "
+                f"within one worker. Set REDIS_URL or point REPLICA['CACHE'] at a shared cache.")
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        token = self._pin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        self._remember(request, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        token = self._pin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pinned_to_primary.reset(token)
+        self._remember(request, response)
+        return response
+
+    def _pin(self, request):
+        config = get_config()
+        pinned = request.method in SAFE_METHODS and bool(caches[config['CACHE']].get_many(_client_keys(request)))
+        return _pinned_to_primary.set(pinned)
+
+    def _remember(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            config = get_config()
+            caches[config['CACHE']].set_many(dict.fromkeys(_client_keys(request), 1), config['STICKY_SECONDS'])
@@ -0,0 +1,130 @@
+"""
+CPU-aware TensorFlow threading for inference workers.
+
+By default every worker's TensorFlow sizes its thread pools to the whole
+machine, so N gunicorn workers on one box run N times too many compute
+threads and latency collapses under load. ``configure`` gives each worker a
+share of the CPUs it may actually use instead:
+
+* available CPUs = the process affinity mask, capped by the cgroup CPU quota
+  (cgroup v2 ``cpu.max`` or v1 ``cpu.cfs_quota_us``), as in containers;
+* intra-op threads = available CPUs // workers (at least 1), inter-op
+  threads = 1, or 2 when a worker has more than 4 threads;
+* with PIN_CPUS, worker slot i is bound to its own disjoint block of CPUs.
+
+INFERENCE_RUNTIME overrides any of these. ``configure`` must run before
+TensorFlow executes its first op. gunicorn.conf.py calls it from
+``post_fork`` with the worker's slot, and model loading calls it as a
+fallback for other servers. Only the first call has an effect.
+"""
+
+import math
+import os
+from collections import namedtuple
+
+_DEFAULTS = {
+    'WORKERS': 0,  # 0: $WEB_CONCURRENCY, else 1
+    'INTRA_OP_THREADS': 0,  # 0: derived from the CPU share
+    'INTER_OP_THREADS': 0,
+    'PIN_CPUS': False,
+}
+
+RuntimePlan = namedtuple('RuntimePlan', ['cpus', 'workers', 'intra_op_threads', 'inter_op_threads', 'cpuset'])
+
+_applied = None
+
+
+def get_config():
+    from django.conf import settings
+
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'INFERENCE_RUNTIME', {}) or {})
+    return config
+
+
+def _read(path):
+    try:
+        with open(path) as fh:
+            return fh.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit():
+    """CPUs allowed by the cgroup quota (may be fractional), or None when unlimited."""
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')  # v2: "<quota> <period>" or "max <period>"
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+    quota = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')  # v1
+    period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def affinity_cpus():
+    """CPU ids this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def available_cpus():
+    cpus = len(affinity_cpus())
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+
+def plan(worker_slot=None, workers=None, config=None):
+    """The thread counts (and CPU set, when pinning) for one worker."""
+    config = config or get_config()
+    workers = workers or config['WORKERS'] or int(os.environ.get('WEB_CONCURRENCY') or 1)
+    cpus = available_cpus()
+    share = max(1, cpus // workers)
+    intra = config['INTRA_OP_THREADS'] or share
+    inter = config['INTER_OP_THREADS'] or (2 if intra > 4 else 1)
+
+    cpuset = None
+    if config['PIN_CPUS'] and worker_slot is not None:
+        # Pin within the affinity mask, never to more CPUs than the quota allows
+        allowed = affinity_cpus()[:cpus]
+        slot = worker_slot % workers
+        if len(allowed) >= workers:
+            cpuset = allowed[slot * share:(slot + 1) * share]
+        else:
+            cpuset = [allowed[slot % len(allowed)]]
+    return RuntimePlan(cpus, workers, intra, inter, cpuset)
+
+
+def configure(worker_slot=None, workers=None, config=None):
+    """Apply the plan to this process once; later calls return the applied plan."""
+    global _applied
+    if _applied is not None:
+        return _applied
+    runtime = plan(worker_slot, workers, config)
+    if runtime.cpuset and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, runtime.cpuset)
+    # oneDNN/OpenMP read these when TensorFlow initialises
+    os.environ.setdefault('OMP_NUM_THREADS', str(runtime.intra_op_threads))
+    os.environ.setdefault('TF_NUM_INTRAOP_THREADS', str(runtime.intra_op_threads))
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', str(runtime.inter_op_threads))
+    try:
+        import tensorflow as tf
+
+        tf.config.threading.set_intra_op_parallelism_threads(runtime.intra_op_threads)
+        tf.config.threading.set_inter_op_parallelism_threads(runtime.inter_op_threads)
+    except ImportError:
+        pass
+    except RuntimeError as e:
+        # TensorFlow already ran an op in this process; the pools are fixed now
+        print(f"Warning: could not set TensorFlow threads: {e}")
+    _applied = runtime
+    print(f"Inference runtime: {runtime.intra_op_threads} intra-op / {runtime.inter_op_threads} inter-op threads "
+          f"({runtime.cpus} CPUs, {runtime.workers} workers"
+          f"{', pinned to %s' % runtime.cpuset if runtime.cpuset else ''})")
+    return runtime
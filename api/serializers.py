@@ -4,6 +4,7 @@ from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.core.validators import EmailValidator
 from .models import UserProfile, Prediction, Medicine, Blog, BlogBookmark, Contact
+from .analytics import probabilities_dict
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -66,10 +67,14 @@ class MedicineSerializer(serializers.ModelSerializer):
 class PredictionSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     medicines = MedicineSerializer(many=True, read_only=True)
+    class_probabilities = serializers.SerializerMethodField()
     
     class Meta:
         model = Prediction
-        fields = '__all__'
+        exclude = ['probabilities']
+
+    def get_class_probabilities(self, obj):
+        return probabilities_dict(obj.probabilities)
 
 class PredictionCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -85,23 +90,41 @@ class BlogSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_is_bookmarked(self, obj):
+        # List views annotate this with an Exists() subquery instead of one query per blog
+        bookmarked = getattr(obj, 'bookmarked', None)
+        if bookmarked is not None:
+            return bookmarked
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return BlogBookmark.objects.filter(user=request.user, blog=obj).exists()
         return False
 
+class BlogListSerializer(BlogSerializer):
+    """Card fields only; the full content comes from the detail endpoint."""
+    class Meta:
+        model = Blog
+        fields = ['id', 'title', 'excerpt', 'reading_time', 'author', 'image', 'tags', 'is_published',
+                  'created_at', 'updated_at', 'views', 'is_bookmarked']
+
 class BlogCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Blog
         fields = ['title', 'content', 'image', 'tags']
 
 class BlogBookmarkSerializer(serializers.ModelSerializer):
-    blog = BlogSerializer(read_only=True)
+    blog = BlogListSerializer(read_only=True)
     
     class Meta:
         model = BlogBookmark
         fields = '__all__'
 
+    def to_representation(self, instance):
+        # The owner's own bookmark: is_bookmarked is known without a query per row
+        request = self.context.get('request')
+        if request and request.user.is_authenticated and instance.user_id == request.user.id:
+            instance.blog.bookmarked = True
+        return super().to_representation(instance)
+
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
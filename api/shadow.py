@@ -0,0 +1,154 @@
+"""
+Shadow evaluation of a candidate model on live traffic.
+
+With SHADOW_MODEL['VERSION'] set to a registered model version, a
+SAMPLE_RATE fraction of predictions hands the already-preprocessed image to
+a background thread, which runs the candidate and records its class,
+confidence and latency next to the primary's (ShadowPrediction). Handoff is
+a non-blocking put on a bounded queue: when the worker falls behind, samples
+are dropped instead of slowing the request. Users only ever see the primary.
+"""
+
+import queue
+import random
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Avg, Count, Q
+
+from . import metrics
+from .models import ShadowPrediction
+
+_DEFAULTS = {
+    'VERSION': '',
+    'SAMPLE_RATE': 0.1,
+    'QUEUE_SIZE': 32,
+}
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'SHADOW_MODEL', {}) or {})
+    return config
+
+
+_queue = queue.Queue(maxsize=get_config()['QUEUE_SIZE'])
+_worker = None
+_worker_lock = threading.Lock()
+# Updated from request threads and the worker thread, so kept in the
+# atomic shared counters rather than a module-level dict
+SAMPLES = metrics.counter('healytics_shadow_samples_total', 'Shadow evaluation samples by outcome',
+                          'outcome', ('submitted', 'dropped', 'completed', 'failed'))
+
+
+def submit(img, primary, primary_latency_ms):
+    """Queue a shadow run for this request if sampled. Never blocks."""
+    config = get_config()
+    candidate_version = config['VERSION']
+    if not candidate_version or candidate_version == primary.model_version:
+        return False
+    if random.random() >= float(config['SAMPLE_RATE']):
+        return False
+    try:
+        _queue.put_nowait((img, primary, primary_latency_ms, candidate_version))
+    except queue.Full:
+        metrics.incr(SAMPLES, 1, 'dropped')
+        return False
+    metrics.incr(SAMPLES, 1, 'submitted')
+    _ensure_worker()
+    return True
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name='shadow-model', daemon=True)
+            _worker.start()
+
+
+def _run():
+    from .utils import registry, CANCER_TYPES
+
+    while True:
+        img, primary, primary_latency_ms, candidate_version = _queue.get()
+        try:
+            candidate = registry.get(candidate_version)
+            started = time.perf_counter()
+            preds = candidate.model.predict(img, verbose=0)
+            latency_ms = (time.perf_counter() - started) * 1000.0
+            # img holds every TTA variant of the one image; average like the primary
+            probs = np.mean(preds, axis=0)
+            candidate_class = CANCER_TYPES.get(int(np.argmax(probs)), 'unknown')
+            ShadowPrediction.objects.create(
+                primary_version=primary.model_version,
+                candidate_version=candidate_version,
+                primary_class=primary.cancer_type,
+                candidate_class=candidate_class,
+                primary_confidence=primary.confidence,
+                candidate_confidence=float(np.max(probs) * 100.0),
+                primary_latency_ms=primary_latency_ms,
+                candidate_latency_ms=latency_ms,
+                agreed=candidate_class == primary.cancer_type,
+            )
+            metrics.incr(SAMPLES, 1, 'completed')
+        except Exception as e:
+            metrics.incr(SAMPLES, 1, 'failed')
+            print(f"Shadow evaluation failed for '{candidate_version}': {e}")
+        finally:
+            close_old_connections()
+            _queue.task_done()
+
+
+def report(candidate_version=None):
+    """Agreement rate and latency delta per primary class."""
+    from .utils import CANCER_TYPES
+
+    candidate_version = candidate_version or get_config()['VERSION']
+    queryset = ShadowPrediction.objects.all()
+    if candidate_version:
+        queryset = queryset.filter(candidate_version=candidate_version)
+    rows = {
+        row['primary_class']: row
+        for row in queryset.values('primary_class').annotate(
+            total=Count('id'),
+            agreed_count=Count('id', filter=Q(agreed=True)),
+            primary_latency=Avg('primary_latency_ms'),
+            candidate_latency=Avg('candidate_latency_ms'),
+            candidate_confidence=Avg('candidate_confidence'),
+        )
+    }
+
+    def summarize(row):
+        total = row['total'] if row else 0
+        if not total:
+            return {'samples': 0, 'agreement_rate': None, 'primary_latency_ms': None,
+                    'candidate_latency_ms': None, 'latency_delta_ms': None}
+        return {
+            'samples': total,
+            'agreement_rate': round(row['agreed_count'] / total, 4),
+            'primary_latency_ms': round(row['primary_latency'], 2),
+            'candidate_latency_ms': round(row['candidate_latency'], 2),
+            'latency_delta_ms': round(row['candidate_latency'] - row['primary_latency'], 2),
+            'mean_candidate_confidence': round(row['candidate_confidence'], 2),
+        }
+
+    per_class = {name: summarize(rows.get(name)) for name in CANCER_TYPES.values()}
+    overall = queryset.aggregate(
+        total=Count('id'),
+        agreed_count=Count('id', filter=Q(agreed=True)),
+        primary_latency=Avg('primary_latency_ms'),
+        candidate_latency=Avg('candidate_latency_ms'),
+        candidate_confidence=Avg('candidate_confidence'),
+    )
+    return {
+        'candidate_version': candidate_version or None,
+        'overall': summarize(overall),
+        'per_class': per_class,
+        'worker': dict(metrics.values(SAMPLES), queue_depth=_queue.qsize()),
+    }
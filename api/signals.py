@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import dashboard, tags
+from .authentication import invalidate_profile, invalidate_user
+from .models import Blog, BlogBookmark, Prediction, UserProfile
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    invalidate_profile(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Prediction)
+@receiver([post_save, post_delete], sender=BlogBookmark)
+def invalidate_cached_dashboard(sender, instance, **kwargs):
+    dashboard.invalidate_user(instance.user_id)
+
+
+def _touches_tags(raw, update_fields):
+    return not raw and (update_fields is None or bool({'tags', 'is_published'} & set(update_fields)))
+
+
+@receiver(pre_save, sender=Blog)
+def remember_blog_published(sender, instance, raw=False, update_fields=None, **kwargs):
+    if _touches_tags(raw, update_fields):
+        instance._was_published = (
+            instance.pk is not None and Blog.objects.filter(pk=instance.pk, is_published=True).exists())
+
+
+@receiver(post_save, sender=Blog)
+def sync_blog_tags(sender, instance, raw=False, update_fields=None, **kwargs):
+    if _touches_tags(raw, update_fields):
+        tags.sync_blog(instance, getattr(instance, '_was_published', False))
+
+
+@receiver(pre_delete, sender=Blog)
+def forget_blog_tags(sender, instance, **kwargs):
+    tags.forget_blog(instance, Blog.objects.filter(pk=instance.pk, is_published=True).exists())
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if pragmas:
+        with connection.cursor() as cursor:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
@@ -0,0 +1,111 @@
+"""
+Normalized blog tags.
+
+``Blog.tags`` stays the comma-separated field that authors edit. On every
+save the signals in api/signals.py mirror it into the indexed Tag table via
+``Blog.tag_index``, so ``/api/blogs/?tag=<slug>`` is an index lookup rather
+than ``tags__icontains`` (a full scan that also matches "skin" inside
+"skincare").
+
+TagCount keeps the number of published blogs per tag. Each save, publish
+toggle or delete adjusts it with F() deltas, so the tag cloud is a read of
+a small table and never a GROUP BY over blogs. Bulk ``QuerySet.update()``
+calls bypass the signals; run ``manage.py rebuild_tag_counts`` after them.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.utils.text import slugify
+
+from .models import Blog, Tag, TagCount
+
+MAX_TAG_LENGTH = 50
+
+
+def parse_tags(value):
+    """'Skin Cancer, prevention,,skin  cancer' -> ['skin cancer', 'prevention']."""
+    names = []
+    for raw in (value or '').split(','):
+        name = ' '.join(raw.split()).lower()[:MAX_TAG_LENGTH]
+        if name and slugify(name) and name not in names:
+            names.append(name)
+    return names
+
+
+def _create_tag(name):
+    """Create one tag with a free slug; a concurrent creator of the same name wins."""
+    base = slugify(name)[:55]
+    # Names like "skin care" and "skin-care" share a base slug, so look at every suffix
+    taken = set(Tag.objects.filter(slug__startswith=base).values_list('slug', flat=True))
+    suffix = 1
+    while True:
+        slug = base if suffix == 1 else f'{base}-{suffix}'
+        suffix += 1
+        if slug in taken:
+            continue
+        try:
+            with transaction.atomic():
+                return Tag.objects.create(name=name, slug=slug)
+        except IntegrityError:
+            tag = Tag.objects.filter(name=name).first()
+            if tag is not None:
+                return tag
+            taken.add(slug)
+
+
+def get_or_create_tags(names):
+    """Tag rows for ``names`` (created with their count rows as needed)."""
+    existing = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = [name for name in names if name not in existing]
+    if missing:
+        for name in missing:
+            existing[name] = _create_tag(name)
+        TagCount.objects.bulk_create([TagCount(tag=existing[name]) for name in missing], ignore_conflicts=True)
+    return [existing[name] for name in names]
+
+
+def _apply_deltas(deltas):
+    for tag_id, delta in deltas.items():
+        if delta:
+            TagCount.objects.filter(tag_id=tag_id).update(published_count=F('published_count') + delta)
+
+
+def sync_blog(blog, was_published):
+    """Mirror ``blog.tags`` into ``tag_index`` and adjust the published counts."""
+    Through = Blog.tag_index.through
+    with transaction.atomic():
+        old_ids = set(Through.objects.filter(blog_id=blog.pk).values_list('tag_id', flat=True))
+        new_ids = {tag.pk for tag in get_or_create_tags(parse_tags(blog.tags))}
+        # Through-model writes, so m2m_changed never double-counts
+        Through.objects.filter(blog_id=blog.pk, tag_id__in=old_ids - new_ids).delete()
+        Through.objects.bulk_create([Through(blog_id=blog.pk, tag_id=tag_id) for tag_id in new_ids - old_ids])
+
+        deltas = {}
+        for tag_id in old_ids | new_ids:
+            deltas[tag_id] = int(tag_id in new_ids and blog.is_published) - int(tag_id in old_ids and was_published)
+        _apply_deltas(deltas)
+
+
+def forget_blog(blog, was_published):
+    """Before a blog is deleted: take it out of the counts (its links cascade away)."""
+    if was_published:
+        tag_ids = Blog.tag_index.through.objects.filter(blog_id=blog.pk).values_list('tag_id', flat=True)
+        _apply_deltas({tag_id: -1 for tag_id in tag_ids})
+
+
+def rebuild_counts():
+    """Recompute every TagCount from the link table; returns the number of tags."""
+    counts = dict(Tag.objects.annotate(n=Count('blogs', filter=Q(blogs__is_published=True))).values_list('id', 'n'))
+    TagCount.objects.bulk_create([TagCount(tag_id=tag_id) for tag_id in counts], ignore_conflicts=True)
+    TagCount.objects.bulk_update(
+        [TagCount(tag_id=tag_id, published_count=n) for tag_id, n in counts.items()], ['published_count'])
+    return len(counts)
+
+
+def tag_cloud(limit=50):
+    return [
+        {'name': name, 'slug': slug, 'count': count}
+        for name, slug, count in TagCount.objects.filter(published_count__gt=0)
+        .order_by('-published_count', 'tag__name')
+        .values_list('tag__name', 'tag__slug', 'published_count')[:limit]
+    ]
@@ -0,0 +1,23 @@
+from django.test import SimpleTestCase
+
+from api.compression import negotiate_encoding, parse_accept_encoding
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    def test_parse(self):
+        self.assertEqual(parse_accept_encoding('gzip;q=0.5, BR, *;q=0'), {'gzip': 0.5, 'br': 1.0, '*': 0.0})
+
+    def test_negotiate(self):
+        cases = [
+            ('br, gzip', 'br'),
+            ('br;q=0, gzip', 'gzip'),
+            ('gzip;q=1, br;q=0.5', 'gzip'),
+            ('*', 'br'),
+            ('*;q=0, gzip', 'gzip'),
+            ('xbr, gzipx', None),
+            ('identity', None),
+            ('', None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(negotiate_encoding(header, ('br', 'gzip')), expected)
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.models import Blog, BlogBookmark
+
+
+class BlogListConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='x')
+        author = User.objects.create_user('author', password='x')
+        self.blogs = [Blog.objects.create(title=f'post {i}', content='text', author=author) for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.client.get('/api/blogs/')
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'])
+        again = self.client.get('/api/blogs/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+    def test_bookmark_change_invalidates_the_etag(self):
+        first = self.client.get('/api/blogs/')
+        BlogBookmark.objects.create(user=self.user, blog=self.blogs[0])
+        changed = self.client.get('/api/blogs/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+        BlogBookmark.objects.filter(user=self.user).delete()
+        removed = self.client.get('/api/blogs/', HTTP_IF_NONE_MATCH=changed['ETag'])
+        self.assertEqual(removed.status_code, 200)
+
+    def test_etag_differs_per_user(self):
+        first = self.client.get('/api/blogs/')
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', password='x'))
+        self.assertEqual(other.get('/api/blogs/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_query_string_is_part_of_the_etag(self):
+        first = self.client.get('/api/blogs/')
+        searched = self.client.get('/api/blogs/', {'search': 'post'}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(searched.status_code, 200)
@@ -0,0 +1,34 @@
+import io
+import json
+
+from django.test import SimpleTestCase
+
+from api.drug_labels import iter_label_records
+
+RECORDS = [
+    {'set_id': 'a1', 'openfda': {'brand_name': ['Crème "Ø"']}, 'indications_and_usage': ['skin [x] {y}']},
+    {'set_id': 'b2', 'indications_and_usage': ['melanoma, results: ['], 'nested': {'results': [1, 2]}},
+    {'set_id': 'c3', 'description': ['\\u escaped \\" quote ]'], 'n': [1.5e3, None, True]},
+]
+
+# openFDA's meta block has its own "results" object before the records array
+DUMP = json.dumps({'meta': {'results': {'skip': 0, 'total': 3}}, 'results': RECORDS}, indent=1)
+
+
+class IterLabelRecordsTests(SimpleTestCase):
+    def test_records_split_across_every_chunk_boundary(self):
+        for chunk_size in range(1, 64):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_label_records(io.StringIO(DUMP), chunk_size)), RECORDS)
+
+    def test_compact_dump(self):
+        dump = json.dumps({'results': RECORDS}, separators=(',', ':'))
+        self.assertEqual(list(iter_label_records(io.StringIO(dump), 7)), RECORDS)
+
+    def test_empty_and_missing_results(self):
+        self.assertEqual(list(iter_label_records(io.StringIO('{"results": []}'), 3)), [])
+        self.assertEqual(list(iter_label_records(io.StringIO('{"meta": {"results": {}}}'), 3)), [])
+
+    def test_truncated_dump_raises(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_label_records(io.StringIO(DUMP[:len(DUMP) // 2]), 16))
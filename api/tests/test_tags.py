@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from api import tags
+from api.models import Blog, Tag, TagCount
+
+
+def counts():
+    return dict(TagCount.objects.values_list('tag__name', 'published_count'))
+
+
+class TagCountTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', password='x')
+
+    def blog(self, tag_string, is_published=True):
+        return Blog.objects.create(title='t', content='c', author=self.author, tags=tag_string,
+                                   is_published=is_published)
+
+    def test_parse_tags(self):
+        self.assertEqual(tags.parse_tags('Skin Cancer, prevention,,skin  cancer, '), ['skin cancer', 'prevention'])
+
+    def test_publish_and_unpublish_adjust_counts(self):
+        blog = self.blog('Melanoma, Prevention', is_published=False)
+        self.blog('melanoma')
+        self.assertEqual(counts(), {'melanoma': 1, 'prevention': 0})
+
+        blog.is_published = True
+        blog.save()
+        self.assertEqual(counts(), {'melanoma': 2, 'prevention': 1})
+
+        blog.is_published = False
+        blog.save()
+        self.assertEqual(counts(), {'melanoma': 1, 'prevention': 0})
+
+    def test_retagging_and_deleting_adjust_counts(self):
+        blog = self.blog('melanoma, prevention')
+        blog.tags = 'prevention, sunscreen'
+        blog.save()
+        self.assertEqual(counts(), {'melanoma': 0, 'prevention': 1, 'sunscreen': 1})
+        self.assertEqual(set(blog.tag_index.values_list('name', flat=True)), {'prevention', 'sunscreen'})
+
+        blog.delete()
+        self.assertEqual(counts(), {'melanoma': 0, 'prevention': 0, 'sunscreen': 0})
+
+    def test_saves_that_skip_tags_leave_counts_alone(self):
+        blog = self.blog('melanoma')
+        blog.views = 5
+        blog.save(update_fields=['views'])
+        self.assertEqual(counts(), {'melanoma': 1})
+
+    def test_rebuild_counts_repairs_bulk_updates(self):
+        self.blog('melanoma')
+        Blog.objects.update(is_published=False)  # bypasses the signals
+        self.assertEqual(counts(), {'melanoma': 1})
+        tags.rebuild_counts()
+        self.assertEqual(counts(), {'melanoma': 0})
+
+    def test_names_sharing_a_slug_get_distinct_slugs(self):
+        self.blog('skin care, skin-care, skin care.')
+        self.assertEqual(sorted(Tag.objects.values_list('slug', flat=True)),
+                         ['skin-care', 'skin-care-2', 'skin-care-3'])
+        self.assertEqual(counts(), {'skin care': 1, 'skin-care': 1, 'skin care.': 1})
+
+    def test_tag_cloud_and_filter(self):
+        self.blog('melanoma, prevention')
+        self.blog('melanoma')
+        self.blog('hidden', is_published=False)
+        self.assertEqual(tags.tag_cloud(), [
+            {'name': 'melanoma', 'slug': 'melanoma', 'count': 2},
+            {'name': 'prevention', 'slug': 'prevention', 'count': 1},
+        ])
+        self.assertEqual(self.client.get('/api/blogs/', {'tag': 'prevention'}).json()['count'], 1)
+        self.assertEqual(self.client.get('/api/blogs/', {'tag': 'melanoma'}).json()['count'], 2)
+        # Search matches whole tag names, not substrings
+        self.assertEqual(self.client.get('/api/blogs/', {'search': 'Melanoma'}).json()['count'], 2)
+        self.assertEqual(self.client.get('/api/blogs/', {'search': 'melan'}).json()['count'], 0)
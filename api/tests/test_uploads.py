@@ -0,0 +1,83 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from api import uploads
+from api.models import UploadSession
+
+DATA = bytes(range(256)) * 40  # 10240 bytes
+
+
+class UploadChunkTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, True)
+        override = override_settings(UPLOADS={'DIR': self.dir, 'MAX_CHUNK_SIZE': 4096})
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user('uploader', password='x')
+        self.session = uploads.create_session(self.user, 'arm.jpg', len(DATA),
+                                              hashlib.sha256(DATA).hexdigest())
+
+    def put(self, offset, chunk, session=None):
+        session = session or UploadSession.objects.get(pk=self.session.pk)
+        return uploads.write_chunk(session, offset, io.BytesIO(chunk), len(chunk))
+
+    def test_in_order_chunks_complete_the_file(self):
+        for offset in range(0, len(DATA), 4096):
+            self.put(offset, DATA[offset:offset + 4096])
+        session = UploadSession.objects.get(pk=self.session.pk)
+        with open(uploads.finish(session), 'rb') as fh:
+            self.assertEqual(fh.read(), DATA)
+        self.assertEqual(session.sha256, hashlib.sha256(DATA).hexdigest())
+
+    def test_out_of_order_chunk_is_refused_with_the_committed_offset(self):
+        self.put(0, DATA[:4096])
+        with self.assertRaises(uploads.UploadError) as caught:
+            self.put(8192, DATA[8192:])
+        self.assertEqual(caught.exception.status, 409)
+        self.assertEqual(caught.exception.data['offset'], 4096)
+
+    def test_duplicate_chunk_from_a_stale_session_does_not_touch_the_file(self):
+        stale = UploadSession.objects.get(pk=self.session.pk)
+        self.put(0, DATA[:4096])
+        self.put(4096, DATA[4096:8192])
+        # A retry of the first chunk that still believes the offset is 0
+        with self.assertRaises(uploads.UploadError) as caught:
+            self.put(0, b'\0' * 4096, session=stale)
+        self.assertEqual(caught.exception.status, 409)
+        self.assertEqual(caught.exception.data['offset'], 8192)
+        self.put(8192, DATA[8192:])
+        session = UploadSession.objects.get(pk=self.session.pk)
+        with open(uploads.finish(session), 'rb') as fh:
+            self.assertEqual(fh.read(), DATA)
+        self.assertEqual([name for name in os.listdir(self.dir) if name.endswith('.chunk')], [])
+
+    def test_short_chunk_does_not_advance_the_offset(self):
+        with self.assertRaises(uploads.UploadError):
+            uploads.write_chunk(self.session, 0, io.BytesIO(DATA[:100]), 4096)
+        self.assertEqual(UploadSession.objects.get(pk=self.session.pk).received, 0)
+
+    def test_finish_rejects_a_part_file_of_the_wrong_size(self):
+        for offset in range(0, len(DATA), 4096):
+            self.put(offset, DATA[offset:offset + 4096])
+        session = UploadSession.objects.get(pk=self.session.pk)
+        with open(uploads.part_path(session), 'r+b') as fh:
+            fh.truncate(100)
+        with self.assertRaises(uploads.UploadError) as caught:
+            uploads.finish(session)
+        self.assertEqual(caught.exception.status, 409)
+
+    def test_hash_is_rebuilt_when_another_worker_wrote_earlier_chunks(self):
+        self.put(0, DATA[:4096])
+        with uploads._hashers_lock:
+            uploads._hashers.clear()
+        self.put(4096, DATA[4096:8192])
+        self.put(8192, DATA[8192:])
+        session = UploadSession.objects.get(pk=self.session.pk)
+        self.assertEqual(session.sha256, hashlib.sha256(DATA).hexdigest())
@@ -0,0 +1,207 @@
+"""
+Chunked, resumable image uploads.
+
+A client opens an UploadSession with the file's name and total size (and
+optionally its SHA-256), then PUTs the bytes in order with an
+``Upload-Offset`` header, each chunk at most MAX_CHUNK_SIZE. Chunks are
+streamed from the request straight into UPLOADS['DIR']/<id>.part, so a
+worker never holds more than one read buffer of the file. After a dropped
+connection, GET the session for the committed offset and continue from
+there. Finalizing turns the completed file into a prediction.
+
+Each request body is first streamed into its own staging file, so a slow
+or retried client never writes into the part file directly. The chunk is
+then appended inside a transaction that opens with a conditional UPDATE of
+the offset. That UPDATE locks the session row (on SQLite, the database) until
+the append commits. A concurrent PUT for the same offset waits, matches no
+row and gets a 409 without touching the part file.
+
+The SHA-256 is computed as chunks are appended. Each process keeps the
+running hasher for the sessions it has seen. When a chunk lands on a worker
+without an up-to-date hasher, that worker rebuilds the hasher by re-reading
+the part file in bounded blocks.
+"""
+
+import glob
+import hashlib
+import os
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadSession
+
+_DEFAULTS = {
+    'DIR': '',
+    'MAX_SIZE': 50 * 1024 * 1024,
+    'MAX_CHUNK_SIZE': 5 * 1024 * 1024,
+    'EXPIRE_HOURS': 24,
+    'EXTENSIONS': ('.jpg', '.jpeg', '.png', '.bmp', '.webp'),
+}
+
+READ_BLOCK = 64 * 1024
+
+
+class UploadError(Exception):
+    """Carries the HTTP status and response body for a refused upload step."""
+
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.data = dict({'error': message}, **extra)
+
+
+def get_config():
+    config = dict(_DEFAULTS)
+    config.update(getattr(settings, 'UPLOADS', {}) or {})
+    if not config['DIR']:
+        config['DIR'] = os.path.join(getattr(settings, 'BASE_DIR', '.'), 'uploads')
+    return config
+
+
+def part_path(session):
+    return os.path.join(get_config()['DIR'], f'{session.id}.part')
+
+
+# session id -> (offset, hasher); only ever touched under _hashers_lock
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def _hasher_at(session, offset):
+    with _hashers_lock:
+        cached = _hashers.pop(session.id, None)
+    if cached and cached[0] == offset:
+        return cached[1]
+    # Another worker took the earlier chunks: catch up from the part file
+    hasher = hashlib.sha256()
+    with open(part_path(session), 'rb') as fh:
+        remaining = offset
+        while remaining:
+            block = fh.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def create_session(user, filename, size, sha256=''):
+    config = get_config()
+    if not filename or os.path.splitext(filename)[1].lower() not in config['EXTENSIONS']:
+        raise UploadError(f"Unsupported file type; expected one of {', '.join(config['EXTENSIONS'])}")
+    if size <= 0:
+        raise UploadError('size must be a positive number of bytes')
+    if size > config['MAX_SIZE']:
+        raise UploadError(f"File is larger than the {config['MAX_SIZE']} byte limit", status=413)
+    os.makedirs(config['DIR'], exist_ok=True)
+    session = UploadSession.objects.create(
+        user=user,
+        filename=os.path.basename(filename)[:255],
+        size=size,
+        expected_sha256=(sha256 or '').lower(),
+        expires_at=timezone.now() + timedelta(hours=config['EXPIRE_HOURS']),
+    )
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def write_chunk(session, offset, stream, length):
+    """Append ``length`` bytes from ``stream`` at ``offset``; returns the new offset."""
+    config = get_config()
+    if session.completed_at or session.expires_at <= timezone.now():
+        raise UploadError('Upload session is closed', status=410)
+    if offset != session.received:
+        raise UploadError('Offset does not match the received bytes', status=409, offset=session.received)
+    if length is None or length <= 0:
+        raise UploadError('Chunk must have a Content-Length')
+    if length > config['MAX_CHUNK_SIZE']:
+        raise UploadError(f"Chunk is larger than the {config['MAX_CHUNK_SIZE']} byte limit", status=413)
+    if offset + length > session.size:
+        raise UploadError('Chunk runs past the declared file size', status=413)
+
+    staging = os.path.join(config['DIR'], f'{session.id}.{uuid.uuid4().hex}.chunk')
+    try:
+        written = 0
+        with open(staging, 'wb') as fh:
+            while written < length:
+                block = stream.read(min(READ_BLOCK, length - written))
+                if not block:
+                    break
+                fh.write(block)
+                written += len(block)
+        if written != length:
+            raise UploadError('Chunk was cut short; resume from the returned offset', offset=session.received)
+        return _append(session, offset, staging, length)
+    finally:
+        try:
+            os.remove(staging)
+        except FileNotFoundError:
+            pass
+
+
+def _append(session, offset, staging, length):
+    new_offset = offset + length
+    with transaction.atomic():
+        # Only the writer that still sees the old offset may advance it; the
+        # row stays locked until the part file holds the chunk
+        committed = UploadSession.objects.filter(pk=session.pk, received=offset).update(
+            received=new_offset, updated_at=timezone.now())
+        if not committed:
+            session.refresh_from_db(fields=['received'])
+            raise UploadError('Another chunk was written concurrently', status=409, offset=session.received)
+        hasher = _hasher_at(session, offset)
+        with open(staging, 'rb') as src, open(part_path(session), 'r+b') as fh:
+            fh.seek(offset)
+            while True:
+                block = src.read(READ_BLOCK)
+                if not block:
+                    break
+                fh.write(block)
+                hasher.update(block)
+            fh.truncate(new_offset)
+        session.received = new_offset
+        if new_offset == session.size:
+            session.sha256 = hasher.hexdigest()
+            session.save(update_fields=['sha256'])
+    with _hashers_lock:
+        _hashers[session.id] = (new_offset, hasher)
+    return new_offset
+
+
+def finish(session):
+    """Validate a complete upload; returns the path of its part file."""
+    if session.completed_at:
+        raise UploadError('Upload session was already finalized', status=410)
+    if session.received != session.size:
+        raise UploadError('Upload is incomplete', status=409, offset=session.received)
+    path = part_path(session)
+    if not os.path.exists(path) or os.path.getsize(path) != session.size:
+        raise UploadError('Uploaded file does not match the declared size; upload it again', status=409)
+    if session.expected_sha256 and session.expected_sha256 != session.sha256:
+        raise UploadError('Uploaded content does not match the declared sha256', sha256=session.sha256)
+    return path
+
+
+def discard(session):
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    # The part file plus any staging files a killed worker left behind
+    for path in [part_path(session)] + glob.glob(os.path.join(get_config()['DIR'], f'{session.id}.*.chunk')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def purge_expired(now=None):
+    """Delete expired sessions and leftover part files; returns how many sessions were removed."""
+    expired = list(UploadSession.objects.filter(expires_at__lte=now or timezone.now()))
+    for session in expired:
+        discard(session)
+    UploadSession.objects.filter(pk__in=[s.pk for s in expired]).delete()
+    return len(expired)
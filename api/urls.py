@@ -4,8 +4,13 @@ from .views import (
     RegisterView, LoginView, UserProfileView, PredictionView, PredictionListView,
     PredictionDetailView, BlogListView, BlogDetailView, BlogCreateView,
     BlogBookmarkView, UserBookmarksView, ContactView, health_check, StatsView,
-    ChatAPIView
+    ChatAPIView, ProfileListView, ProfileDownloadView, ShadowReportView, CascadeReportView,
+    QualityReportView, MetricsView,
+    SimilarPredictionsView, PredictionExportView, AdminPredictionExportView,
+    UploadSessionCreateView, UploadSessionView, UploadSessionFinalizeView,
+    ChatSessionCreateView, ChatSessionView, ChatSessionMessageView, DashboardView, BlogTagCloudView
 )
+from .async_views import async_chat, async_prediction, async_stats
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -19,14 +24,23 @@ urlpatterns = [
     # User Profile
     path('profile/', UserProfileView.as_view(), name='profile'),
     path('stats/', StatsView.as_view(), name='stats'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
 
     # Predictions
     path('predictions/', PredictionView.as_view(), name='prediction'),
     path('predictions/list/', PredictionListView.as_view(), name='prediction_list'),
     path('predictions/<int:pk>/', PredictionDetailView.as_view(), name='prediction_detail'),
+    path('predictions/<int:pk>/similar/', SimilarPredictionsView.as_view(), name='prediction_similar'),
+    path('predictions/export/<str:export_format>/', PredictionExportView.as_view(), name='prediction_export'),
+
+    # Chunked, resumable uploads (finalize runs the prediction)
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload_create'),
+    path('uploads/<uuid:session_id>/', UploadSessionView.as_view(), name='upload_session'),
+    path('uploads/<uuid:session_id>/finalize/', UploadSessionFinalizeView.as_view(), name='upload_finalize'),
 
     # Blogs
     path('blogs/', BlogListView.as_view(), name='blog_list'),
+    path('blogs/tags/', BlogTagCloudView.as_view(), name='blog_tag_cloud'),
     path('blogs/create/', BlogCreateView.as_view(), name='blog_create'),
     path('blogs/<int:pk>/', BlogDetailView.as_view(), name='blog_detail'),
     path('blogs/<int:blog_id>/bookmark/', BlogBookmarkView.as_view(), name='blog_bookmark'),
@@ -40,6 +54,32 @@ urlpatterns = [
 
     # Chat
     path('chat/', ChatAPIView.as_view(), name='chat_api'),
+    path('chat/sessions/', ChatSessionCreateView.as_view(), name='chat_session_create'),
+    path('chat/sessions/<uuid:session_id>/', ChatSessionView.as_view(), name='chat_session'),
+    path('chat/sessions/<uuid:session_id>/messages/', ChatSessionMessageView.as_view(), name='chat_session_message'),
+
+    # Async variants of the I/O-bound endpoints (serve with uvicorn, see healytics/asgi.py)
+    path('async/chat/', async_chat, name='async_chat'),
+    path('async/predictions/', async_prediction, name='async_prediction'),
+    path('async/stats/', async_stats, name='async_stats'),
+
+    # Profiling (admin only)
+    path('admin/profiles/', ProfileListView.as_view(), name='profile_list'),
+    path('admin/profiles/<path:name>', ProfileDownloadView.as_view(), name='profile_download'),
+
+    # Shadow model evaluation (admin only)
+    path('admin/shadow/', ShadowReportView.as_view(), name='shadow_report'),
+
+    # Screening cascade stage shares (admin only)
+    path('admin/cascade/', CascadeReportView.as_view(), name='cascade_report'),
+
+    # Upload quality gate outcomes and all counters for Prometheus (admin only)
+    path('admin/quality/', QualityReportView.as_view(), name='quality_report'),
+    path('admin/metrics/', MetricsView.as_view(), name='metrics'),
+
+    # Whole-system prediction export (admin only)
+    path('admin/predictions/export/<str:export_format>/', AdminPredictionExportView.as_view(),
+         name='admin_prediction_export'),
 ]
 
 if settings.DEBUG:
@@ -1,10 +1,16 @@
+import asyncio
 import os
+import time
+from collections import namedtuple
 import numpy as np
-import tensorflow as tf
 import requests
-from PIL import Image
+import httpx
 from django.conf import settings
 from .models import Medicine
+from asgiref.sync import sync_to_async
+from . import cascade, drug_labels, embeddings, profiling, shadow
+from .model_registry import ModelRegistry
+from .preprocessing import average_tta, parse_tta, preprocess_batch
 
 # --- Optional: sensible defaults if not set in settings.py ---
 DEFAULT_MODEL_PATH = getattr(settings, "MODEL_PATH", None) or os.path.join(
@@ -12,13 +18,8 @@ DEFAULT_MODEL_PATH = getattr(settings, "MODEL_PATH", None) or os.path.join(
 )
 MED_API_BASE = getattr(settings, "MEDICINE_API_BASE_URL", "https://api.fda.gov/drug")
 
-# Try to import cv2, but provide fallback if it fails
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
-    print("Warning: OpenCV not available, using PIL for image processing")
+# Test-time augmentation variants averaged into every prediction, e.g. "hflip,vflip,rot90"
+PREDICTION_TTA = parse_tta(getattr(settings, "PREDICTION_TTA", ""))
 
 # Cancer type mapping
 CANCER_TYPES = {
@@ -64,138 +65,229 @@ CANCER_RECOMMENDATIONS = {
     'vascular_lesion': 'Consult a dermatologist for proper evaluation and treatment options.'
 }
 
-# --- Load the model lazily once (prevents reloading every request) ---
-_MODEL = None
+# --- Model registry: versions are loaded lazily and hot-swapped in the background ---
+registry = ModelRegistry(
+    root=getattr(settings, "MODEL_REGISTRY_DIR", None) or os.path.join(os.path.dirname(DEFAULT_MODEL_PATH), "registry"),
+    legacy_path=DEFAULT_MODEL_PATH,
+    poll_interval=getattr(settings, "MODEL_REGISTRY_POLL_SECONDS", 10.0),
+)
+
+def get_active_model():
+    """(version, keras model) currently serving predictions."""
+    return registry.active()
+
 def _get_model():
-    global _MODEL
-    if _MODEL is None:
-        model_path = DEFAULT_MODEL_PATH
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"Model file not found at {model_path}")
-        # compile=False avoids issues when the original compile context isn't present
-        _MODEL = tf.keras.models.load_model(model_path, compile=False)
-    return _MODEL
-
-def preprocess_image(image_path, target_size=(224, 224)):
-    """Preprocess image for model prediction. Returns np.ndarray of shape (1, H, W, 3) in [0,1]."""
+    return get_active_model().model
+
+def preprocess_image(image_path, target_size=(224, 224), tta=None):
+    """Preprocess image for model prediction. Returns np.ndarray of shape (len(tta), H, W, 3) in [0,1]."""
+    batch, ok = preprocess_batch([image_path], target_size, tta=tta)
+    return batch if ok[0] else None
+
+InferenceResult = namedtuple(
+    'InferenceResult', ['cancer_type', 'confidence', 'model_version', 'embedding', 'probabilities'],
+    defaults=(None, None),
+)
+
+def predict_batch(batch, num_variants=1, loaded=None):
+    """
+    One forward pass over a preprocessed (num_variants * N, H, W, 3) batch.
+    Returns (model_version, probs (N, C), embeddings (N, D) or None).
+    """
+    version, model = loaded or get_active_model()
+    # Same forward pass, plus the penultimate-layer features for similar-case search
+    dual = embeddings.embedding_model(model)
+    features = None
+    if dual is not None:
+        features, preds = dual.predict(batch, verbose=0)
+    else:
+        preds = model.predict(batch, verbose=0)
+    probs = average_tta(preds, num_variants)
+    if features is not None:
+        features = average_tta(np.reshape(features, (len(features), -1)), num_variants)
+    return version, probs, features
+
+def make_result(probs, model_version, embedding=None):
+    predicted_class = int(np.argmax(probs))
+    confidence = float(np.max(probs) * 100.0)
+    cancer_type = CANCER_TYPES.get(predicted_class, 'unknown')
+    return InferenceResult(cancer_type, confidence, model_version, embedding, probs)
+
+def run_inference(image_path):
+    """Run the active model on one image. Returns InferenceResult, or None on failure."""
     try:
-        if CV2_AVAILABLE:
-            img = cv2.imread(image_path)
-            if img is None:
-                raise ValueError(f"cv2.imread returned None. Bad path or unreadable image: {image_path}")
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img = cv2.resize(img, target_size)
-            img = img.astype(np.float32) / 255.0
-        else:
-            with Image.open(image_path) as pil_img:
-                pil_img = pil_img.convert('RGB')
-                pil_img = pil_img.resize(target_size)
-                # Convert PIL Image -> NumPy BEFORE astype (this was the bug)
-                img = np.array(pil_img, dtype=np.float32) / 255.0
-
-        # Add batch dimension
-        img = np.expand_dims(img, axis=0)
-        return img
+        # All TTA variants go through the model as one batch
+        img = preprocess_image(image_path, tta=PREDICTION_TTA)
+        if img is None:
+            return None
+
+        started = time.perf_counter()
+        with profiling.tf_trace():
+            stage = None
+            if cascade.enabled():
+                # Screening model first; only unsure or high-risk images pay for the full model
+                try:
+                    version, probs, features = cascade.screen(img, len(PREDICTION_TTA))
+                    stage = 'full' if cascade.should_escalate(probs[0]) else 'screen'
+                except Exception as e:
+                    print(f"Screening model failed, using the full model: {e}")
+                    stage = 'full'
+            if stage != 'screen':
+                version, probs, features = predict_batch(img, len(PREDICTION_TTA))
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        if probs is None or len(probs) == 0:
+            return None
+        if stage:
+            cascade.record(stage, latency_ms)
+
+        result = make_result(probs[0], version, features[0] if features is not None else None)
+        shadow.submit(img, result, latency_ms)
+        return result
     except Exception as e:
-        print(f"Error preprocessing image: {e}")
+        print(f"Error in prediction: {e}")
         return None
 
 def predict_cancer_type(image_path):
     """Predict cancer type using the loaded model. Returns (cancer_type:str|None, confidence:float)."""
-    try:
-        img = preprocess_image(image_path)
-        if img is None:
-            return None, 0.0
+    result = run_inference(image_path)
+    if result is None:
+        return None, 0.0
+    return result.cancer_type, result.confidence
 
-        model = _get_model()
-        preds = model.predict(img)
-        if preds is None or len(preds) == 0:
-            return None, 0.0
+# Map cancer_type to openFDA search terms
+MEDICINE_SEARCH_TERMS = {
+    'melanoma': ['melanoma'],
+    'basal_cell_carcinoma': ['basal cell carcinoma', 'skin cancer'],
+    'squamous_cell_carcinoma': ['squamous cell carcinoma', 'skin cancer'],
+    'actinic_keratosis': ['actinic keratosis'],
+    'benign': ['dermatological treatment'],
+    'dermatofibroma': ['dermatofibroma'],
+    'vascular_lesion': ['vascular lesion']
+}
+
+# Fallback if API fails or returns nothing
+FALLBACK_MEDICINES = [{
+    'name': 'Consultation Required',
+    'generic_name': 'Medical Consultation',
+    'dosage_form': 'Consultation',
+    'manufacturer': 'Healthcare Provider',
+    'description': 'Please consult with a healthcare provider for proper diagnosis and treatment.',
+    'side_effects': 'N/A'
+}]
+
+MAX_MEDICINE_SUGGESTIONS = 5
+
+def _medicine_search_params(term):
+    return {
+        # Query labels by indications text; this field exists more consistently for conditions
+        'search': f'indications_and_usage:"{term}"',
+        'limit': 5
+    }
 
-        predicted_class = int(np.argmax(preds[0]))
-        confidence = float(np.max(preds[0]) * 100.0)
-        cancer_type = CANCER_TYPES.get(predicted_class, 'unknown')
-        return cancer_type, confidence
+def _medicine_from_label(result):
+    """Turn one openFDA drug label into the Medicine field dict."""
+    ofda = result.get('openfda', {}) or {}
+    generic_name = (ofda.get('generic_name') or ['Unknown'])[0]
+    brand_name = (ofda.get('brand_name') or ['Unknown'])[0]
+    dosage_form = (ofda.get('dosage_form') or ['Unknown'])[0]
+    manufacturer = (ofda.get('manufacturer_name') or ['Unknown'])[0]
+
+    desc_list = result.get('description') or result.get('indications_and_usage') or ['No description available']
+    description = desc_list[0] if isinstance(desc_list, list) and desc_list else str(desc_list)
+    if description and len(description) > 500:
+        description = description[:500] + '...'
+
+    return {
+        'name': brand_name,
+        'generic_name': generic_name,
+        'dosage_form': dosage_form,
+        'manufacturer': manufacturer,
+        'description': description,
+        'side_effects': 'Consult your healthcare provider for complete information about side effects.'
+    }
+
+def _collect_medicines(suggestions, payload):
+    for result in payload.get('results', []):
+        suggestions.append(_medicine_from_label(result))
+        if len(suggestions) >= MAX_MEDICINE_SUGGESTIONS:
+            break
+
+def _local_medicine_suggestions(cancer_type):
+    """Suggestions from the imported label index, or None to ask the live API."""
+    if not drug_labels.use_local_index():
+        return None
+    try:
+        terms = MEDICINE_SEARCH_TERMS.get(cancer_type, ['skin cancer'])
+        suggestions = drug_labels.medicine_suggestions(terms, MAX_MEDICINE_SUGGESTIONS)
     except Exception as e:
-        print(f"Error in prediction: {e}")
-        return None, 0.0
+        print(f"Error searching local drug labels: {e}")
+        suggestions = []
+    if suggestions or getattr(settings, "MEDICINE_LOOKUP", "auto") == 'local':
+        return suggestions or [dict(m) for m in FALLBACK_MEDICINES]
+    return None
 
 def get_medicine_suggestions(cancer_type):
     """
     Get medicine suggestions from the FDA API based on cancer type.
     Uses 'indications_and_usage' instead of 'openfda.generic_name' so
-    we can search by disease/condition terms.
+    we can search by disease/condition terms. Served from the local label
+    index instead when one has been imported (see MEDICINE_LOOKUP).
     """
+    local = _local_medicine_suggestions(cancer_type)
+    if local is not None:
+        return local
     suggestions = []
     try:
-        # Map cancer_type to search terms
-        search_terms = {
-            'melanoma': ['melanoma'],
-            'basal_cell_carcinoma': ['basal cell carcinoma', 'skin cancer'],
-            'squamous_cell_carcinoma': ['squamous cell carcinoma', 'skin cancer'],
-            'actinic_keratosis': ['actinic keratosis'],
-            'benign': ['dermatological treatment'],
-            'dermatofibroma': ['dermatofibroma'],
-            'vascular_lesion': ['vascular lesion']
-        }
-        terms = search_terms.get(cancer_type, ['skin cancer'])
+        terms = MEDICINE_SEARCH_TERMS.get(cancer_type, ['skin cancer'])
 
         for term in terms[:2]:  # keep it light
             url = f"{MED_API_BASE}/label.json"
-            params = {
-                # Query labels by indications text; this field exists more consistently for conditions
-                'search': f'indications_and_usage:"{term}"',
-                'limit': 5
-            }
-            resp = requests.get(url, params=params, timeout=10)
+            resp = requests.get(url, params=_medicine_search_params(term), timeout=10)
+            if resp.status_code != 200:
+                continue
+
+            _collect_medicines(suggestions, resp.json())
+            if len(suggestions) >= MAX_MEDICINE_SUGGESTIONS:
+                break
+
+    except Exception as e:
+        print(f"Error fetching medicines: {e}")
+
+    return suggestions or [dict(m) for m in FALLBACK_MEDICINES]
+
+# One pooled async client per event loop (connections are bound to the loop)
+_ASYNC_CLIENTS = {}
+def _get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=10)
+        _ASYNC_CLIENTS[loop] = client
+    return client
+
+async def aget_medicine_suggestions(cancer_type):
+    """Async twin of get_medicine_suggestions for the ASGI views."""
+    local = await sync_to_async(_local_medicine_suggestions)(cancer_type)
+    if local is not None:
+        return local
+    suggestions = []
+    try:
+        client = _get_async_client()
+        terms = MEDICINE_SEARCH_TERMS.get(cancer_type, ['skin cancer'])
+
+        for term in terms[:2]:
+            resp = await client.get(f"{MED_API_BASE}/label.json", params=_medicine_search_params(term))
             if resp.status_code != 200:
                 continue
 
-            payload = resp.json()
-            results = payload.get('results', [])
-
-            for result in results:
-                ofda = result.get('openfda', {}) or {}
-                generic_name = (ofda.get('generic_name') or ['Unknown'])[0]
-                brand_name = (ofda.get('brand_name') or ['Unknown'])[0]
-                dosage_form = (ofda.get('dosage_form') or ['Unknown'])[0]
-                manufacturer = (ofda.get('manufacturer_name') or ['Unknown'])[0]
-
-                desc_list = result.get('description') or result.get('indications_and_usage') or ['No description available']
-                description = desc_list[0] if isinstance(desc_list, list) and desc_list else str(desc_list)
-                if description and len(description) > 500:
-                    description = description[:500] + '...'
-
-                suggestions.append({
-                    'name': brand_name,
-                    'generic_name': generic_name,
-                    'dosage_form': dosage_form,
-                    'manufacturer': manufacturer,
-                    'description': description,
-                    'side_effects': 'Consult your healthcare provider for complete information about side effects.'
-                })
-
-                if len(suggestions) >= 5:
-                    break
-
-            if len(suggestions) >= 5:
+            _collect_medicines(suggestions, resp.json())
+            if len(suggestions) >= MAX_MEDICINE_SUGGESTIONS:
                 break
 
     except Exception as e:
         print(f"Error fetching medicines: {e}")
 
-    if not suggestions:
-        # Fallback if API fails or returns nothing
-        suggestions = [{
-            'name': 'Consultation Required',
-            'generic_name': 'Medical Consultation',
-            'dosage_form': 'Consultation',
-            'manufacturer': 'Healthcare Provider',
-            'description': 'Please consult with a healthcare provider for proper diagnosis and treatment.',
-            'side_effects': 'N/A'
-        }]
-
-    return suggestions
+    return suggestions or [dict(m) for m in FALLBACK_MEDICINES]
 
 def get_cancer_info(cancer_type):
     """Get comprehensive information about a cancer type"""
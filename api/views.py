@@ -5,20 +5,28 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
+from django.core.files import File
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.db.models import Exists, F, OuterRef, Q
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import UserProfile, Prediction, Medicine, Blog, BlogBookmark, Contact
+from .models import UserProfile, Prediction, Medicine, Blog, BlogBookmark, Contact, UploadSession
 from .serializers import (
     UserSerializer, UserProfileSerializer, RegisterSerializer,
     PredictionSerializer, PredictionCreateSerializer, MedicineSerializer,
-    BlogSerializer, BlogCreateSerializer, BlogBookmarkSerializer, ContactSerializer
+    BlogSerializer, BlogListSerializer, BlogCreateSerializer, BlogBookmarkSerializer, ContactSerializer
 )
-from .utils import predict_cancer_type, get_medicine_suggestions, get_cancer_info
+from .utils import run_inference, get_medicine_suggestions, get_cancer_info
+from .analytics import pack_probabilities
+from .authentication import get_cached_profile
+from .routers import ReplicaReadMixin
+from .conditional import ConditionalListMixin, queryset_state
+from . import cascade, chat, conditional, dashboard, embeddings, export, metrics, profiling, quality, retention, shadow, tags, uploads
 import os
 import google.generativeai as genai
 
-genai.configure(GOOGLE_API_KEY=os.getenv('GOOGLE_API_KEY', 'your-google-api-key'))
+genai.configure(api_key=os.getenv('GOOGLE_API_KEY', 'your-google-api-key'))
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -64,7 +72,8 @@ class UserProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        # Pure read: the profile row is created lazily on the first PUT
+        profile = get_cached_profile(request.user) or UserProfile(user=request.user)
         serializer = UserProfileSerializer(profile)
         return Response(serializer.data)
 
@@ -77,6 +86,57 @@ class UserProfileView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def complete_prediction(prediction):
+    """Run the checks and the model on a saved Prediction's image; returns the API response."""
+    # Step 2: Get correct path to image
+    image_path = prediction.image.path
+
+    # Step 3: Check if OpenCV can read the image
+    import cv2
+    img = cv2.imread(image_path)
+    if img is None:
+        prediction.delete()  # Remove invalid prediction
+        return Response({'error': f'Cannot read uploaded image: {image_path}'}, status=400)
+
+    # Step 3b: Cheap quality checks on the decoded image before the model runs
+    verdict = quality.gate(img)
+    if verdict.outcome == 'rejected':
+        prediction.delete()
+        return Response({'error': 'Image failed quality checks', 'quality_issues': verdict.issues}, status=400)
+    prediction.quality_issues = verdict.issues
+
+    # Step 4: Predict cancer type & confidence
+    result = run_inference(image_path)
+    if result is None or not result.cancer_type or result.confidence is None:
+        prediction.delete()
+        return Response({'error': 'Failed to process image or get confidence score'}, status=400)
+    cancer_type = result.cancer_type
+
+    # Step 5: Update prediction with actual values
+    prediction.predicted_cancer_type = cancer_type
+    prediction.confidence_score = result.confidence
+    prediction.model_version = result.model_version
+    prediction.probabilities = pack_probabilities(result.probabilities)
+
+    # Fill optional fields safely
+    cancer_info = get_cancer_info(cancer_type)
+    prediction.symptoms = cancer_info.get('symptoms', '')
+    prediction.recommendations = cancer_info.get('recommendations', '')
+
+    # Step 6: Create associated Medicine objects
+    medicines_data = get_medicine_suggestions(cancer_type) or []
+    for medicine_data in medicines_data:
+        Medicine.objects.create(prediction=prediction, **medicine_data)
+
+    # Saved last so updated_at (the list's Last-Modified) covers the medicines too
+    prediction.save()
+    embeddings.record(prediction.id, result.model_version, result.embedding)
+
+    # Step 7: Serialize and return
+    prediction_serializer = PredictionSerializer(prediction)
+    return Response(prediction_serializer.data, status=201)
+
+
 class PredictionView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -97,47 +157,116 @@ class PredictionView(APIView):
         prediction = Prediction(user=request.user, image=image, predicted_cancer_type='unknown', confidence_score=0.0)
         prediction.save()  # Save first so file is written to MEDIA_ROOT
 
-        # Step 2: Get correct path to image
-        image_path = prediction.image.path
+        return complete_prediction(prediction)
 
-        # Step 3: Check if OpenCV can read the image
-        import cv2
-        img = cv2.imread(image_path)
-        if img is None:
-            prediction.delete()  # Remove invalid prediction
-            return Response({'error': f'Cannot read uploaded image: {image_path}'}, status=400)
 
-        # Step 4: Predict cancer type & confidence
-        cancer_type, confidence = predict_cancer_type(image_path)
-        if not cancer_type or confidence is None:
-            prediction.delete()
-            return Response({'error': 'Failed to process image or get confidence score'}, status=400)
+def _upload_status(session):
+    config = uploads.get_config()
+    return {
+        'id': str(session.id),
+        'filename': session.filename,
+        'size': session.size,
+        'offset': session.received,
+        'complete': session.received == session.size,
+        'sha256': session.sha256 or None,
+        'max_chunk_size': config['MAX_CHUNK_SIZE'],
+        'expires_at': session.expires_at,
+        'prediction': session.prediction_id,
+    }
 
-        # Step 5: Update prediction with actual values
-        prediction.predicted_cancer_type = cancer_type
-        prediction.confidence_score = confidence
 
-        # Fill optional fields safely
-        cancer_info = get_cancer_info(cancer_type)
-        prediction.symptoms = cancer_info.get('symptoms', '')
-        prediction.recommendations = cancer_info.get('recommendations', '')
+class UploadSessionCreateView(APIView):
+    """Open a chunked upload: {"filename", "size", "sha256" (optional)}."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        try:
+            size = int(request.data.get('size') or 0)
+            session = uploads.create_session(request.user, request.data.get('filename', ''), size,
+                                             request.data.get('sha256', ''))
+        except ValueError:
+            return Response({'error': 'size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        except uploads.UploadError as e:
+            return Response(e.data, status=e.status)
+        return Response(_upload_status(session), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    """GET: resume point. PUT: raw chunk body at the Upload-Offset header. DELETE: abandon."""
+    permission_classes = [permissions.IsAuthenticated]
 
-        prediction.save()  # Save updates
+    def get_session(self, request, session_id):
+        return get_object_or_404(UploadSession, pk=session_id, user=request.user)
 
-        # Step 6: Create associated Medicine objects
-        medicines_data = get_medicine_suggestions(cancer_type) or []
-        for medicine_data in medicines_data:
-            Medicine.objects.create(prediction=prediction, **medicine_data)
+    def get(self, request, session_id):
+        return Response(_upload_status(self.get_session(request, session_id)))
 
-        # Step 7: Serialize and return
-        prediction_serializer = PredictionSerializer(prediction)
-        return Response(prediction_serializer.data, status=201)
+    def put(self, request, session_id):
+        session = self.get_session(request, session_id)
+        try:
+            offset = int(request.META.get('HTTP_UPLOAD_OFFSET', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Upload-Offset header must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # request.stream reads the body incrementally; request.data would buffer it
+            uploads.write_chunk(session, offset, request.stream, length)
+        except uploads.UploadError as e:
+            return Response(e.data, status=e.status)
+        return Response(_upload_status(session))
 
+    def delete(self, request, session_id):
+        session = self.get_session(request, session_id)
+        uploads.discard(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class UploadSessionFinalizeView(APIView):
+    """Turn a complete upload into a prediction (same response as POST /api/predictions/)."""
+    permission_classes = [permissions.IsAuthenticated]
 
+    def post(self, request, session_id):
+        session = get_object_or_404(UploadSession, pk=session_id, user=request.user)
+        if session.prediction_id:
+            # A retried finalize gets the prediction the first one made
+            prediction = get_object_or_404(Prediction, pk=session.prediction_id, user=request.user)
+            return Response(PredictionSerializer(prediction).data)
+        try:
+            path = uploads.finish(session)
+        except uploads.UploadError as e:
+            return Response(e.data, status=e.status)
+
+        # Claim the session before the slow part, so a retry can't run a second inference
+        claimed = UploadSession.objects.filter(pk=session.pk, completed_at__isnull=True).update(
+            completed_at=timezone.now())
+        if not claimed:
+            session.refresh_from_db(fields=['prediction'])
+            if session.prediction_id:
+                prediction = get_object_or_404(Prediction, pk=session.prediction_id, user=request.user)
+                return Response(PredictionSerializer(prediction).data)
+            return Response({'error': 'Upload session is already being finalized'}, status=status.HTTP_409_CONFLICT)
 
-class PredictionListView(generics.ListAPIView):
+        try:
+            prediction = Prediction(user=request.user, predicted_cancer_type='unknown', confidence_score=0.0)
+            with open(path, 'rb') as fh:
+                # Copied into MEDIA_ROOT in blocks by the storage backend
+                prediction.image.save(session.filename, File(fh), save=True)
+            response = complete_prediction(prediction)
+        except Exception:
+            # Release the claim so the client can retry
+            UploadSession.objects.filter(pk=session.pk).update(completed_at=None)
+            raise
+        uploads.discard(session)
+        if response.status_code == 201:
+            UploadSession.objects.filter(pk=session.pk).update(prediction=prediction)
+        return response
+
+
+
+
+
+class PredictionListView(ReplicaReadMixin, ConditionalListMixin, generics.ListAPIView):
     serializer_class = PredictionSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -151,33 +280,139 @@ class PredictionDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         return Prediction.objects.filter(user=self.request.user)
 
-class BlogListView(generics.ListAPIView):
-    serializer_class = BlogSerializer
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Old predictions live in the retention archive (see api/retention.py)
+            archived = retention.get_archived_prediction(kwargs['pk'], user_id=request.user.id)
+            if archived is None:
+                raise
+            return Response(archived)
+
+class PredictionExportView(APIView):
+    """Stream the caller's prediction history as CSV or NDJSON (?since=&until=&model_version=)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self, request):
+        return Prediction.objects.filter(user=request.user)
+
+    def get(self, request, export_format):
+        if export_format not in export.EXPORT_FORMATS:
+            return Response({'error': f"Unsupported format '{export_format}'. Use one of: "
+                                      f"{', '.join(export.EXPORT_FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        params = request.query_params
+        try:
+            queryset = export.filter_predictions(
+                self.get_queryset(request),
+                user_id=params.get('user') if request.user.is_staff else None,
+                since=params.get('since'),
+                until=params.get('until'),
+                model_version=params.get('model_version'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export.stream_export(export_format, queryset),
+            content_type=export.EXPORT_FORMATS[export_format],
+        )
+        filename = f"predictions-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class AdminPredictionExportView(PredictionExportView):
+    """Whole-system export for staff; also accepts ?user=<id>."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_queryset(self, request):
+        return Prediction.objects.all()
+
+class SimilarPredictionsView(APIView):
+    """Past predictions whose lesion embeddings are closest to this one's."""
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 50
+
+    def get(self, request, pk):
+        queryset = Prediction.objects.all() if request.user.is_staff else Prediction.objects.filter(user=request.user)
+        prediction = get_object_or_404(queryset, pk=pk)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), self.max_limit))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Staff search every case; everyone else only their own history
+        allowed_ids = None
+        if not request.user.is_staff:
+            allowed_ids = list(queryset.values_list('id', flat=True))
+        matches = embeddings.similar(prediction, limit, allowed_ids=allowed_ids)
+        if matches is None:
+            return Response({'error': 'No embedding stored for this prediction'}, status=status.HTTP_404_NOT_FOUND)
+
+        found = queryset.select_related('user').prefetch_related('medicines').in_bulk([pid for pid, _ in matches])
+        results = [
+            {
+                'similarity': round(score, 4),
+                'prediction': PredictionSerializer(found[pid], context={'request': request}).data,
+            }
+            for pid, score in matches if pid in found
+        ]
+        return Response({'prediction_id': prediction.id, 'model_version': prediction.model_version, 'results': results})
+
+class BlogListView(ReplicaReadMixin, ConditionalListMixin, generics.ListAPIView):
+    serializer_class = BlogListSerializer
     permission_classes = [permissions.AllowAny]
+
+    def get_extra_state(self):
+        # is_bookmarked changes with the caller's bookmarks
+        if not self.request.user.is_authenticated:
+            return []
+        return [queryset_state(BlogBookmark.objects.filter(user=self.request.user), 'created_at')]
     
     def get_queryset(self):
-        queryset = Blog.objects.filter(is_published=True)
+        # Cards never show the full text, so don't load it
+        queryset = Blog.objects.filter(is_published=True).select_related('author').defer('content')
+        if self.request.user.is_authenticated:
+            queryset = queryset.annotate(bookmarked=Exists(
+                BlogBookmark.objects.filter(user=self.request.user, blog=OuterRef('pk'))))
         
+        tag = self.request.query_params.get('tag')
+        if tag:
+            queryset = queryset.filter(tag_index__slug=tag)
+
         # Search functionality
         search = self.request.query_params.get('search', None)
         if search:
+            tag_match = Blog.tag_index.through.objects.filter(
+                blog=OuterRef('pk'), tag__name=' '.join(search.split()).lower())
             queryset = queryset.filter(
                 Q(title__icontains=search) | 
                 Q(content__icontains=search) | 
-                Q(tags__icontains=search)
+                Exists(tag_match)
             )
         
         return queryset
 
-class BlogDetailView(generics.RetrieveAPIView):
+class BlogTagCloudView(ReplicaReadMixin, APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 200)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'tags': tags.tag_cloud(limit)})
+
+class BlogDetailView(ReplicaReadMixin, generics.RetrieveAPIView):
     serializer_class = BlogSerializer
     permission_classes = [permissions.AllowAny]
     queryset = Blog.objects.filter(is_published=True)
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        # Atomic increment on the primary; the instance may come from the replica
+        Blog.objects.filter(pk=instance.pk).update(views=F('views') + 1)
         instance.views += 1
-        instance.save()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
@@ -216,12 +451,13 @@ class BlogBookmarkView(APIView):
             return Response({'error': 'Bookmark not found'}, 
                           status=status.HTTP_404_NOT_FOUND)
 
-class UserBookmarksView(generics.ListAPIView):
+class UserBookmarksView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = BlogBookmarkSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return BlogBookmark.objects.filter(user=self.request.user)
+        return (BlogBookmark.objects.filter(user=self.request.user)
+                .select_related('blog__author').defer('blog__content'))
 
 class ContactView(APIView):
     permission_classes = [permissions.AllowAny]
@@ -242,7 +478,7 @@ def health_check(request):
     return Response({'status': 'healthy', 'message': 'Healytics API is running'})
 
 
-class StatsView(APIView):
+class StatsView(ReplicaReadMixin, APIView):
     authentication_classes = [] 
     permission_classes = [permissions.AllowAny]  # Allow both guests & logged-in users
 
@@ -271,10 +507,28 @@ class StatsView(APIView):
         else:
             user_stats = None  # or {} if you want empty dict
 
-        return Response({
+        data = {
             "user_stats": user_stats,
             "global_stats": global_stats
-        })
+        }
+        # The counts are the cheap part; a 304 still saves serializing and sending them
+        etag, _ = conditional.validators(request, repr(data))
+        response = conditional.not_modified(request, etag)
+        if response is None:
+            response = Response(data)
+        return conditional.set_validators(response, etag)
+
+class DashboardView(ReplicaReadMixin, APIView):
+    """Stats, recent predictions, bookmarks and featured blogs in one request (?fields= to pick)."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            sections = dashboard.parse_fields(request.query_params.get('fields'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user if request.user.is_authenticated else None
+        return Response(dashboard.build(user, sections))
 
 class ChatAPIView(APIView):
     permission_classes = [AllowAny]
@@ -292,3 +546,107 @@ class ChatAPIView(APIView):
             return Response({'error': str(e)}, status=500)
         return Response({'reply': ai_reply})
 
+def _chat_user(request):
+    return request.user if request.user.is_authenticated else None
+
+def _chat_message_data(message):
+    return {'role': message.role, 'content': message.content, 'created_at': message.created_at}
+
+class ChatSessionCreateView(APIView):
+    """Start a server-side conversation; follow-ups only send the new message."""
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        session = chat.create_session(_chat_user(request))
+        return Response({'session_id': str(session.id)}, status=status.HTTP_201_CREATED)
+
+class ChatSessionMixin:
+    permission_classes = [AllowAny]
+
+    def get_session(self, request, session_id):
+        session = chat.get_session(session_id, _chat_user(request))
+        if session is None:
+            raise Http404('Chat session not found')
+        return session
+
+class ChatSessionView(ChatSessionMixin, APIView):
+    def get(self, request, session_id):
+        session = self.get_session(request, session_id)
+        return Response({
+            'session_id': str(session.id),
+            'messages': [_chat_message_data(m) for m in session.messages.all()],
+            'usage': chat.usage(session),
+        })
+
+    def delete(self, request, session_id):
+        self.get_session(request, session_id).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class ChatSessionMessageView(ChatSessionMixin, APIView):
+    def post(self, request, session_id):
+        session = self.get_session(request, session_id)
+        user_message = request.data.get('message')
+        if not user_message:
+            return Response({'error': 'No message provided.'}, status=400)
+        try:
+            reply = chat.send(session, user_message)
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+        return Response({
+            'reply': reply.content,
+            'usage': {
+                'prompt_tokens': reply.prompt_tokens,
+                'full_history_tokens': reply.full_history_tokens,
+                'saved_tokens': reply.full_history_tokens - reply.prompt_tokens,
+            },
+        })
+
+# -------------------- PROFILING (admin only) --------------------
+class ProfileListView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'profiles': profiling.list_profiles()})
+
+class ProfileDownloadView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, name):
+        path = profiling.resolve_profile(name)
+        if path is None:
+            raise Http404('Profile not found')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=os.path.basename(path))
+
+class ShadowReportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(shadow.report(request.query_params.get('candidate')))
+
+class QualityReportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(quality.report())
+
+    def delete(self, request):
+        metrics.reset(quality.CHECKED, quality.FAILURES)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class MetricsView(APIView):
+    """Shared counters in the Prometheus text format."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Modules declare their counters on import
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4')
+
+class CascadeReportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(cascade.report())
+
+    def delete(self, request):
+        cascade.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
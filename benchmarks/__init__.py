@@ -0,0 +1,6 @@
+"""
+Benchmark and load-test suite for the Healytics API.
+
+Run everything with ``python -m benchmarks --output bench.json`` and diff two
+reports with ``python -m benchmarks.compare old.json new.json``.
+"""
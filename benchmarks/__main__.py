@@ -0,0 +1,29 @@
+"""
+Run the full benchmark suite (microbenchmarks + in-process load test) and
+write a single JSON report.
+"""
+
+import argparse
+
+from . import load, micro
+from .common import setup_django, write_report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Healytics benchmark suite')
+    parser.add_argument('--iterations', type=int, default=50, help='Microbenchmark iterations')
+    parser.add_argument('--requests', type=int, default=200, help='Load-test requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--upstream-latency', type=float, default=0.0)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    results = {'micro': micro.run(args.iterations)}
+    target = load.InProcessTarget(upstream_latency=args.upstream_latency)
+    results['load'] = load.run(target, list(load.ENDPOINTS), args.requests, args.concurrency)
+    write_report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
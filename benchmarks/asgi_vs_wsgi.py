@@ -0,0 +1,119 @@
+"""
+Compare one uvicorn worker serving the async endpoints against gunicorn sync
+workers serving the classic ones, with slow upstreams.
+
+Both servers run benchmarks.stub_app (Gemini stubbed, openFDA served by a
+local stub with the same latency, stand-in model) against a throwaway
+database, and are driven with many concurrent clients so the result shows
+how many requests each setup can keep waiting on upstreams at once.
+
+    python -m benchmarks.asgi_vs_wsgi --concurrency 200 --upstream-latency 0.5
+"""
+
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import load
+from .common import BASE_DIR, setup_django, write_report
+from .stubs import StubOpenFDAServer
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url, proc, timeout=120):
+    import requests
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited early with status {proc.returncode}")
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+
+def _servers(args):
+    """name -> (command for a given port, endpoint table, extra environment)"""
+    return {
+        f'gunicorn_sync_w{args.gunicorn_workers}': (
+            lambda port: [sys.executable, '-m', 'gunicorn', 'benchmarks.stub_app:wsgi_application',
+                          '--workers', str(args.gunicorn_workers), '--bind', f'127.0.0.1:{port}',
+                          '--timeout', '300'],
+            load.ENDPOINTS, {},
+        ),
+        'uvicorn_async_w1': (
+            lambda port: [sys.executable, '-m', 'uvicorn', 'benchmarks.stub_app:asgi_application',
+                          '--workers', '1', '--host', '127.0.0.1', '--port', str(port),
+                          '--no-access-log'],
+            load.ASYNC_ENDPOINTS, {'HEALYTICS_ASGI': '1'},
+        ),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--endpoints', nargs='*', default=['chat', 'predictions', 'stats'],
+                        choices=list(load.ASYNC_ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--upstream-latency', type=float, default=0.5)
+    parser.add_argument('--gunicorn-workers', type=int, default=4)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='healytics-asgi-')
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='benchmarks.settings',
+        BENCH_DB_PATH=os.path.join(workdir, 'bench.sqlite3'),
+        BENCH_MEDIA_ROOT=os.path.join(workdir, 'media'),
+        BENCH_UPSTREAM_LATENCY=str(args.upstream_latency),
+    )
+    results = {}
+    try:
+        with StubOpenFDAServer(latency=args.upstream_latency) as fda:
+            env['BENCH_OPENFDA_URL'] = fda.base_url
+            subprocess.run([sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'],
+                           cwd=BASE_DIR, env=env, check=True)
+
+            os.environ.update({k: env[k] for k in ('DJANGO_SETTINGS_MODULE', 'BENCH_DB_PATH')})
+            setup_django('benchmarks.settings')
+            from django.contrib.auth.models import User
+            from rest_framework_simplejwt.tokens import RefreshToken
+            user = User.objects.create_user('asgi-bench', 'asgi@example.com', 'asgi-bench-password')
+            token = str(RefreshToken.for_user(user).access_token)
+
+            for name, (command, endpoints, extra_env) in _servers(args).items():
+                port = _free_port()
+                base_url = f'http://127.0.0.1:{port}'
+                proc = subprocess.Popen(command(port), cwd=BASE_DIR, env=dict(env, **extra_env),
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                try:
+                    _wait_ready(base_url + '/api/health/', proc)
+                    target = load.HttpTarget(base_url, token, endpoints)
+                    results[name] = load.run(target, args.endpoints, args.requests, args.concurrency)
+                finally:
+                    proc.terminate()
+                    proc.wait(timeout=30)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    write_report({'asgi_vs_wsgi': results, 'upstream_latency_s': args.upstream_latency}, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Concurrent write throughput for each DB_PROFILE.
+
+Starts N worker processes (like N gunicorn workers) that hammer the database
+with the app's common writes at the same moment: contact form inserts, blog
+view counter increments and prediction inserts. Reports writes/s, latency
+percentiles and how many writes failed with "database is locked".
+
+    python -m benchmarks.bench_db --workers 8 --writes 500
+    python -m benchmarks.bench_db --profiles postgres   # uses POSTGRES_* env, scratch DB!
+
+SQLite profiles run against a throwaway database file; the postgres profile
+migrates and writes to the database named by POSTGRES_DB.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from .common import BASE_DIR, summarize, write_report
+
+PROFILES = ('sqlite', 'sqlite-wal', 'postgres')
+OPERATIONS = ('contact', 'blog_view', 'prediction')
+
+
+def _env(profile, db_path):
+    env = dict(os.environ, DB_PROFILE=profile, DJANGO_SETTINGS_MODULE='benchmarks.settings')
+    if profile != 'postgres':
+        env['BENCH_DB_PATH'] = db_path
+    return env
+
+
+def _prepare(profile, db_path):
+    """Migrate and seed one user and blog post for the workers to write against."""
+    env = _env(profile, db_path)
+    subprocess.run([sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0'],
+                   cwd=BASE_DIR, env=env, check=True)
+    subprocess.run([sys.executable, '-m', 'benchmarks.bench_db', '--seed'], cwd=BASE_DIR, env=env, check=True)
+
+
+def _seed():
+    from .common import setup_django
+    setup_django('benchmarks.settings')
+    from django.contrib.auth.models import User
+    from api.models import Blog
+
+    user, _ = User.objects.get_or_create(username='bench-db', defaults={'email': 'bench-db@example.com'})
+    Blog.objects.get_or_create(title='Bench post', author=user, defaults={'content': 'lorem ipsum'})
+
+
+def _worker(writes, start_at, seed):
+    """Runs in a child process; prints one JSON line with its results."""
+    from .common import setup_django
+    setup_django('benchmarks.settings')
+    from django.contrib.auth.models import User
+    from django.db import OperationalError
+    from django.db.models import F
+    from api.models import Blog, Contact, Prediction
+
+    user = User.objects.get(username='bench-db')
+    blog_id = Blog.objects.filter(author=user).values_list('id', flat=True).first()
+    rng = random.Random(seed)
+
+    def write(operation):
+        if operation == 'contact':
+            Contact.objects.create(name='Bench', email='bench@example.com', subject='Load', message='x' * 200)
+        elif operation == 'blog_view':
+            Blog.objects.filter(pk=blog_id).update(views=F('views') + 1)
+        else:
+            Prediction.objects.create(user=user, image='predictions/bench.jpg', predicted_cancer_type='benign',
+                                      confidence_score=90.0)
+
+    time.sleep(max(0.0, start_at - time.time()))
+    latencies, locked, other_errors = [], 0, 0
+    started = time.perf_counter()
+    for _ in range(writes):
+        t0 = time.perf_counter()
+        try:
+            write(rng.choice(OPERATIONS))
+            latencies.append(time.perf_counter() - t0)
+        except OperationalError as e:
+            if 'locked' in str(e):
+                locked += 1
+            else:
+                other_errors += 1
+    print(json.dumps({'latencies': latencies, 'locked': locked, 'errors': other_errors,
+                      'wall_time': time.perf_counter() - started}))
+
+
+def run_profile(profile, workers, writes):
+    workdir = tempfile.mkdtemp(prefix='healytics-db-')
+    db_path = os.path.join(workdir, 'bench.sqlite3')
+    try:
+        _prepare(profile, db_path)
+        start_at = time.time() + 2.0 + 0.2 * workers  # let every worker finish importing Django
+        procs = [
+            subprocess.Popen(
+                [sys.executable, '-m', 'benchmarks.bench_db', '--worker', '--writes', str(writes),
+                 '--start-at', repr(start_at), '--seed-value', str(i)],
+                cwd=BASE_DIR, env=_env(profile, db_path), stdout=subprocess.PIPE, text=True,
+            )
+            for i in range(workers)
+        ]
+        outputs = [json.loads(proc.communicate()[0].strip().splitlines()[-1]) for proc in procs]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = [latency for out in outputs for latency in out['latencies']]
+    wall_time = max(out['wall_time'] for out in outputs)
+    result = summarize(latencies, wall_time, errors=sum(out['locked'] + out['errors'] for out in outputs))
+    result['database_locked'] = sum(out['locked'] for out in outputs)
+    result['workers'] = workers
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', nargs='*', default=['sqlite', 'sqlite-wal'], choices=PROFILES)
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent writer processes')
+    parser.add_argument('--writes', type=int, default=500, help='Writes per worker')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--seed', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--seed-value', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        return _seed()
+    if args.worker:
+        return _worker(args.writes, args.start_at, args.seed_value)
+
+    results = {}
+    for profile in args.profiles:
+        print(f"Running {profile} with {args.workers} workers x {args.writes} writes...", file=sys.stderr)
+        results[f'db_writes.{profile}'] = run_profile(profile, args.workers, args.writes)
+    write_report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Throughput of ``predict_cancer_type`` across worker x TensorFlow thread counts.
+
+Every combination starts W worker processes (like W gunicorn workers), each
+configured through ``api.runtime`` with T intra-op threads, and has them
+call ``predict_cancer_type`` on the same image at the same moment. Reports
+images/s and latency percentiles per combination and the best-throughput
+configuration.
+
+    python -m benchmarks.bench_threading --workers 1 2 4 --threads 1 2 4 auto
+    python -m benchmarks.bench_threading --pin --model models/skin_disease_model_best.h5
+
+Uses the stand-in model unless --model is given.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from .common import BASE_DIR, summarize, write_report, write_test_image
+
+
+def _worker(args):
+    """Runs in a child process; prints one JSON line with its results."""
+    from .common import build_standin_model, setup_django
+    setup_django()
+    from api import runtime
+
+    # Before TensorFlow is imported by anything else
+    applied = runtime.configure(worker_slot=args.slot, workers=args.worker_count, config={
+        'WORKERS': args.worker_count,
+        'INTRA_OP_THREADS': 0 if args.thread_count == 'auto' else int(args.thread_count),
+        'INTER_OP_THREADS': 0,
+        'PIN_CPUS': args.pin,
+    })
+    from api import utils
+    from api.model_registry import load_keras_model
+
+    model = load_keras_model(args.model) if args.model else build_standin_model()
+    utils.registry.pin(model, version='bench')
+    for _ in range(3):
+        utils.predict_cancer_type(args.image)
+
+    time.sleep(max(0.0, args.start_at - time.time()))
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.calls):
+        t0 = time.perf_counter()
+        utils.predict_cancer_type(args.image)
+        latencies.append(time.perf_counter() - t0)
+    print(json.dumps({'latencies': latencies, 'wall_time': time.perf_counter() - started,
+                      'intra_op_threads': applied.intra_op_threads, 'cpuset': applied.cpuset}))
+
+
+def run_combination(workers, threads, calls, image, model=None, pin=False):
+    start_at = time.time() + 5.0 + 1.0 * workers  # TensorFlow import and warm-up
+    command = [sys.executable, '-m', 'benchmarks.bench_threading', '--worker', '--image', image,
+               '--calls', str(calls), '--start-at', repr(start_at), '--worker-count', str(workers),
+               '--thread-count', str(threads)]
+    if model:
+        command += ['--model', model]
+    if pin:
+        command.append('--pin')
+    procs = [subprocess.Popen(command + ['--slot', str(slot)], cwd=BASE_DIR, stdout=subprocess.PIPE, text=True)
+             for slot in range(workers)]
+    outputs = [json.loads(proc.communicate()[0].strip().splitlines()[-1]) for proc in procs]
+
+    latencies = [latency for out in outputs for latency in out['latencies']]
+    result = summarize(latencies, max(out['wall_time'] for out in outputs))
+    result.update(workers=workers, intra_op_threads=outputs[0]['intra_op_threads'], pinned=pin,
+                  cpusets=[out['cpuset'] for out in outputs] if pin else None)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', nargs='*', type=int, default=[1, 2, 4], help='Worker counts to try')
+    parser.add_argument('--threads', nargs='*', default=['1', '2', '4', 'auto'],
+                        help="Intra-op thread counts to try ('auto' = CPUs // workers)")
+    parser.add_argument('--calls', type=int, default=50, help='predict_cancer_type calls per worker')
+    parser.add_argument('--model', help='Keras model file (default: stand-in model)')
+    parser.add_argument('--pin', action='store_true', help='Pin each worker to its own cores')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--image', help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--slot', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--worker-count', type=int, default=1, help=argparse.SUPPRESS)
+    parser.add_argument('--thread-count', default='auto', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return _worker(args)
+
+    workdir = tempfile.mkdtemp(prefix='healytics-threading-')
+    image = write_test_image(os.path.join(workdir, 'lesion.jpg'))
+    results = {}
+    try:
+        for workers in args.workers:
+            for threads in args.threads:
+                print(f"Running {workers} workers x {threads} threads...", file=sys.stderr)
+                results[f'predict_cancer_type.w{workers}_t{threads}'] = run_combination(
+                    workers, threads, args.calls, image, args.model, args.pin)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    best = max(results, key=lambda name: results[name]['throughput_per_s'])
+    results['best'] = {'name': best, 'workers': results[best]['workers'],
+                       'intra_op_threads': results[best]['intra_op_threads'],
+                       'throughput_per_s': results[best]['throughput_per_s']}
+    print(f"Best: {best} ({results[best]['throughput_per_s']} images/s)", file=sys.stderr)
+    write_report(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Shared helpers for the benchmark suite: Django bootstrapping, timing,
+latency summaries, stand-in model/image fixtures and JSON reports.
+"""
+
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same contract as skin_disease_model_best.h5 (see models/README.md)
+INPUT_SHAPE = (224, 224, 3)
+NUM_CLASSES = 7
+
+
+def setup_django(settings_module='healytics.settings'):
+    """Configure Django for standalone scripts run from the repository root."""
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+class TemporaryDatabase:
+    """
+    Create a throwaway SQLite test database (and media root) for in-process
+    benchmarks so runs never touch db.sqlite3 or media/.
+    """
+
+    def __init__(self):
+        self.workdir = tempfile.mkdtemp(prefix='healytics-bench-')
+        self._old_config = None
+
+    def __enter__(self):
+        from django.conf import settings
+        from django.test.utils import setup_databases, setup_test_environment
+
+        settings.DATABASES['default']['TEST'] = {'NAME': os.path.join(self.workdir, 'bench.sqlite3')}
+        settings.MEDIA_ROOT = os.path.join(self.workdir, 'media')
+        setup_test_environment()
+        self._old_config = setup_databases(verbosity=0, interactive=False)
+        return self
+
+    def __exit__(self, *exc):
+        import shutil
+        from django.test.utils import teardown_databases, teardown_test_environment
+
+        teardown_databases(self._old_config, verbosity=0)
+        teardown_test_environment()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        return False
+
+
+def percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * (pct / 100.0)
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies, wall_time, items_per_call=1, errors=0):
+    """Summarize per-call latencies (seconds) into throughput and p50/p95/p99 (ms)."""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'count': count,
+        'errors': errors,
+        'wall_time_s': round(wall_time, 4),
+        'throughput_per_s': round((count * items_per_call) / wall_time, 2) if wall_time > 0 else 0.0,
+        'mean_ms': round(1000.0 * sum(values) / count, 3) if count else 0.0,
+        'p50_ms': round(1000.0 * percentile(values, 50), 3),
+        'p95_ms': round(1000.0 * percentile(values, 95), 3),
+        'p99_ms': round(1000.0 * percentile(values, 99), 3),
+        'max_ms': round(1000.0 * values[-1], 3) if count else 0.0,
+    }
+
+
+def time_calls(fn, iterations, warmup=3, items_per_call=1):
+    """Call ``fn`` repeatedly and return a latency summary."""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - started, items_per_call=items_per_call)
+
+
+def build_standin_model(seed=0):
+    """
+    Small randomly initialised Keras model with the production input/output
+    contract (224x224x3 -> 7-way softmax). It stands in for the real .h5 file
+    so benchmarks run anywhere and stay comparable between commits.
+    """
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(shape=INPUT_SHAPE)
+    x = tf.keras.layers.Conv2D(16, 3, strides=2, activation='relu')(inputs)
+    x = tf.keras.layers.Conv2D(32, 3, strides=2, activation='relu')(x)
+    x = tf.keras.layers.Conv2D(64, 3, strides=2, activation='relu')(x)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    x = tf.keras.layers.Dense(64, activation='relu')(x)
+    outputs = tf.keras.layers.Dense(NUM_CLASSES, activation='softmax')(x)
+    return tf.keras.Model(inputs, outputs, name='standin_skin_model')
+
+
+def make_test_image(size=(640, 480), seed=0, fmt='JPEG'):
+    """Return encoded bytes of a deterministic random RGB image."""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def write_test_image(path, size=(640, 480), seed=0):
+    with open(path, 'wb') as fh:
+        fh.write(make_test_image(size=size, seed=seed))
+    return path
+
+
+def environment_info():
+    """Metadata recorded with every report so results can be compared fairly."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_report(results, output=None):
+    """Write a JSON report (stable key order so two runs diff cleanly)."""
+    report = {'environment': environment_info(), 'results': results}
+    text = json.dumps(report, indent=2, sort_keys=True, default=str)
+    if output:
+        with open(output, 'w') as fh:
+            fh.write(text + '\n')
+        print(f"Report written to {output}")
+    else:
+        print(text)
+    return report
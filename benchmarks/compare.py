@@ -0,0 +1,71 @@
+"""
+Compare two benchmark reports and print per-metric deltas.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 when any p95 latency regresses by more than the threshold
+(percent), so it can gate CI.
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ('throughput_per_s', 'p50_ms', 'p95_ms', 'p99_ms')
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict) and 'p50_ms' in value:
+            flat[name] = value
+        elif isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+    return flat
+
+
+def _delta(old, new):
+    if not old:
+        return None
+    return 100.0 * (new - old) / old
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diff two benchmark JSON reports')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Allowed p95 regression in percent')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as fh:
+        base = json.load(fh)
+    with open(args.candidate) as fh:
+        cand = json.load(fh)
+
+    old, new = _flatten(base['results']), _flatten(cand['results'])
+    print(f"baseline {base['environment'].get('commit')}  ->  candidate {cand['environment'].get('commit')}")
+    regressions = []
+    for name in sorted(set(old) | set(new)):
+        if name not in old or name not in new:
+            print(f"  {name}: only in {'candidate' if name in new else 'baseline'}")
+            continue
+        parts = []
+        for metric in METRICS:
+            delta = _delta(old[name].get(metric), new[name].get(metric))
+            if delta is not None:
+                parts.append(f"{metric} {old[name][metric]} -> {new[name][metric]} ({delta:+.1f}%)")
+        print(f"  {name}: " + '; '.join(parts))
+        p95 = _delta(old[name].get('p95_ms'), new[name].get('p95_ms'))
+        if p95 is not None and p95 > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\np95 regressions above {args.threshold}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
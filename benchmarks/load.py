@@ -0,0 +1,200 @@
+"""
+End-to-end load generator for the public API endpoints.
+
+By default the whole stack runs in-process against a throwaway database, with
+openFDA served by a local stub server, Gemini replaced by a stub model and the
+real .h5 file replaced by the stand-in model. Pass ``--base-url`` to drive a
+running server instead (stubs are then the server's responsibility).
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import (
+    TemporaryDatabase, build_standin_model, make_test_image, setup_django,
+    summarize, write_report,
+)
+
+# name -> (method, path, needs_auth)
+ENDPOINTS = {
+    'predictions': ('post', '/api/predictions/', True),
+    'blogs': ('get', '/api/blogs/', False),
+    'stats': ('get', '/api/stats/', False),
+    'chat': ('post', '/api/chat/', False),
+}
+
+# Same endpoints served by api/async_views.py
+ASYNC_ENDPOINTS = {
+    'predictions': ('post', '/api/async/predictions/', True),
+    'stats': ('get', '/api/async/stats/', False),
+    'chat': ('post', '/api/async/chat/', False),
+}
+
+CHAT_MESSAGE = 'What are the early warning signs of melanoma?'
+
+
+def run_load(send, total, concurrency):
+    """Issue ``total`` calls of ``send()`` from ``concurrency`` threads."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(_):
+        nonlocal errors
+        t0 = time.perf_counter()
+        try:
+            ok = send()
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - t0
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    return summarize(latencies, time.perf_counter() - started, errors=errors)
+
+
+class InProcessTarget:
+    """Drives the Django app through the test client with all upstreams stubbed."""
+
+    def __init__(self, upstream_latency=0.0):
+        self.upstream_latency = upstream_latency
+        self._local = threading.local()
+        self._image = make_test_image()
+
+    def __enter__(self):
+        from django.contrib.auth.models import User
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from api import utils
+        from api.models import Blog
+        from .stubs import StubOpenFDAServer, install_gemini_stub, install_openfda_stub
+
+        self._db = TemporaryDatabase().__enter__()
+        self._fda = StubOpenFDAServer(latency=self.upstream_latency).__enter__()
+        install_openfda_stub(self._fda.base_url)
+        install_gemini_stub(latency=self.upstream_latency)
+        utils.registry.pin(build_standin_model(), version='standin')
+
+        user = User.objects.create_user('loadtest', 'load@example.com', 'load-password')
+        Blog.objects.bulk_create([
+            Blog(title=f'Blog {i}', content='lorem ipsum ' * 600, author=user, tags='skin')
+            for i in range(50)
+        ])
+        self.token = str(RefreshToken.for_user(user).access_token)
+        return self
+
+    def __exit__(self, *exc):
+        self._fda.__exit__(*exc)
+        self._db.__exit__(*exc)
+        return False
+
+    def _client(self):
+        from django.test import Client
+
+        if not hasattr(self._local, 'client'):
+            self._local.client = Client()
+        return self._local.client
+
+    def sender(self, name):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        method, path, needs_auth = ENDPOINTS[name]
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'} if needs_auth else {}
+
+        def send():
+            client = self._client()
+            if name == 'predictions':
+                upload = SimpleUploadedFile('lesion.jpg', self._image, content_type='image/jpeg')
+                response = client.post(path, {'image': upload}, **headers)
+            elif name == 'chat':
+                response = client.post(path, {'message': CHAT_MESSAGE},
+                                       content_type='application/json', **headers)
+            else:
+                response = getattr(client, method)(path, **headers)
+            return response.status_code < 400
+
+        return send
+
+
+class HttpTarget:
+    """Drives a running server over HTTP (one keep-alive session per thread)."""
+
+    def __init__(self, base_url, token=None, endpoints=ENDPOINTS):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.endpoints = endpoints
+        self._local = threading.local()
+        self._image = make_test_image()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _session(self):
+        import requests
+
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def sender(self, name):
+        method, path, needs_auth = self.endpoints[name]
+        url = self.base_url + path
+        headers = {'Authorization': f'Bearer {self.token}'} if needs_auth and self.token else {}
+
+        def send():
+            session = self._session()
+            if name == 'predictions':
+                files = {'image': ('lesion.jpg', self._image, 'image/jpeg')}
+                response = session.post(url, files=files, headers=headers, timeout=120)
+            elif name == 'chat':
+                response = session.post(url, json={'message': CHAT_MESSAGE}, headers=headers, timeout=120)
+            else:
+                response = session.request(method, url, headers=headers, timeout=120)
+            return response.status_code < 400
+
+        return send
+
+
+def run(target, endpoints, requests_per_endpoint, concurrency):
+    results = {}
+    with target:
+        for name in endpoints:
+            results[f'{name}.c{concurrency}'] = run_load(
+                target.sender(name), requests_per_endpoint, concurrency)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--endpoints', nargs='*', default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--upstream-latency', type=float, default=0.0,
+                        help='Seconds of simulated openFDA/Gemini latency (in-process mode)')
+    parser.add_argument('--base-url', help='Load-test a running server instead of running in-process')
+    parser.add_argument('--token', help='JWT access token for authenticated endpoints (with --base-url)')
+    parser.add_argument('--async-endpoints', action='store_true',
+                        help='Hit the /api/async/ variants (with --base-url)')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    if args.base_url:
+        target = HttpTarget(args.base_url, args.token,
+                            ASYNC_ENDPOINTS if args.async_endpoints else ENDPOINTS)
+    else:
+        setup_django()
+        target = InProcessTarget(upstream_latency=args.upstream_latency)
+    write_report({'load': run(target, args.endpoints, args.requests, args.concurrency)}, args.output)
+
+
+if __name__ == '__main__':
+    main()
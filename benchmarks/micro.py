@@ -0,0 +1,155 @@
+"""
+Microbenchmarks for the hot paths behind the prediction and listing APIs:
+
+* ``preprocess_image`` through the OpenCV and the PIL code paths
+* ``preprocess_batch`` at several batch sizes, with and without TTA variants
+* model inference at several batch sizes (stand-in model, same I/O shape)
+* ``predict_cancer_type`` end to end for a single image
+* serializers at realistic page sizes
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .common import (
+    TemporaryDatabase, build_standin_model, setup_django, time_calls,
+    write_report, write_test_image,
+)
+
+BATCH_SIZES = (1, 4, 16, 32)
+PAGE_SIZES = (10, 50, 100)
+
+
+def bench_preprocess(image_path, iterations, batch_sizes=BATCH_SIZES):
+    from api import preprocessing, utils
+
+    results = {}
+    original = preprocessing.CV2_AVAILABLE
+    try:
+        if original:
+            results['preprocess_image.cv2'] = time_calls(
+                lambda: utils.preprocess_image(image_path), iterations)
+        preprocessing.CV2_AVAILABLE = False
+        results['preprocess_image.pil'] = time_calls(
+            lambda: utils.preprocess_image(image_path), iterations)
+    finally:
+        preprocessing.CV2_AVAILABLE = original
+
+    for batch_size in batch_sizes:
+        paths = [image_path] * batch_size
+        results[f'preprocess_batch.batch_{batch_size}'] = time_calls(
+            lambda: preprocessing.preprocess_batch(paths), iterations, items_per_call=batch_size)
+        results[f'preprocess_batch.batch_{batch_size}.tta_4'] = time_calls(
+            lambda: preprocessing.preprocess_batch(paths, tta='hflip,vflip,rot90'),
+            iterations, items_per_call=batch_size)
+    return results
+
+
+def bench_inference(image_path, iterations, batch_sizes=BATCH_SIZES):
+    from api import utils
+
+    model = build_standin_model()
+    utils.registry.pin(model, version='standin')
+    img = utils.preprocess_image(image_path)
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = np.repeat(img, batch_size, axis=0)
+        results[f'model.predict.batch_{batch_size}'] = time_calls(
+            lambda: model.predict(batch, verbose=0), iterations, items_per_call=batch_size)
+    results['predict_cancer_type'] = time_calls(
+        lambda: utils.predict_cancer_type(image_path), iterations)
+    return results
+
+
+def _seed_rows(count, image_path):
+    from django.contrib.auth.models import User
+    from api.models import Blog, Medicine, Prediction
+
+    user = User.objects.create_user('bench', 'bench@example.com', 'bench-password')
+    predictions = Prediction.objects.bulk_create([
+        Prediction(user=user, image=image_path, predicted_cancer_type='benign',
+                   confidence_score=90.0, symptoms='s' * 120, recommendations='r' * 120)
+        for _ in range(count)
+    ])
+    Medicine.objects.bulk_create([
+        Medicine(prediction=p, name=f'Medicine {i}', generic_name='generic',
+                 dosage_form='CREAM', manufacturer='Bench', description='d' * 400)
+        for p in predictions for i in range(5)
+    ])
+    Blog.objects.bulk_create([
+        Blog(title=f'Blog {i}', content='lorem ipsum ' * 600, author=user, tags='skin,cancer')
+        for i in range(count)
+    ])
+    return user
+
+
+def bench_serializers(image_path, iterations, page_sizes=PAGE_SIZES):
+    from django.test import RequestFactory
+    from api.models import Blog, Prediction
+    from django.db.models import Exists, OuterRef
+    from api.models import BlogBookmark
+    from api.serializers import BlogListSerializer, BlogSerializer, PredictionSerializer
+
+    results = {}
+    with TemporaryDatabase():
+        user = _seed_rows(max(page_sizes), os.path.basename(image_path))
+        request = RequestFactory().get('/api/blogs/')
+        request.user = user
+        for size in page_sizes:
+            def serialize_predictions():
+                page = Prediction.objects.filter(user=user)[:size]
+                return PredictionSerializer(page, many=True).data
+
+            def serialize_blogs():
+                page = Blog.objects.filter(is_published=True)[:size]
+                return BlogSerializer(page, many=True, context={'request': request}).data
+
+            results[f'PredictionSerializer.page_{size}'] = time_calls(
+                serialize_predictions, iterations, items_per_call=size)
+            def serialize_blog_cards():
+                # Same query as BlogListView
+                page = (Blog.objects.filter(is_published=True).select_related('author').defer('content')
+                        .annotate(bookmarked=Exists(BlogBookmark.objects.filter(user=user, blog=OuterRef('pk')))))
+                return BlogListSerializer(page[:size], many=True, context={'request': request}).data
+
+            results[f'BlogSerializer.page_{size}'] = time_calls(
+                serialize_blogs, iterations, items_per_call=size)
+            results[f'BlogListSerializer.page_{size}'] = time_calls(
+                serialize_blog_cards, iterations, items_per_call=size)
+    return results
+
+
+def run(iterations=50, sections=('preprocess', 'inference', 'serializers')):
+    workdir = tempfile.mkdtemp(prefix='healytics-micro-')
+    image_path = write_test_image(os.path.join(workdir, 'lesion.jpg'))
+    results = {}
+    try:
+        if 'preprocess' in sections:
+            results.update(bench_preprocess(image_path, iterations))
+        if 'inference' in sections:
+            results.update(bench_inference(image_path, max(5, iterations // 5)))
+        if 'serializers' in sections:
+            results.update(bench_serializers(image_path, max(5, iterations // 5)))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--only', nargs='*', default=['preprocess', 'inference', 'serializers'])
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    write_report({'micro': run(args.iterations, args.only)}, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+"""
+Settings for servers launched by the benchmarks: production settings with a
+throwaway database and media root supplied through the environment.
+"""
+
+import os
+
+from healytics.settings import *  # noqa: F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+
+DATABASES['default']['NAME'] = os.environ.get('BENCH_DB_PATH', DATABASES['default']['NAME'])  # noqa: F405
+MEDIA_ROOT = os.environ.get('BENCH_MEDIA_ROOT', MEDIA_ROOT)  # noqa: F405
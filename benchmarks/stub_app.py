@@ -0,0 +1,39 @@
+"""
+WSGI/ASGI entry points with the upstream stubs and the stand-in model
+installed, for benchmarking real servers:
+
+    gunicorn benchmarks.stub_app:wsgi_application
+    HEALYTICS_ASGI=1 uvicorn benchmarks.stub_app:asgi_application
+
+Environment: BENCH_UPSTREAM_LATENCY (seconds), BENCH_OPENFDA_URL, BENCH_DB_PATH,
+BENCH_MEDIA_ROOT.
+"""
+
+import os
+
+from .common import build_standin_model, setup_django
+
+setup_django('benchmarks.settings')
+
+from api import utils  # noqa: E402
+from .stubs import install_gemini_stub, install_openfda_stub  # noqa: E402
+
+install_gemini_stub(latency=float(os.environ.get('BENCH_UPSTREAM_LATENCY', '0')))
+if os.environ.get('BENCH_OPENFDA_URL'):
+    install_openfda_stub(os.environ['BENCH_OPENFDA_URL'])
+utils.registry.pin(build_standin_model(), version='standin')
+
+
+def _wsgi():
+    from django.core.wsgi import get_wsgi_application
+    return get_wsgi_application()
+
+
+def _asgi():
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+    from django.core.asgi import get_asgi_application
+    return ASGIStaticFilesHandler(get_asgi_application())
+
+
+wsgi_application = _wsgi()
+asgi_application = _asgi()
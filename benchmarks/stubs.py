@@ -0,0 +1,98 @@
+"""
+Local stand-ins for the external services used on the request path
+(openFDA drug labels and Gemini), with configurable latency so load tests
+measure our own overhead rather than the upstreams'.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STUB_LABEL = {
+    'openfda': {
+        'generic_name': ['IMIQUIMOD'],
+        'brand_name': ['Stub Cream'],
+        'dosage_form': ['CREAM'],
+        'manufacturer_name': ['Benchmark Labs'],
+    },
+    'indications_and_usage': ['Stubbed label used by the Healytics benchmark suite.'],
+}
+
+
+class StubOpenFDAServer:
+    """Threaded HTTP server answering ``/drug/label.json`` with canned results."""
+
+    def __init__(self, latency=0.0, results=5, host='127.0.0.1', port=0):
+        payload = json.dumps({'results': [STUB_LABEL] * results}).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if latency:
+                    time.sleep(latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/drug"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+
+class _StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGenerativeModel:
+    """Drop-in for ``genai.GenerativeModel`` that sleeps instead of calling Gemini."""
+
+    latency = 0.0
+
+    def __init__(self, model_name, **kwargs):
+        self.model_name = model_name
+
+    def generate_content(self, contents, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return _StubResponse(f"[stub:{self.model_name}] {str(contents)[:80]}")
+
+    async def generate_content_async(self, contents, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _StubResponse(f"[stub:{self.model_name}] {str(contents)[:80]}")
+
+
+def install_gemini_stub(latency=0.0):
+    """Route every ``genai.GenerativeModel`` created by the API to the stub."""
+    import google.generativeai as genai
+
+    StubGenerativeModel.latency = latency
+    genai.GenerativeModel = StubGenerativeModel
+
+
+def install_openfda_stub(base_url):
+    """Point medicine lookups at a local stub server."""
+    from api import utils
+
+    utils.MED_API_BASE = base_url
@@ -83,9 +83,9 @@ const Blog = () => {
                   />
                 )}
                 <h2 className="text-xl font-bold mb-2">{blog.title}</h2>
-                <p className="text-gray-600 mb-4 line-clamp-3">{blog.content}</p>
+                <p className="text-gray-600 mb-4 line-clamp-3">{blog.excerpt}</p>
                 <div className="text-sm text-gray-500">
-                  By {blog.author?.username} • {new Date(blog.created_at).toLocaleDateString()}
+                  By {blog.author?.username} • {new Date(blog.created_at).toLocaleDateString()} • {blog.reading_time} min read
                 </div>
               </motion.div>
             ))}
@@ -30,9 +30,14 @@ const Dashboard = () => {
     try {
       const token = localStorage.getItem('access');
       const headers = token ? { Authorization: `Bearer ${token}` } : {};
-      const response = await axios.get('/api/stats/', { headers });
-      console.log('Stats response:', response.data); 
-      setStats(response.data);
+      // One round trip for everything this page shows
+      const response = await axios.get('/api/dashboard/?fields=stats,recent_predictions', { headers });
+      const userStats = response.data.stats.user || {};
+      setStats({
+        total_predictions: userStats.total_predictions || 0,
+        total_bookmarks: userStats.total_bookmarks || 0,
+        recent_predictions: (response.data.recent_predictions || []).length
+      });
     } catch (error) {
       console.error('Failed to fetch stats:', error);
       toast.error('Failed to load dashboard data');
@@ -0,0 +1,30 @@
+"""
+Gunicorn settings for the WSGI app:
+
+    gunicorn healytics.wsgi:application -c gunicorn.conf.py
+
+Each worker gets a stable slot (reused when a worker is replaced) so
+api.runtime can size TensorFlow's thread pools to its share of the CPUs and,
+with PIN_CPUS=True, bind it to its own cores.
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+
+def pre_fork(server, worker):
+    # Runs in the master, which keeps the slot on the worker object
+    used = {getattr(w, 'cpu_slot', None) for w in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in range(len(used) + 1) if slot not in used)
+
+
+def post_fork(server, worker):
+    # Before the app (and TensorFlow) is loaded in the worker
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healytics.settings')
+    import django
+    django.setup()
+    from api import runtime
+    runtime.configure(worker_slot=worker.cpu_slot, workers=server.num_workers)
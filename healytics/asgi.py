@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healytics.settings')
+os.environ.setdefault('HEALYTICS_ASGI', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Needs the settings loaded above
+from healytics.static import ASGIStaticFiles  # noqa: E402
+
+application = ASGIStaticFiles(django_application)
@@ -5,7 +5,7 @@ Django settings for healytics project.
 import os
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,14 +45,25 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Below WhiteNoise, which answers static requests (precompressed) itself
+    'api.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.routers.ReplicaStickinessMiddleware',
+    'api.profiling.ProfilingMiddleware',
 ]
 
+# healytics/asgi.py sets HEALYTICS_ASGI. WhiteNoise's middleware is sync-only and
+# would make Django run every ASGI request on a thread, so under ASGI the same
+# WhiteNoise file table is served by healytics.static.ASGIStaticFiles instead.
+ASGI_MODE = config('HEALYTICS_ASGI', default=False, cast=bool)
+if ASGI_MODE:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'healytics.urls'
 
 TEMPLATES = [
@@ -74,13 +85,94 @@ TEMPLATES = [
 WSGI_APPLICATION = 'healytics.wsgi.application'
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_PROFILE selects the database setup:
+#   sqlite      plain db.sqlite3 (development)
+#   sqlite-wal  db.sqlite3 in WAL mode with a busy timeout and tuned pragmas,
+#               so concurrent gunicorn workers stop failing with "database is locked"
+#   postgres    PostgreSQL with persistent, health-checked connections per worker
+DB_PROFILE = config('DB_PROFILE', default='sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('POSTGRES_DB', default='healytics'),
+            'USER': config('POSTGRES_USER', default='healytics'),
+            'PASSWORD': config('POSTGRES_PASSWORD', default=''),
+            'HOST': config('POSTGRES_HOST', default='localhost'),
+            'PORT': config('POSTGRES_PORT', default='5432'),
+            # Keep each worker's connection open between requests, and check
+            # it before reuse so a restarted server doesn't surface as errors.
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=600, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            # Behind PgBouncer in transaction mode, server-side cursors
+            # (used by the streaming exports) must be disabled.
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+            'OPTIONS': {'connect_timeout': 5},
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            # Seconds a writer waits for the lock before "database is locked"
+            'OPTIONS': {'timeout': config('SQLITE_BUSY_TIMEOUT', default=20 if DB_PROFILE == 'sqlite-wal' else 5, cast=int)},
+        }
+    }
+
+# Applied to every new SQLite connection (api/signals.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int),
+    'cache_size': -20000,  # KiB
+    'temp_store': 'MEMORY',
+} if DB_PROFILE == 'sqlite-wal' else {}
+
+# Optional read replica (alias 'replica') for the read-heavy views; see api/routers.py.
+# Local testing: DB_REPLICA_NAME=db-replica.sqlite3, then keep it fresh with
+# `manage.py sync_replica --interval 2` and run `manage.py replica_heartbeat`.
+# With DB_PROFILE=postgres set DB_REPLICA_HOST / DB_REPLICA_PORT instead.
+DB_REPLICA_NAME = config('DB_REPLICA_NAME', default='')
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_PROFILE == 'postgres' and DB_REPLICA_HOST:
+    DATABASES['replica'] = dict(
+        DATABASES['default'],
+        HOST=DB_REPLICA_HOST,
+        PORT=config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        TEST={'MIRROR': 'default'},
+    )
+elif DB_PROFILE != 'postgres' and DB_REPLICA_NAME:
+    DATABASES['replica'] = dict(DATABASES['default'], NAME=BASE_DIR / DB_REPLICA_NAME, TEST={'MIRROR': 'default'})
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+REPLICA = {
+    'ALIAS': 'replica',
+    'STICKY_SECONDS': config('REPLICA_STICKY_SECONDS', default=5, cast=int),
+    'MAX_LAG_SECONDS': config('REPLICA_MAX_LAG_SECONDS', default=10, cast=float),
+    'LAG_CHECK_SECONDS': 2,
 }
 
+# Shared cache for state that every worker must agree on: metrics counters,
+# replica stickiness and dashboard invalidation. Without REDIS_URL each process
+# gets its own local-memory cache, which is only right for a single worker
+# (runserver); `manage.py check` warns about it.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,6 +207,30 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Static delivery mode. 'precompressed' switches to WhiteNoise's manifest storage:
+# `python manage.py collectstatic` then fingerprints every filename and writes
+# .gz/.br siblings, WhiteNoise serves the hashed files with far-future
+# immutable cache headers, and the SPA shell is rewritten to reference them.
+STATIC_DELIVERY = config('STATIC_DELIVERY', default='default')
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'whitenoise.storage.CompressedManifestStaticFilesStorage'
+            if STATIC_DELIVERY == 'precompressed'
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# CRA's build output (main.1a2b3c4d.js, 787.1a2b3c4d.chunk.js) and Django's
+# manifest names (main.1a2b3c4d.5e6f7a8b9c0d.js) are content-hashed, so they
+# never change and can be cached forever.
+WHITENOISE_IMMUTABLE_FILE_TEST = r'\.[0-9a-f]{8,32}\.'
+
 # Tell Django where index.html is
 TEMPLATES[0]['DIRS'] = [
     os.path.join(BASE_DIR, 'frontend', 'build')
@@ -130,7 +246,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -167,6 +283,11 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Per-process cache of authenticated users/profiles (seconds). Local saves
+# invalidate immediately; other workers see changes within the TTL.
+AUTH_CACHE_TTL = config('AUTH_CACHE_TTL', default=30, cast=int)
+AUTH_CACHE_MAXSIZE = 10000
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -181,10 +302,136 @@ CORS_ALLOW_CREDENTIALS = True
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Chunked uploads (/api/uploads/): parts are streamed to DIR, so large photos
+# never sit in worker memory. Sessions expire after EXPIRE_HOURS
+# (clean up with `manage.py purge_uploads`).
+UPLOADS = {
+    'DIR': config('UPLOADS_DIR', default=os.path.join(BASE_DIR, 'uploads')),
+    'MAX_SIZE': config('UPLOADS_MAX_SIZE', default=50 * 1024 * 1024, cast=int),
+    'MAX_CHUNK_SIZE': config('UPLOADS_MAX_CHUNK_SIZE', default=5 * 1024 * 1024, cast=int),
+    'EXPIRE_HOURS': config('UPLOADS_EXPIRE_HOURS', default=24, cast=int),
+}
+
 # Model file path
 MODEL_PATH = os.path.join(BASE_DIR, 'models', 'skin_disease_model_best.h5')
 
+# Versioned models (python manage.py model_registry). Workers re-read the ACTIVE
+# pointer at most every MODEL_REGISTRY_POLL_SECONDS and hot-swap in the background.
+MODEL_REGISTRY_DIR = config('MODEL_REGISTRY_DIR', default=os.path.join(BASE_DIR, 'models', 'registry'))
+MODEL_REGISTRY_POLL_SECONDS = config('MODEL_REGISTRY_POLL_SECONDS', default=10.0, cast=float)
+
+# Shadow evaluation: run a candidate registry version on SAMPLE_RATE of live
+# predictions off the request path (bounded queue, drops when full).
+# Results: /api/admin/shadow/
+SHADOW_MODEL = {
+    'VERSION': config('SHADOW_MODEL_VERSION', default=''),
+    'SAMPLE_RATE': config('SHADOW_SAMPLE_RATE', default=0.1, cast=float),
+    'QUEUE_SIZE': config('SHADOW_QUEUE_SIZE', default=32, cast=int),
+}
+
+# Screening cascade: a small registry version scores every image first and
+# only answers when it is at least CONFIDENCE_THRESHOLD sure of a class not
+# in ESCALATE_CLASSES; the rest go to the active model. Empty disables it.
+# Stage shares: /api/admin/cascade/, offline tuning: manage.py evaluate_cascade
+CASCADE = {
+    'SCREEN_VERSION': config('CASCADE_SCREEN_VERSION', default=''),
+    'CONFIDENCE_THRESHOLD': config('CASCADE_CONFIDENCE_THRESHOLD', default=0.9, cast=float),
+    'ESCALATE_CLASSES': config('CASCADE_ESCALATE_CLASSES', default='melanoma,basal_cell_carcinoma,squamous_cell_carcinoma',
+                               cast=Csv()),
+}
+
+# Upload quality gate run before inference (api/quality.py): 'reject' refuses
+# tiny, blurry, badly exposed or non-skin photos, 'flag' predicts anyway and
+# stores the issues on the prediction, 'off' skips the checks.
+QUALITY_GATE = {
+    'MODE': config('QUALITY_GATE_MODE', default='flag'),
+    'MIN_SIDE': config('QUALITY_MIN_SIDE', default=128, cast=int),
+    'BLUR_MIN_VARIANCE': config('QUALITY_BLUR_MIN_VARIANCE', default=20.0, cast=float),
+    'SKIN_MIN_RATIO': config('QUALITY_SKIN_MIN_RATIO', default=0.1, cast=float),
+}
+
+# API response compression (api/compression.py): brotli or gzip for JSON/text
+# responses of at least MIN_SIZE bytes.
+COMPRESSION = {
+    'MIN_SIZE': config('COMPRESSION_MIN_SIZE', default=1024, cast=int),
+}
+
+# /api/dashboard/ caching: per-user sections for USER_TTL seconds (invalidated
+# on new predictions or bookmarks), site-wide sections for GLOBAL_TTL seconds.
+DASHBOARD = {
+    'USER_TTL': config('DASHBOARD_USER_TTL', default=300, cast=int),
+    'GLOBAL_TTL': config('DASHBOARD_GLOBAL_TTL', default=60, cast=int),
+}
+
+# Cache holding the shared counters behind /api/admin/metrics/. It must be a
+# shared backend (REDIS_URL) when running several workers.
+METRICS_CACHE = config('METRICS_CACHE', default='default')
+
+# Test-time augmentation: extra variants (hflip, vflip, rot90, rot180, rot270)
+# run in the same forward pass as the original image and averaged, e.g.
+# PREDICTION_TTA=hflip,vflip,rot90. Empty disables TTA.
+PREDICTION_TTA = config('PREDICTION_TTA', default='')
+
+# Lesion embeddings for /api/predictions/<id>/similar/. Stores holding more than
+# EXACT_LIMIT rows are searched through the IVF index built by
+# `manage.py build_embedding_index`, scanning the NPROBE closest clusters.
+EMBEDDINGS = {
+    'DIR': config('EMBEDDINGS_DIR', default=os.path.join(BASE_DIR, 'embeddings')),
+    'EXACT_LIMIT': config('EMBEDDINGS_EXACT_LIMIT', default=50000, cast=int),
+    'NPROBE': config('EMBEDDINGS_NPROBE', default=8, cast=int),
+}
+
+# Retention: `manage.py apply_retention` (e.g. from a daily cron) moves rows
+# older than these many days into compressed monthly archives; 0 keeps forever.
+RETENTION = {
+    'ARCHIVE_DIR': config('RETENTION_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive')),
+    'COLD_MEDIA_DIR': config('RETENTION_COLD_MEDIA_DIR', default=os.path.join(BASE_DIR, 'archive', 'media')),
+    'PREDICTION_DAYS': config('RETENTION_PREDICTION_DAYS', default=0, cast=int),
+    'CONTACT_DAYS': config('RETENTION_CONTACT_DAYS', default=0, cast=int),
+}
+
 # Medicine API settings
-MEDICINE_API_BASE_URL = "https://api.fda.gov/drug"
+MEDICINE_API_BASE_URL = config('MEDICINE_API_BASE_URL', default="https://api.fda.gov/drug")
+# Where medicine suggestions come from: 'local' (labels imported with
+# import_drug_labels), 'api' (live openFDA) or 'auto' (local once imported)
+MEDICINE_LOOKUP = config('MEDICINE_LOOKUP', default='auto')
+
+# Threads used by the async views to run model inference off the event loop
+ASYNC_INFERENCE_WORKERS = config('ASYNC_INFERENCE_WORKERS', default=2, cast=int)
+
+# TensorFlow thread pools per worker (api/runtime.py). By default each of
+# WORKERS processes gets an equal share of the CPUs the container may use;
+# PIN_CPUS binds every gunicorn worker to its own block of cores.
+INFERENCE_RUNTIME = {
+    'WORKERS': config('WEB_CONCURRENCY', default=0, cast=int),
+    'INTRA_OP_THREADS': config('TF_INTRA_OP_THREADS', default=0, cast=int),
+    'INTER_OP_THREADS': config('TF_INTER_OP_THREADS', default=0, cast=int),
+    'PIN_CPUS': config('PIN_CPUS', default=False, cast=bool),
+}
 
 GOOGLE_API_KEY=config('GOOGLE_API_KEY', default='your-google-api-key')
+
+# Server-side chat sessions (/api/chat/sessions/): each turn sends Gemini a
+# rolling summary plus the newest messages within TOKEN_BUDGET (estimated).
+# Idle sessions are deleted after TTL_HOURS.
+CHAT_SESSIONS = {
+    'TOKEN_BUDGET': config('CHAT_TOKEN_BUDGET', default=2000, cast=int),
+    'SUMMARY_TOKENS': config('CHAT_SUMMARY_TOKENS', default=300, cast=int),
+    'TTL_HOURS': config('CHAT_SESSION_TTL_HOURS', default=168, cast=int),
+    'MAX_SESSIONS_PER_USER': config('CHAT_MAX_SESSIONS_PER_USER', default=20, cast=int),
+    'MAX_ANONYMOUS_SESSIONS': config('CHAT_MAX_ANONYMOUS_SESSIONS', default=1000, cast=int),
+}
+
+# Request profiling (opt-in). Requests are sampled at SAMPLE_RATE when ENABLED,
+# or always when they carry a signed X-Healytics-Profile header
+# (python manage.py profile_token). Output lands in OUTPUT_DIR.
+PROFILING = {
+    'ENABLED': config('PROFILING_ENABLED', default=False, cast=bool),
+    'SAMPLE_RATE': config('PROFILING_SAMPLE_RATE', default=0.01, cast=float),
+    'INTERVAL': config('PROFILING_INTERVAL', default=0.005, cast=float),
+    'OUTPUT_DIR': config('PROFILING_OUTPUT_DIR', default=os.path.join(BASE_DIR, 'profiles')),
+    'ALLOW_HEADER': config('PROFILING_ALLOW_HEADER', default=True, cast=bool),
+    'HEADER_MAX_AGE': 3600,
+    'TF_TRACE': True,
+    'MAX_PROFILES': 200,
+}
@@ -0,0 +1,64 @@
+"""
+Static files for the ASGI app.
+
+WhiteNoiseMiddleware is sync-only, so under ASGI it is taken out of the
+middleware stack (it would push every request onto a thread). This app sits
+in front of Django instead and uses the same WhiteNoise file table: files
+come from STATIC_ROOT (and the finders in DEBUG), hashed names get immutable
+cache headers and .br/.gz siblings are picked by Accept-Encoding, exactly as
+under WSGI. Only static requests touch a thread, to read the file.
+"""
+
+import asyncio
+
+from django.core.exceptions import ImproperlyConfigured
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from api.checks import static_root_problem
+
+READ_BLOCK = 64 * 1024
+
+
+class ASGIStaticFiles:
+    def __init__(self, application):
+        problem = static_root_problem()
+        if problem:
+            raise ImproperlyConfigured(problem)
+        self.application = application
+        self.whitenoise = WhiteNoiseMiddleware(get_response=None)
+
+    def _find(self, path):
+        if self.whitenoise.autorefresh:
+            return self.whitenoise.find_file(path)
+        return self.whitenoise.files.get(path)
+
+    async def __call__(self, scope, receive, send):
+        static_file = None
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            static_file = self._find(scope['path'])
+        if static_file is None:
+            return await self.application(scope, receive, send)
+
+        # WhiteNoise reads request headers in WSGI environ form
+        environ = {
+            'HTTP_' + name.decode('latin-1').upper().replace('-', '_'): value.decode('latin-1')
+            for name, value in scope['headers']
+        }
+        response = static_file.get_response(scope['method'], environ)
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status),
+            'headers': [(name.lower().encode('latin-1'), str(value).encode('latin-1'))
+                        for name, value in response.headers],
+        })
+        if response.file is None:
+            return await send({'type': 'http.response.body', 'body': b''})
+        try:
+            while True:
+                block = await asyncio.to_thread(response.file.read, READ_BLOCK)
+                if not block:
+                    break
+                await send({'type': 'http.response.body', 'body': block, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            response.file.close()
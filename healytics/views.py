@@ -1,4 +1,84 @@
-from django.shortcuts import render
+import gzip
+import hashlib
+import os
+import re
+import threading
 
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from api.compression import negotiate_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+INDEX_PATH = os.path.join(settings.BASE_DIR, 'frontend', 'build', 'index.html')
+
+_STATIC_REF = re.compile(r'(?P<attr>src|href)="/static/(?P<path>[^"?#]+)"')
+
+
+class _Shell:
+    """index.html as served: static URLs fingerprinted, ETag and encodings precomputed."""
+
+    def __init__(self, html, mtime):
+        self.mtime = mtime
+        self.content = html.encode('utf-8')
+        # Weak: the same ETag covers the identity, gzip and br representations
+        self.etag = 'W/"%s"' % hashlib.sha256(self.content).hexdigest()[:32]
+        self.encoded = {'gzip': gzip.compress(self.content, compresslevel=9)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(self.content)
+
+
+_shell = None
+_shell_lock = threading.Lock()
+
+
+def _fingerprint(match):
+    # With manifest storage, point the shell at the hashed (immutable) copies
+    try:
+        url = staticfiles_storage.url(match.group('path'))
+    except ValueError:
+        return match.group(0)
+    return f'{match.group("attr")}="{url}"'
+
+
+def get_shell():
+    """Load index.html once per process (re-checked on every hit only in DEBUG)."""
+    global _shell
+    if _shell is not None and not settings.DEBUG:
+        return _shell
+    try:
+        mtime = os.stat(INDEX_PATH).st_mtime_ns
+    except FileNotFoundError:
+        raise Http404('Frontend build not found; run "npm run build" in frontend/.')
+    with _shell_lock:
+        if _shell is None or _shell.mtime != mtime:
+            with open(INDEX_PATH, encoding='utf-8') as fh:
+                _shell = _Shell(_STATIC_REF.sub(_fingerprint, fh.read()), mtime)
+    return _shell
+
+
+def _shell_etag(request, *args, **kwargs):
+    return get_shell().etag
+
+
+@condition(etag_func=_shell_etag)
 def index(request):
-    return render(request, 'index.html')
+    shell = get_shell()
+    encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''),
+                                  [c for c in ('br', 'gzip') if c in shell.encoded])
+    content = shell.encoded[encoding] if encoding else shell.content
+    response = HttpResponse(content, content_type='text/html; charset=utf-8')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    # The shell must be revalidated (cheap 304) so new deploys are picked up;
+    # the hashed assets it references are cached forever.
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
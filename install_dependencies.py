@@ -44,7 +44,11 @@ def main():
         ("requests==2.31.0", "Requests"),
         ("python-decouple==3.8", "Python Decouple"),
         ("gunicorn==21.2.0", "Gunicorn"),
+        ("uvicorn==0.24.0", "Uvicorn"),
+        ("httpx==0.25.2", "HTTPX"),
         ("whitenoise==6.6.0", "WhiteNoise"),
+        ("Brotli==1.1.0", "Brotli"),
+        ("psycopg2-binary==2.9.9", "psycopg2 (PostgreSQL driver)"),
         ("opencv-python==4.8.1.78", "OpenCV Python"),
         ("tensorflow-cpu==2.15.0", "TensorFlow CPU"),
     ]